@@ -1,24 +1,56 @@
 import numpy as np
+import pandas as pd
 from collections.abc import Iterable
 
 
 class MyDataFrame:
-    def __init__(self, columns: Iterable, n_elements: int, dtype=np.float32):
+    def __init__(self, columns: Iterable, n_elements: int, dtype=np.float32, values: np.ndarray = None):
         """
         Data structure used to store key, value pairs. Used instead of a pandas dataframe to
         reduce overhead.
 
+        The values are stored in one (n_elements, n_columns) matrix in column major order, so each column is a
+        contiguous view of the matrix. The columns keep their order.
+
         :param columns: Iterable of columns
         :param n_elements: Number of elements
         :param dtype: Datatype of arrays, defaults to np.float32
+        :param values: Existing (n_elements, n_columns) matrix to use as storage, defaults to None
         """
         self.n_elements = n_elements
         self.dtype = dtype
         self.index = np.arange(0, n_elements)
-        self.columns = set(columns)
-        self.data = {col: np.zeros(self.n_elements, dtype=self.dtype) for col in columns}
+        self.column_index = {}
+        for col in columns:
+            if col in self.column_index:
+                raise ValueError(f"Column {col} is not unique")
+            self.column_index[col] = len(self.column_index)
+        self.columns = tuple(self.column_index)
+
+        if values is None:
+            values = np.zeros((n_elements, len(self.column_index)), dtype=dtype, order="F")
+        elif values.shape != (n_elements, len(self.column_index)):
+            raise ValueError(f"Dimensions of numpy array does not match definition ({n_elements}, {len(self.columns)})")
+        self.values = values
+        self.data = {col: self.values[:, i] for col, i in self.column_index.items()}
+        self._filter_index = {}
 
     def __getitem__(self, key):
+        """
+        Get a column, a slice of rows or a block of columns.
+
+        :param key: Column name, slice of rows or list of column names
+        :return: Column view for a column name, a MyDataFrame sharing the values for a slice, and a
+            (n_elements, len(key)) matrix for a list of columns. The matrix is a view when the columns are adjacent.
+        """
+        if isinstance(key, slice):
+            values = self.values[key]
+            return MyDataFrame(self.columns, values.shape[0], dtype=self.dtype, values=values)
+        if isinstance(key, (list, tuple)):
+            positions = [self.column_index[col] for col in key]
+            if positions and positions == list(range(positions[0], positions[0] + len(positions))):
+                return self.values[:, positions[0] : positions[-1] + 1]
+            return self.values[:, positions]
         return self.data[key]
 
     def __setitem__(self, key, value):
@@ -26,23 +58,56 @@ class MyDataFrame:
             raise ValueError("Cannot set a non-numpy array as value")
         if value.shape != self.data[key].shape:
             raise ValueError(f"Dimensions of numpy array does not match definition ({self.n_elements},)")
-        if key not in self.columns:
+        if key not in self.column_index:
             raise KeyError("The key {} is not defined.".format(key))
 
-        self.data[key] = value
+        self.data[key][:] = value
+
+    def __contains__(self, key):
+        return key in self.column_index
 
     def filter(self, like):
         """
-        Return dictionary with keys containing like.
+        Return dictionary with keys containing like. The columns matching like are looked up once and kept in
+        an index, since the columns are fixed.
 
         :param like:
         :return: Dictionary
         """
-        items = [col for col in self.columns if like in col]
+        items = self._filter_index.get(like)
+        if items is None:
+            items = [col for col in self.columns if like in col]
+            self._filter_index[like] = items
         if not items:
             raise ValueError(f"{like} is not in columns")
 
         return {item: self.data[item] for item in items}
 
+    def to_numpy(self):
+        """
+        Return the (n_elements, n_columns) matrix with the values, without copying.
+
+        :return: Matrix with the columns in order
+        """
+        return self.values
+
+    def to_pandas(self):
+        """
+        Return a pandas dataframe using the values as storage, without copying.
+
+        :return: Dataframe with the columns in order
+        """
+        return pd.DataFrame(self.values, index=self.index, columns=list(self.columns), copy=False)
+
+    def __getstate__(self):
+        # The column views are rebuilt from the values, a pickled view would be a copy
+        state = self.__dict__.copy()
+        del state["data"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.data = {col: self.values[:, i] for col, i in self.column_index.items()}
+
     def __str__(self):
         return str(self.data)
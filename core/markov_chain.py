@@ -139,6 +139,7 @@ class MarkovChain(BaseForecastGenerator):
                 return node
 
     def set_seed(self, seed: int):
+        self.seed = seed
         self.random_gen = np.random.Generator(np.random.PCG64(seed))
 
     def sample(self, initial_node: Optional[int] = None, uniform_sample=None):
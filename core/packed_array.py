@@ -0,0 +1,98 @@
+import json
+import zlib
+
+import numpy as np
+import pandas as pd
+
+
+def pack_float32(values) -> bytes:
+    """
+    Pack values as compressed little-endian float32. The bytes are shuffled before compression, so the sign and
+    exponent bytes of neighbouring values, which rarely differ, end up next to each other.
+
+    :param values: Values to pack
+    :return: Packed values
+    :rtype: bytes
+    """
+    raw = np.ascontiguousarray(values, dtype="<f4").ravel()
+    return zlib.compress(raw.view(np.uint8).reshape(-1, 4).T.tobytes())
+
+
+def unpack_float32(blob: bytes, length: int) -> np.ndarray:
+    """
+    Inverse of pack_float32.
+
+    :param blob: Packed values
+    :type blob: bytes
+    :param length: Number of values
+    :type length: int
+    :return: The values as float32
+    :rtype: np.ndarray
+    """
+    shuffled = np.frombuffer(zlib.decompress(blob), dtype=np.uint8)
+    if len(shuffled) != 4 * length:
+        raise ValueError("Expected {} values, the blob holds {}".format(length, len(shuffled) / 4))
+    return shuffled.reshape(4, length).T.copy().view("<f4").ravel()
+
+
+def pack_int64(values) -> bytes:
+    """
+    Pack integers as the compressed little-endian int64 differences between consecutive values, which are small
+    for increasing steps.
+
+    :param values: Values to pack
+    :return: Packed values
+    :rtype: bytes
+    """
+    raw = np.ascontiguousarray(values, dtype="<i8").ravel()
+    return zlib.compress(np.diff(raw, prepend=0).astype("<i8").tobytes())
+
+
+def unpack_int64(blob: bytes, length: int) -> np.ndarray:
+    """
+    Inverse of pack_int64.
+
+    :param blob: Packed values
+    :type blob: bytes
+    :param length: Number of values
+    :type length: int
+    :return: The values as int64
+    :rtype: np.ndarray
+    """
+    differences = np.frombuffer(zlib.decompress(blob), dtype="<i8")
+    if len(differences) != length:
+        raise ValueError("Expected {} values, the blob holds {}".format(length, len(differences)))
+    return np.cumsum(differences)
+
+
+def encode_steps(time_index) -> str:
+    """
+    Describe the steps of a time index as a run-length encoded list of [step size in seconds, number of steps].
+    A regular hourly index of a year is described by [[3600, 8759]].
+
+    :param time_index: Time index
+    :return: JSON description of the steps
+    :rtype: str
+    """
+    steps = np.diff(pd.DatetimeIndex(time_index).asi8) // 10**9
+    if len(steps) == 0:
+        return "[]"
+    starts = np.flatnonzero(np.r_[True, steps[1:] != steps[:-1]])
+    counts = np.diff(np.r_[starts, len(steps)])
+    return json.dumps([[int(s), int(c)] for s, c in zip(steps[starts], counts)])
+
+
+def decode_steps(start_time, description: str) -> pd.DatetimeIndex:
+    """
+    Inverse of encode_steps.
+
+    :param start_time: First time stamp
+    :param description: JSON description of the steps
+    :type description: str
+    :return: Time index
+    :rtype: pd.DatetimeIndex
+    """
+    runs = json.loads(description)
+    steps = np.repeat([s for s, _ in runs], [c for _, c in runs]).astype(np.int64)
+    start = pd.Timestamp(start_time)
+    return pd.DatetimeIndex(start + pd.to_timedelta(np.r_[0, np.cumsum(steps)], unit="s"))
@@ -1,69 +1,117 @@
+from typing import Optional
+
 import numpy as np
 from scipy.spatial import distance
 
 
-def fast_forward_selection_algo(scenarios: np.ndarray, n_reduced_scenarios: int):
+def _euclidean(a: np.ndarray, b: np.ndarray, sq_a: np.ndarray, sq_b: np.ndarray):
     """
-    Fast forward algorithm by Heimsch & Romisch 2003.
-    :param scenarios: the intial set of scenarios to reduce. (n_scenarios x n_variables)
-    :param n_reduced_scenarios: the amount of scenarios to reduce to.
-    :returns: A tuple with reduced scenarios and their weight.
+    Euclidian distance between the rows of a and b computed with a matrix product, given the squared norms
+    of the rows.
     """
-    n_scen = scenarios.shape[0]
+    sq_dist = sq_a[:, None] + sq_b[None, :] - 2.0 * (a @ b.T)
+    return np.sqrt(np.maximum(sq_dist, 0.0, out=sq_dist), out=sq_dist)
 
-    J = [i for i in range(n_scen)]  # All nodes in the scenarios
-    S = []  # Set of nodes with reduced scenarios
 
-    # Equiprobability for each scenario
-    p = np.full((n_scen), 1 / n_scen)
-    prob = p
-
-    # Cost matrix/euclidian distance
-    cost_matrix = distance.cdist(scenarios, scenarios)
-
-    # Compute probability distances between each scenario and all other scenarios
-    prob_distribution = np.dot(p, cost_matrix)
-
-    # Select first scenario to keep, then one with the smalles prob_distribution
-    u = prob_distribution.argmin()
-    p[u] = 0  # set prob of that to 0
+def _closest(scenarios: np.ndarray, rows: np.ndarray, cols: np.ndarray, chunk_size: Optional[int]):
+    """
+    Index in cols of the scenario closest to each row scenario. With chunk_size, at most
+    chunk_size x len(cols) distances are computed at a time.
+    """
+    chunk_size = chunk_size or max(len(rows), 1)
+    closest = np.empty(len(rows), dtype=np.int64)
+    for start in range(0, len(rows), chunk_size):
+        closest[start : start + chunk_size] = distance.cdist(
+            scenarios[rows[start : start + chunk_size]], scenarios[cols]
+        ).argmin(axis=1)
+    return closest
+
+
+def fast_forward_selection(
+    scenarios: np.ndarray,
+    n_reduced_scenarios: int,
+    probabilities: Optional[np.ndarray] = None,
+    chunk_size: Optional[int] = None,
+):
+    """
+    Fast forward algorithm by Heitsch & Romisch 2003.
 
-    J.remove(u)
-    S.append(u)  # add that node to the reduced scenarios
+    A selected scenario u reduces the cost of every remaining scenario i to min(c(i, j), c(i, u)), so the cost
+    matrix after selecting S is min(c(i, j), m(i)), where m(i) is the distance from i to the closest selected
+    scenario. With chunk_size the cost is computed for chunk_size candidate scenarios at a time instead of keeping
+    the n_scenarios x n_scenarios matrix.
 
-    for k in range(1, n_reduced_scenarios):
-        for i in J:  # from node i in J
-            for j in J:  # to node j in J
-                cost_matrix[i, j] = min(cost_matrix[i, j], cost_matrix[i, u])
-        prob_distribution = np.dot(p, cost_matrix)
-        u = prob_distribution.argmin()  # Should exclude columns with indices in S
+    :param scenarios: the intial set of scenarios to reduce. (n_scenarios x n_variables)
+    :param n_reduced_scenarios: the amount of scenarios to reduce to.
+    :param probabilities: probability of each scenario, defaults to equiprobable scenarios.
+    :param chunk_size: number of candidate scenarios evaluated at a time, defaults to None (full cost matrix).
+    :returns: A tuple with the indices of the reduced scenarios and their probability.
+    """
+    n_scen = scenarios.shape[0]
+    if not 0 < n_reduced_scenarios <= n_scen:
+        raise ValueError(f"Cannot reduce {n_scen} scenarios to {n_reduced_scenarios}")
+
+    prob = np.full(n_scen, 1 / n_scen) if probabilities is None else np.asarray(probabilities, dtype=np.float64)
+    p = prob.copy()  # Probability of the scenarios not selected yet
+    is_selected = np.zeros(n_scen, dtype=bool)
+    min_cost = np.full(n_scen, np.inf)  # Distance to the closest selected scenario
+    selected = []
+
+    if chunk_size is None:
+        cost_matrix = distance.cdist(scenarios, scenarios)
+    else:
+        cost_matrix = None
+        scenarios = np.asarray(scenarios, dtype=np.float64)
+        sq_norm = np.einsum("ij,ij->i", scenarios, scenarios)
+
+    for _ in range(n_reduced_scenarios):
+        if cost_matrix is not None:
+            prob_distribution = p @ cost_matrix
+        else:
+            prob_distribution = np.empty(n_scen)
+            for start in range(0, n_scen, chunk_size):
+                chunk = slice(start, start + chunk_size)
+                cost = _euclidean(scenarios, scenarios[chunk], sq_norm, sq_norm[chunk])
+                np.minimum(cost, min_cost[:, None], out=cost)
+                prob_distribution[start : start + chunk_size] = p @ cost
+
+        prob_distribution[is_selected] = np.inf
+        u = int(prob_distribution.argmin())
+        selected.append(u)
+        is_selected[u] = True
         p[u] = 0
 
-        J.remove(u)
-        S.append(u)
+        if cost_matrix is not None:
+            np.minimum(cost_matrix, cost_matrix[:, u, None], out=cost_matrix)
+        else:
+            cost_u = _euclidean(scenarios, scenarios[u, None], sq_norm, sq_norm[u, None])[:, 0]
+            np.minimum(min_cost, cost_u, out=min_cost)
 
-    # Reduced Scenarios
-    RS = scenarios[S, :]
+    selected = np.array(selected)
 
-    # Calculate the optimal probabilities of the preserved scenarios using the optimal redistribution rule
-    P = np.full((n_reduced_scenarios), 1 / n_scen)
+    # Optimal redistribution rule: the scenarios not selected add their probability to the closest selected one
+    remaining = np.flatnonzero(~is_selected)
+    closest = _closest(scenarios, remaining, selected, chunk_size)
+    P = prob[selected] + np.bincount(closest, weights=prob[remaining], minlength=n_reduced_scenarios)
 
-    # Calculate the euclidian distance between the scenario node and the reduced node
-    dist = distance.cdist(scenarios, RS)
+    return selected, P
 
-    # Add the probability of the reduced node to itself
-    for k in range(n_reduced_scenarios):
-        P[k] = prob[S[k]]
 
-    for j in J:  # Loop over all scenario nodes except the reduced nodes
-        idx = dist[j, :].argmin()  # Find index of the reduced node closest to this node
-        P[idx] = P[idx] + prob[j]  # Add the prob weight from this node to the reduced node
+def fast_forward_selection_algo(scenarios: np.ndarray, n_reduced_scenarios: int, chunk_size: Optional[int] = None):
+    """
+    Fast forward algorithm by Heimsch & Romisch 2003.
+    :param scenarios: the intial set of scenarios to reduce. (n_scenarios x n_variables)
+    :param n_reduced_scenarios: the amount of scenarios to reduce to.
+    :param chunk_size: number of scenarios evaluated at a time, defaults to None (full cost matrix).
+    :returns: A tuple with reduced scenarios and their weight.
+    """
+    selected, P = fast_forward_selection(scenarios, n_reduced_scenarios, chunk_size=chunk_size)
 
     # Sort numerical issues
-    RS = np.array([np.round(i, 6) for i in RS])
-    P = [np.round(i, 6) for i in P]
+    RS = np.round(scenarios[selected, :], 6)
+    P = np.round(P, 6)
 
-    if sum(P) != 1:
-        P = np.array([float(i + 1.0 / len(P) * (1.0 - sum(P))) for i in P])  # Add rest over all
+    if P.sum() != 1:
+        P = P + 1.0 / len(P) * (1.0 - P.sum())  # Add rest over all
 
     return RS, P
@@ -1,6 +1,7 @@
 from typing import List, Union
 from abc import ABCMeta, abstractmethod, abstractproperty
 
+import numpy as np
 import pandas as pd
 from pandas.core.indexes import period
 
@@ -36,12 +37,11 @@ class ITimeIndexer(metaclass=ABCMeta):
 
 
 def compute_step_size_hours(index):
-    step_size_hours = []
-    for first, second in zip(index[:-1], index[1:]):
-        step_size_hours.append((second - first) / pd.Timedelta(hours=1))
-        if step_size_hours[-1] <= 0.0:
-            raise ValueError("Step size cannot be nonpositive")
-    return step_size_hours
+    index = pd.DatetimeIndex(index)
+    step_size_hours = np.diff(index.asi8) / (pd.Timedelta(hours=1).value)
+    if np.any(step_size_hours <= 0.0):
+        raise ValueError("Step size cannot be nonpositive")
+    return step_size_hours.tolist()
 
 
 class BaseTimeIndexer(ITimeIndexer):
@@ -69,6 +69,15 @@ class BaseTimeIndexer(ITimeIndexer):
     def average_step_size_hours(self):
         return self._average_step_size_hours
 
+    @property
+    def index_hash(self) -> int:
+        """
+        Hash of the time index, equal for time indexers with the same time stamps.
+        """
+        if getattr(self, "_index_hash", None) is None:
+            self._index_hash = hash((str(self.index.tz), self.index.asi8.tobytes()))
+        return self._index_hash
+
 
 class TimeIndexer(BaseTimeIndexer):
     def __init__(self, time_index):
@@ -81,6 +90,7 @@ class TimeIndexer(BaseTimeIndexer):
     @index.setter
     def index(self, value: Union[pd.DatetimeIndex, List]):
         self._index = pd.DatetimeIndex(value)
+        self._index_hash = None
         self._from_datetime = self._index[0]
         self._to_datetime = self._index[-1]
         self._step_size_hours = compute_step_size_hours(self._index)
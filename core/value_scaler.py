@@ -88,6 +88,13 @@ class IDiscounter(metaclass=ABCMeta):
     def get_gamma(self, step):
         pass
 
+    def get_gammas(self, num_steps):
+        """
+        :param num_steps: Number of steps
+        :return: Gamma for each step
+        """
+        return np.array([self.get_gamma(step) for step in range(num_steps)])
+
 
 class Discounter(IDiscounter):
     def __init__(self, discount_rate, time_indexer):
@@ -104,3 +111,7 @@ class Discounter(IDiscounter):
     def get_gamma(self, step):
         exponent = self.aggregated_step_hours[step] / 8760
         return 1 / (1 + self.discount_rate) ** exponent
+
+    def get_gammas(self, num_steps):
+        exponent = self.aggregated_step_hours[:num_steps] / 8760
+        return 1 / (1 + self.discount_rate) ** exponent
@@ -14,6 +14,7 @@ from hydro_systems import HSGen
 from core.timeindex import CombinedTimeIndexer, ITimeIndexer, TimeIndexer
 from server.model import Agent, Forecast, ReportDatum, SeriesLink, Upload, HydroSystem
 from core.markov_chain import MarkovChain, Noise
+from core.scenario_reduction import fast_forward_selection
 from server.model import Forecast, SeriesLink, TimeDataValue, TimeDataSery
 
 
@@ -70,10 +71,15 @@ class InflowPriceSampler(IInflowPricesampler):
         sample_noise=Noise.Off,
         logger=None,
         seed=42,
+        n_eval_scenarios=None,
     ):
         """
         Takes in inflow and price forecast, processes it to required time period and trains a forecast
         generator used for sampling episodes.
+
+        With n_eval_scenarios, an evaluation sampler only returns a representative subset of the raw episodes,
+        selected with the fast forward scenario reduction. The probability of each selected episode is stored in
+        scenario_weights.
         """
         self.logger = logger or logging.getLogger(__name__)
         self.forecast_data = forecast_data
@@ -96,6 +102,10 @@ class InflowPriceSampler(IInflowPricesampler):
             self.df_i = self.df_i.ffill().bfill()
             self.df_p = self.df_p.ffill().bfill()
 
+        self.scenario_weights = None  # Probability of each raw episode, None if equiprobable
+        if self.is_eval and n_eval_scenarios is not None and n_eval_scenarios < self.n_raw_episodes:
+            self.reduce_scenarios(n_eval_scenarios)
+
         if not self.is_eval:
             data = np.moveaxis(np.stack((self.df_p.values, self.df_i.values)), source=0, destination=-1)
             self.forecast_generator = MarkovChain(
@@ -111,6 +121,26 @@ class InflowPriceSampler(IInflowPricesampler):
             self.sample_max = clusters.max(axis=1) + clusters.min(axis=1)
             self.sample_max[:, 0] = np.inf  # No upper limit on price
 
+    def reduce_scenarios(self, n_scenarios: int):
+        """
+        Keep the n_scenarios raw episodes that best represent all the raw episodes, and store their probability
+        in scenario_weights. Price and inflow are scaled by their standard deviation before computing distances.
+
+        :param n_scenarios: Number of raw episodes to keep
+        :type n_scenarios: int
+        """
+        price, inflow = self.df_p.values.T, self.df_i.values.T
+        scenarios = np.hstack((price / (price.std() or 1.0), inflow / (inflow.std() or 1.0)))
+        # Avoid the full n x n distance matrix for large scenario sets
+        chunk_size = None if self.n_raw_episodes <= 2000 else 500
+        selected, weights = fast_forward_selection(scenarios, n_scenarios, chunk_size=chunk_size)
+
+        order = np.argsort(selected)
+        self.df_p = self.df_p.iloc[:, selected[order]]
+        self.df_i = self.df_i.iloc[:, selected[order]]
+        self.scenario_weights = weights[order]
+        self.n_raw_episodes = n_scenarios
+
     @staticmethod
     def mean_resample(time_indexer, df):
         df_resampled = pd.DataFrame(0.0, index=time_indexer.index, columns=df.columns)
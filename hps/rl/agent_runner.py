@@ -2,9 +2,15 @@ import numpy as np
 from hps.rl.settings import RunSettings, AgentSettings
 from hps.rl.logging.agent_plugin import AgentPlugin
 from hps.rl.sb_callback import EvalCallback
+from hps.rl.training_checkpoint import TrainingCheckpoint, TrainingCheckpointCallback
+from hps.rl.async_training import AsyncTrainer
+from hps.rl.population_training import learn_population
+from hps.rl.prefill import PrefillCallback
 
 import os
+from typing import List, Optional
 
+from stable_baselines3.common.callbacks import CallbackList
 from stable_baselines3.common.evaluation import evaluate_policy
 from stable_baselines3 import SAC
 
@@ -18,15 +24,24 @@ class AgentRunner:
         internal_train_env,
         internal_eval_env,
         plugin: AgentPlugin,
+        training_checkpoint: Optional[TrainingCheckpoint] = None,
+        resume_state: Optional[dict] = None,
+        async_trainer: Optional[AsyncTrainer] = None,
     ):
 
         self.sb_agent = sb_agent
         self.plugin = plugin
+        self.async_trainer = async_trainer
         self.internal_train_env, self.internal_eval_env = internal_train_env, internal_eval_env
 
         self.eval_env = self.internal_eval_env
 
         self.init_agent(agent_settings, run_settings.train_intervals)
+        self.init_training_checkpoint(training_checkpoint, run_settings.checkpoint_interval, resume_state)
+        if run_settings.prefill_initial_collect and async_trainer is None:
+            # Collected before the other callbacks start counting steps
+            policy = getattr(internal_train_env.action_space, "exploration_policy", None)
+            self.callback = CallbackList([PrefillCallback(policy, verbose=1), self.callback])
 
         self.log_replay_buffer_when_finished = run_settings.log_replay_buffer_when_finished
         self.eval_interval = agent_settings.eval_interval
@@ -40,7 +55,8 @@ class AgentRunner:
 
     def init_agent(self, agent_settings: AgentSettings, train_intervals: int):
 
-        eval_freq = agent_settings.eval_interval * train_intervals
+        # The callback is called once per step of all the environments of the agent
+        eval_freq = max(1, agent_settings.eval_interval * train_intervals // self.sb_agent.n_envs)
         self.best_model_path = agent_settings.output_checkpoint_folder
         self.eval_callback = EvalCallback(
             self,
@@ -53,6 +69,23 @@ class AgentRunner:
             n_eval_episodes=agent_settings.eval_episodes,
         )
 
+    def init_training_checkpoint(self, training_checkpoint, checkpoint_interval, resume_state):
+        """
+        Save a training checkpoint every checkpoint_interval evaluations, and continue from resume_state, the state of
+        the checkpoint the agent was loaded from.
+        """
+        self.callback = self.eval_callback
+        self.resume_state = resume_state
+        if training_checkpoint is None or not checkpoint_interval:
+            return
+
+        checkpoint_callback = TrainingCheckpointCallback(
+            training_checkpoint, self.eval_callback, checkpoint_interval * self.eval_callback.eval_freq
+        )
+        if resume_state is not None:
+            checkpoint_callback.restore(resume_state)
+        self.callback = CallbackList([self.eval_callback, checkpoint_callback])
+
     def evaluate_callback(self, step, mean_reward, best_mean_reward, new_best_eval, episode_rewards):
         new_best = {"eval": new_best_eval, "train": False}
 
@@ -95,7 +128,13 @@ class AgentRunner:
             )
 
             rewards.append(self.internal_eval_env.reward["sum"].sum())
-        avg_return = np.mean(rewards)
+
+        scenario_weights = self.internal_eval_env.inflow_price_sampler.scenario_weights
+        if scenario_weights is None:
+            avg_return = np.mean(rewards)
+        else:
+            weights = scenario_weights[np.arange(len(rewards)) % len(scenario_weights)]
+            avg_return = np.average(rewards, weights=weights)
 
         return avg_return
 
@@ -106,14 +145,47 @@ class AgentRunner:
         return current_best
 
     def end_report(self):
+        # Save the buffer of the trained agent, the loaded best model starts with an empty buffer
+        if self.log_replay_buffer_when_finished:
+            self.eval_callback.save_replay_buffer()
         self.sb_agent = SAC.load(os.path.join(self.best_model_path, "best_model"))
         best_step = self.plugin.get_best_step()
         self.__evaluate(best_step)
-        if self.log_replay_buffer_when_finished:
-            self.sb_agent.save_replay_buffer(self.best_model_path + "/replay_buffer")
 
-    def run(self):
+    def learn_args(self):
+        """
+        Steps left to train, and whether the step count of the agent is reset.
+        """
         num_steps = self.train_episodes * self.steps_per_episode
-        self.sb_agent.learn(total_timesteps=num_steps, callback=self.eval_callback)
+        reset_num_timesteps = self.resume_state is None
+        if not reset_num_timesteps:
+            # The steps already taken are added by learn
+            num_steps = max(0, num_steps - self.sb_agent.num_timesteps)
+        return num_steps, reset_num_timesteps
+
+    def run(self):
+        num_steps, reset_num_timesteps = self.learn_args()
+        if self.async_trainer is None:
+            self.sb_agent.learn(
+                total_timesteps=num_steps, callback=self.callback, reset_num_timesteps=reset_num_timesteps
+            )
+        else:
+            self.async_trainer.learn(self.sb_agent, num_steps, self.callback, reset_num_timesteps)
         self.end_report()
         del self.sb_agent
+
+    @staticmethod
+    def run_population(runners: List["AgentRunner"]):
+        """
+        Train the agents of the runners together in this process, see learn_population, and report each of them.
+        """
+        learn_args = [runner.learn_args() for runner in runners]
+        learn_population(
+            [runner.sb_agent for runner in runners],
+            [num_steps for num_steps, _ in learn_args],
+            [runner.callback for runner in runners],
+            [reset_num_timesteps for _, reset_num_timesteps in learn_args],
+        )
+        for runner in runners:
+            runner.end_report()
+            del runner.sb_agent
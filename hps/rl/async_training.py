@@ -0,0 +1,242 @@
+import copy
+import math
+import multiprocessing
+import os
+import time
+from typing import Callable, Optional, Tuple
+
+import torch as th
+from stable_baselines3.common.base_class import BaseAlgorithm
+from stable_baselines3.common.callbacks import BaseCallback
+
+from hps.rl.settings import AgentSettings, RunSettings
+
+POLICY_SNAPSHOT = "policy.pt"
+
+
+def build_worker_agent(
+    run_settings: RunSettings,
+    agent_settings: AgentSettings,
+    project_run_id: int,
+    folder: str,
+    worker: int,
+    n_workers: int,
+) -> BaseAlgorithm:
+    """
+    Build the agent of a rollout worker with the builders of the run. The worker writes its transitions to shard
+    ``worker`` of the replay buffer in folder, and collects its share of the initial episodes.
+
+    :param run_settings: Settings of the run
+    :type run_settings: RunSettings
+    :param agent_settings: Settings of the agent trained by the learner
+    :type agent_settings: AgentSettings
+    :param project_run_id: Project run of the agent
+    :type project_run_id: int
+    :param folder: Folder of the replay buffer shared with the learner
+    :type folder: str
+    :param worker: Index of the worker
+    :type worker: int
+    :param n_workers: Number of workers
+    :type n_workers: int
+    :return: Agent stepping the train environment
+    :rtype: BaseAlgorithm
+    """
+    from hps.rl.builders.rl_builder import RlBuilder
+    from server.db_connection import create_session
+    from server.model import ProjectRun
+
+    agent_settings = copy.deepcopy(agent_settings)
+    if agent_settings.seed is not None:
+        agent_settings.seed = int(agent_settings.seed) + 1 + worker
+    agent_settings.episodes_to_initially_collect = math.ceil(agent_settings.episodes_to_initially_collect / n_workers)
+    agent_settings.episodes_stored_in_buffer = math.ceil(agent_settings.episodes_stored_in_buffer / n_workers)
+
+    session = create_session()
+    project_run = session.query(ProjectRun).filter_by(ProjectRunId=project_run_id).first()
+    rl_builder = RlBuilder(run_settings, agent_settings, project_run)
+    rl_builder.random_init(agent_settings.seed)
+
+    internal_train_env, _, train_observation_generator = rl_builder.build_environments(session)
+    agent_builder = rl_builder.build_agent_builder(internal_train_env, train_observation_generator)
+    agent_builder.shared_replay_buffer_folder = folder
+    agent_builder.replay_buffer_shard = worker
+    num_actions = internal_train_env.hydro_system.get_num_actions()
+    agent = agent_builder.build(num_actions, agent_settings.output_checkpoint_folder, None)
+    session.close()
+    return agent
+
+
+class PolicySyncCallback(BaseCallback):
+    """
+    Callback of a rollout worker. Publishes the number of steps of the worker, loads the latest policy snapshot of
+    the learner every sync_period steps and stops the worker when the learner is done.
+    """
+
+    def __init__(self, snapshot_path: str, sync_period: int, counter, stop):
+        super().__init__(verbose=0)
+        self.snapshot_path = snapshot_path
+        self.sync_period = sync_period
+        self.counter = counter
+        self.stop = stop
+        self.snapshot_time = None
+
+    def load_snapshot(self):
+        snapshot_time = os.stat(self.snapshot_path).st_mtime_ns
+        if snapshot_time == self.snapshot_time:
+            return
+        self.model.policy.load_state_dict(th.load(self.snapshot_path, map_location=self.model.device))
+        if getattr(self.model, "use_sde", False):
+            self.model.actor.reset_noise()
+        self.snapshot_time = snapshot_time
+
+    def _on_training_start(self) -> None:
+        self.load_snapshot()
+
+    def _on_step(self) -> bool:
+        self.counter.value = self.num_timesteps
+        if self.n_calls % self.sync_period == 0:
+            self.load_snapshot()
+        return not self.stop.is_set()
+
+
+def rollout_worker(build_worker, worker_args, folder, worker, n_workers, sync_period, counter, stop):
+    th.set_num_threads(1)  # Small policy networks, the cores are better used by other workers
+    agent = build_worker(*worker_args, folder=folder, worker=worker, n_workers=n_workers)
+    agent.gradient_steps = 0  # Only the learner trains
+    agent.tensorboard_log = None
+    agent.verbose = 0
+    callback = PolicySyncCallback(os.path.join(folder, POLICY_SNAPSHOT), sync_period, counter, stop)
+    agent.learn(total_timesteps=2**62, callback=callback)
+    agent.replay_buffer.flush()
+
+
+class AsyncTrainer:
+    def __init__(
+        self,
+        folder: str,
+        n_workers: int,
+        sync_period: int,
+        worker_args: Tuple,
+        build_worker: Callable[..., BaseAlgorithm] = build_worker_agent,
+    ):
+        """
+        Trains an off-policy agent with separate actor and learner processes. Rollout workers step copies of the
+        train environment with a snapshot of the policy and write the transitions to a SharedMemmapDictReplayBuffer
+        in folder, each to a shard of its own. The learner samples all shards and only trains, publishing a policy
+        snapshot every sync_period gradient steps. The learner keeps the ratio of gradient steps to environment steps
+        of the agent, and runs the callbacks for every step taken by the workers.
+
+        :param folder: Folder of the shared replay buffer and the policy snapshots
+        :type folder: str
+        :param n_workers: Number of rollout workers
+        :type n_workers: int
+        :param sync_period: Steps between policy snapshots, in gradient steps of the learner and in environment steps
+            of the workers
+        :type sync_period: int
+        :param worker_args: Arguments of build_worker, it must be picklable as the workers are spawned
+        :type worker_args: Tuple
+        :param build_worker: Builds the agent of a worker from worker_args and the keyword arguments folder, worker
+            and n_workers, defaults to build_worker_agent
+        :type build_worker: Callable[..., BaseAlgorithm]
+        """
+        self.folder = folder
+        self.n_workers = n_workers
+        self.sync_period = sync_period
+        self.worker_args = worker_args
+        self.build_worker = build_worker
+
+    @staticmethod
+    def agent_folder(output_checkpoint_folder: str, agent_name: str) -> str:
+        return os.path.join(output_checkpoint_folder, "rollout_workers", agent_name)
+
+    def publish(self, model: BaseAlgorithm):
+        tmp_path = os.path.join(self.folder, POLICY_SNAPSHOT + ".tmp")
+        th.save(model.policy.state_dict(), tmp_path)
+        os.replace(tmp_path, os.path.join(self.folder, POLICY_SNAPSHOT))
+
+    @staticmethod
+    def check_workers(workers):
+        for i, worker in enumerate(workers):
+            if not worker.is_alive():
+                raise RuntimeError("Rollout worker {} stopped with exit code {}".format(i, worker.exitcode))
+
+    def learn(
+        self,
+        model: BaseAlgorithm,
+        total_timesteps: int,
+        callback: Optional[BaseCallback] = None,
+        reset_num_timesteps: bool = True,
+    ) -> BaseAlgorithm:
+        """
+        Train the model on the transitions of the rollout workers, like ``model.learn``.
+
+        :param model: Off-policy model with a SharedMemmapDictReplayBuffer in the folder of the trainer
+        :type model: BaseAlgorithm
+        :param total_timesteps: Number of environment steps of the workers
+        :type total_timesteps: int
+        :param callback: Called for every environment step, defaults to None
+        :type callback: Optional[BaseCallback]
+        :param reset_num_timesteps: Whether to reset the step count of the model, defaults to True
+        :type reset_num_timesteps: bool
+        :return: The trained model
+        :rtype: BaseAlgorithm
+        """
+        total_timesteps, callback = model._setup_learn(total_timesteps, callback, reset_num_timesteps)
+        callback.on_training_start(locals(), globals())
+
+        os.makedirs(self.folder, exist_ok=True)
+        self.publish(model)
+
+        context = multiprocessing.get_context("spawn")
+        stop = context.Event()
+        counters = [context.Value("q", 0, lock=False) for _ in range(self.n_workers)]
+        workers = [
+            context.Process(
+                target=rollout_worker,
+                args=(self.build_worker, self.worker_args, self.folder, i, self.n_workers, self.sync_period),
+                kwargs=dict(counter=counters[i], stop=stop),
+                daemon=True,
+            )
+            for i in range(self.n_workers)
+        ]
+
+        start_timesteps = model.num_timesteps
+        first_update = max(start_timesteps, model.learning_starts)
+        gradient_steps = max(1, model.gradient_steps)
+        n_updates = 0
+        last_published = 0
+        try:
+            for worker in workers:
+                worker.start()
+
+            continue_training = True
+            while continue_training and model.num_timesteps < total_timesteps:
+                steps = min(total_timesteps, start_timesteps + sum(counter.value for counter in counters))
+                while continue_training and model.num_timesteps < steps:
+                    model.num_timesteps += 1
+                    continue_training = callback.on_step()
+                if not continue_training:
+                    break
+
+                pending = (model.num_timesteps - first_update) * gradient_steps - n_updates
+                if pending <= 0 or model.replay_buffer.shared_size() < model.batch_size:
+                    self.check_workers(workers)
+                    time.sleep(0.01)
+                    continue
+
+                gradient_steps_now = min(pending, self.sync_period)
+                model._update_current_progress_remaining(model.num_timesteps, total_timesteps)
+                model.train(gradient_steps=gradient_steps_now, batch_size=model.batch_size)
+                n_updates += gradient_steps_now
+                if n_updates - last_published >= self.sync_period:
+                    self.publish(model)
+                    last_published = n_updates
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join(timeout=60)
+                if worker.is_alive():
+                    worker.terminate()
+
+        callback.on_training_end()
+        return model
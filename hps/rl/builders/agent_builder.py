@@ -1,8 +1,9 @@
 import numpy as np
-from typing import Callable
+from typing import Callable, Optional
 import os
 
 from hps.rl.environment.hsenvironment import HSEnvironment
+from hps.rl.sac.replay_buffer import MemmapDictReplayBuffer, ReplayBufferCheckpoint, SharedMemmapDictReplayBuffer
 from hps.rl.sac.time_feature_extractor import (
     TimeFourierFeatureExtractor,
     CustomCombinedExtractor,
@@ -10,6 +11,8 @@ from hps.rl.sac.time_feature_extractor import (
 )
 from hps.rl.environment.observations_generator import ObservationsGenerator
 from hps.rl.settings import ObservationSettings, SacSettings, AgentAlgorithm
+from hps.rl.training_checkpoint import TrainingCheckpoint
+from hps.rl.population_training import make_vec_env
 from hps.rl.environment.hscomponents import HSystem
 
 from stable_baselines3 import SAC, A2C, TD3, PPO, DDPG
@@ -31,20 +34,107 @@ class AgentBuilder:
         train_env: HSEnvironment,
         observations_generator: ObservationsGenerator,
         initial_steps_to_collect: int,
+        buffer_size: int = 1_000_000,
+        use_memmap_replay_buffer: bool = False,
+        shared_replay_buffer_folder: Optional[str] = None,
+        replay_buffer_shard: int = 0,
+        n_envs: int = 1,
     ):
         self.sac_params = sac_params
         self.algoritm = algoritm
         self.train_env = train_env
         self.observations_generator = observations_generator
         self.initial_steps_to_collect = initial_steps_to_collect
-
-    def build(self, num_actions, output_checkpoint_folder, input_checkpoint_folder):
+        self.buffer_size = buffer_size
+        self.use_memmap_replay_buffer = use_memmap_replay_buffer
+        self.shared_replay_buffer_folder = shared_replay_buffer_folder
+        self.replay_buffer_shard = replay_buffer_shard
+        self.n_envs = n_envs
+        # Copies of the train environment are stepped together, each step adds n_envs transitions
+        self.env = train_env if n_envs == 1 else make_vec_env(train_env, n_envs)
+
+    def replay_buffer_args(self, output_checkpoint_folder) -> dict:
+        """
+        Replay buffer arguments given to the off-policy algorithms.
+        """
+        args = dict(buffer_size=self.buffer_size)
+        if self.shared_replay_buffer_folder is not None:
+            args["replay_buffer_class"] = SharedMemmapDictReplayBuffer
+            args["replay_buffer_kwargs"] = dict(path=self.shared_replay_buffer_folder, shard=self.replay_buffer_shard)
+        elif self.use_memmap_replay_buffer:
+            args["replay_buffer_class"] = MemmapDictReplayBuffer
+            args["replay_buffer_kwargs"] = dict(path=os.path.join(output_checkpoint_folder, "replay_buffer_data"))
+        return args
+
+    @staticmethod
+    def find_replay_buffer(checkpoint_folder):
+        """
+        Find the replay buffer checkpoint written by the evaluation callback, or a pickled replay buffer saved by
+        older versions.
+
+        :return: Path of the checkpoint folder or the pickled replay buffer, or None if no replay buffer is saved.
+        :rtype: Optional[str]
+        """
+        checkpoint_path = os.path.join(checkpoint_folder, "tb_logs", "eval", "evaluations", "replay_buffer")
+        if ReplayBufferCheckpoint.exists(checkpoint_path):
+            return checkpoint_path
+
+        candidates = [
+            os.path.join(checkpoint_folder, "replay_buffer.pkl"),
+            os.path.join(checkpoint_folder, "tb_logs", "eval", "evaluations", "replay_buffer.pkl"),
+        ]
+        candidates = [path for path in candidates if os.path.isfile(path)]
+        if not candidates:
+            return None
+        return max(candidates, key=os.path.getmtime)
+
+    def resume(self, training_checkpoint: TrainingCheckpoint, output_checkpoint_folder):
+        """
+        Load the agent of a training checkpoint, with its optimizers, replay buffer and random generator states.
+        """
+        algorithms = {
+            AgentAlgorithm.SAC: SAC,
+            AgentAlgorithm.A2C: A2C,
+            AgentAlgorithm.TD3: TD3,
+            AgentAlgorithm.PPO: PPO,
+            AgentAlgorithm.DDPG: DDPG,
+        }
+        kwargs = {}
+        if self.algoritm not in (AgentAlgorithm.A2C, AgentAlgorithm.PPO):
+            kwargs = self.replay_buffer_args(output_checkpoint_folder)
+        return training_checkpoint.load(algorithms[self.algoritm], self.env, **kwargs)
+
+    def build(self, num_actions, output_checkpoint_folder, input_checkpoint_folder, keep_buffer=False):
 
         if input_checkpoint_folder is not None:
-            agent = SAC.load(os.path.join(input_checkpoint_folder, "best_model"))
-            agent.set_env(self.train_env)
-            agent.tau = self.sac_params.target_update_tau
-            agent.learning_rate = self.sac_params.actor.learning_rate
+            if keep_buffer and os.path.abspath(input_checkpoint_folder) == os.path.abspath(output_checkpoint_folder):
+                raise ValueError(
+                    "The agent continues from the buffer in {}, it needs an output folder of its own.".format(
+                        input_checkpoint_folder
+                    )
+                )
+            # Use the replay buffer of this agent, and not the one of the agent in the checkpoint. The learning rate
+            # schedule is set up from the learning rate given here, and applied to the optimizers when training.
+            agent = SAC.load(
+                os.path.join(input_checkpoint_folder, "best_model"),
+                env=self.env,
+                learning_rate=self.sac_params.actor.learning_rate,
+                tau=self.sac_params.target_update_tau,
+                **self.replay_buffer_args(output_checkpoint_folder),
+            )
+
+            # A shared buffer is already live, and does not need to be loaded
+            replay_buffer_path = None
+            if keep_buffer and self.shared_replay_buffer_folder is None:
+                replay_buffer_path = self.find_replay_buffer(input_checkpoint_folder)
+            if replay_buffer_path is not None:
+                if ReplayBufferCheckpoint.exists(replay_buffer_path):
+                    agent.replay_buffer = ReplayBufferCheckpoint(replay_buffer_path).load(agent.replay_buffer)
+                    agent.replay_buffer.device = agent.device
+                else:
+                    agent.load_replay_buffer(replay_buffer_path)
+                if isinstance(agent.replay_buffer, MemmapDictReplayBuffer):
+                    agent.replay_buffer.copy_to(os.path.join(output_checkpoint_folder, "replay_buffer_data"))
             return agent
 
         mu = np.zeros(num_actions)
@@ -53,7 +143,7 @@ class AgentBuilder:
         sigma = np.ones(num_actions) * 0.4
         action_noise = OrnsteinUhlenbeckActionNoise(mu, sigma)
 
-        gradient_steps = 1  # train_intervals // 256 + 1
+        gradient_steps = self.n_envs  # One per transition, train_intervals // 256 + 1
         tb_log_folder = output_checkpoint_folder + "/tb_logs"
 
         policy = "MultiInputPolicy"
@@ -86,7 +176,7 @@ class AgentBuilder:
             )
             agent = SAC(
                 policy,
-                self.train_env,
+                self.env,
                 verbose=1,
                 policy_kwargs=policy_kwargs,
                 gradient_steps=gradient_steps,
@@ -98,18 +188,31 @@ class AgentBuilder:
                 target_update_interval=self.sac_params.target_update_period,
                 action_noise=action_noise,
                 tensorboard_log=tb_log_folder,
+                **self.replay_buffer_args(output_checkpoint_folder),
             )
         elif self.algoritm == AgentAlgorithm.A2C:
-            agent = A2C(policy, self.train_env, verbose=1, tensorboard_log=tb_log_folder)
+            agent = A2C(policy, self.env, verbose=1, tensorboard_log=tb_log_folder)
         elif self.algoritm == AgentAlgorithm.TD3:
             agent = TD3(
-                policy, self.train_env, verbose=1, gamma=1.0, action_noise=action_noise, tensorboard_log=tb_log_folder
+                policy,
+                self.env,
+                verbose=1,
+                gamma=1.0,
+                action_noise=action_noise,
+                tensorboard_log=tb_log_folder,
+                **self.replay_buffer_args(output_checkpoint_folder),
             )
         elif self.algoritm == AgentAlgorithm.PPO:
-            agent = PPO(policy, self.train_env, verbose=1, tensorboard_log=tb_log_folder)
+            agent = PPO(policy, self.env, verbose=1, tensorboard_log=tb_log_folder)
         elif self.algoritm == AgentAlgorithm.DDPG:
             agent = DDPG(
-                policy, self.train_env, verbose=1, gamma=1.0, action_noise=action_noise, tensorboard_log=tb_log_folder
+                policy,
+                self.env,
+                verbose=1,
+                gamma=1.0,
+                action_noise=action_noise,
+                tensorboard_log=tb_log_folder,
+                **self.replay_buffer_args(output_checkpoint_folder),
             )
 
         if input_checkpoint_folder is not None:
@@ -91,6 +91,7 @@ class EnvironmentBuilder:
             is_eval=True,
             seed=self.run_settings.forecast_sampling_seed,
             n_clusters=None,
+            n_eval_scenarios=self.run_settings.n_eval_scenarios,
         )
 
         return train_inflow_price_sampler, eval_inflow_price_sampler
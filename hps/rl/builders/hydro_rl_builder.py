@@ -12,6 +12,27 @@ from hps import HydroSystem, Discharge, Reservoir, Gate
 
 
 class HydroRLBuilder:
+    @staticmethod
+    def get_adjacency(hydro_system: HydroSystem):
+        """
+        Parent and child nodes of every node in the hydro system.
+
+        The neighbours are ordered by node insertion order, which is the order they are found in when
+        iterating over `HydroSystem.my_edges`.
+
+        :param hydro_system: A hydro system instance
+        :return: Tuple of dictionaries (parents, children) with nodes as keys and lists of nodes as values.
+        """
+        node_order = {node: i for i, node in enumerate(hydro_system.nodes)}
+
+        parents = {}
+        children = {}
+        for node in node_order:
+            parents[node] = sorted(hydro_system.predecessors(node), key=node_order.__getitem__)
+            children[node] = sorted(hydro_system.successors(node), key=node_order.__getitem__)
+
+        return parents, children
+
     @staticmethod
     def Build(hydro_system: HydroSystem):
 
@@ -22,6 +43,8 @@ class HydroRLBuilder:
         if hydro_system.creeks:
             raise NotImplementedError("Creek not implemented in 'HSystem'")
 
+        parents, children = HydroRLBuilder.get_adjacency(hydro_system)
+
         spill = dict()
         for spi in hydro_system.spillages:
             spill[spi.parent] = Spill(
@@ -70,14 +93,13 @@ class HydroRLBuilder:
             print("{0}  {1:.5f} {2:.5f}".format(station.name, gen_fun.q_min, gen_fun.q_max))
 
         for gate in hydro_system.gates:
-            upper_reservoirs = [f.parent.name for f in hydro_system.my_edges if f.child.name == gate.name]
-            station = [f.child.name for f in hydro_system.my_edges if f.parent.name == gate.name]
+            upper_reservoirs = [node.name for node in parents[gate]]
+            station = children[gate]
             assert len(station) == 1
-            station = stations[station[0]]
-
-            lower_res = [f.child.name for f in hydro_system.my_edges if f.parent.name == station.name]
+            lower_res = children[station[0]]
             assert len(lower_res) == 1
-            lower_res = lower_res[0]
+            station = stations[station[0].name]
+            lower_res = lower_res[0].name
 
             power_station_actions = [
                 StationAction(i + "_" + station.name + "_" + lower_res, reservoirs[i], station, reservoirs[lower_res])
@@ -87,31 +109,35 @@ class HydroRLBuilder:
             pick_action = PickGateAction(gate.name, power_station_actions)
             actions.append(pick_action)
 
-        for edge in hydro_system.my_edges:
-            if isinstance(edge, Discharge):
-                if isinstance(edge.child, Reservoir) and isinstance(edge.parent, Reservoir):
+        for edge in hydro_system.discharges:
+            if isinstance(edge.child, Reservoir) and isinstance(edge.parent, Reservoir):
 
-                    upper_res = reservoirs[edge.parent.name]
-                    lower_res = reservoirs[edge.child.name]
-                    name = edge.parent.name + "_" + edge.child.name
-                    actions.append(
-                        DischargeAction(name=name, upper_res=upper_res, lower_res=lower_res, max_flow=edge.max_flow)
-                    )
+                upper_res = reservoirs[edge.parent.name]
+                lower_res = reservoirs[edge.child.name]
+                name = edge.parent.name + "_" + edge.child.name
+                actions.append(
+                    DischargeAction(name=name, upper_res=upper_res, lower_res=lower_res, max_flow=edge.max_flow)
+                )
 
         for ps in hydro_system.power_stations:
-            upper_reservoirs = [f.parent for f in hydro_system.my_edges if f.child.name == ps.name]
+            upper_reservoirs = parents[ps]
             assert len(upper_reservoirs) == 1
             upper_res = upper_reservoirs[0]
             if isinstance(upper_res, Gate):
                 continue
 
-            lower_res = [f.child for f in hydro_system.my_edges if f.parent.name == ps.name]
+            lower_res = children[ps]
             assert len(lower_res) == 1
             lower_res = lower_res[0]
 
             name = upper_res.name + "_" + ps.name + "_" + lower_res.name
             actions.append(
-                StationAction(name=name, upper_res=upper_res, station=stations[ps.name], lower_res=lower_res)
+                StationAction(
+                    name=name,
+                    upper_res=reservoirs[upper_res.name],
+                    station=stations[ps.name],
+                    lower_res=reservoirs[lower_res.name],
+                )
             )
 
         return HSystem(list(reservoirs.values()), list(stations.values()), actions)
@@ -9,16 +9,19 @@ from hps.rl.environment.end_value_calculation import (
 )
 from hps.rl.builders.agent_builder import AgentBuilder
 from hps.rl.builders.environment_builder import EnvironmentBuilder
+from hps.rl.environment.exploration_policy import create_exploration_policy
 from hps.rl.logging.agent_plugin import AgentPlugin
 from hps.rl.agent_runner import AgentRunner
+from hps.rl.async_training import AsyncTrainer
+from hps.rl.population_training import copy_env
 from hps.rl.settings import RunSettingsSerializer
+from hps.rl.training_checkpoint import TrainingCheckpoint
 
 import numpy as np
 import tensorflow as tf
 import random as rand
 
-from server.db_connection import create_engine
-from sqlalchemy.orm import sessionmaker
+from server.db_connection import create_session
 from server.model import ProjectRun
 
 from core.value_scaler import Discounter, PriceScaler, RewardScaler
@@ -47,15 +50,116 @@ class RlBuilder:
 
     @staticmethod
     def create_session():
-        engine = create_engine()
-        Session = sessionmaker(bind=engine)
-        return Session()
+        return create_session()
 
-    def build(self, plugin: AgentPlugin, train_plugin: TensorboardTrainLogger = None):
+    def build(self, plugin: AgentPlugin, train_plugin: TensorboardTrainLogger = None, resume: bool = False):
+        """
+        Build the environments and the agent.
+
+        :param resume: Continue from the training checkpoint of the agent if there is one, defaults to False
+        :type resume: bool
+        """
         self.random_init(self.agent_settings.seed)
 
         session = RlBuilder.create_session()
+        internal_train_env, internal_eval_env, train_observation_generator = self.build_environments(session)
+        return self.build_runner(
+            plugin, internal_train_env, internal_eval_env, train_observation_generator, resume=resume
+        )
+
+    @staticmethod
+    def build_population(run_settings, agent_settings_list, project_run, plugins, resume: bool = False):
+        """
+        Build the agents of a population trained in one process, see AgentRunner.run_population. The environments
+        are built once, each agent steps copies of the train environment and the agents share the evaluation
+        environment, as they are evaluated one after the other.
+
+        :param agent_settings_list: Settings of each agent
+        :param plugins: Plugin of each agent
+        :param resume: Continue from the training checkpoints of the agents, defaults to False
+        :type resume: bool
+        :return: Runner of each agent
+        :rtype: List[AgentRunner]
+        """
+        if run_settings.rollout_workers:
+            raise ValueError("'rollout_workers' can not be combined with 'agents_per_process'.")
+
+        builders = [RlBuilder(run_settings, agent_settings, project_run) for agent_settings in agent_settings_list]
+        builders[0].random_init(agent_settings_list[0].seed)
+        session = RlBuilder.create_session()
+        internal_train_env, internal_eval_env, train_observation_generator = builders[0].build_environments(session)
+
+        runners = []
+        for i, (builder, plugin) in enumerate(zip(builders, plugins)):
+            builder.random_init(builder.agent_settings.seed)
+            train_env = internal_train_env
+            if i > 0:
+                # Environment j of agent i samples with seed forecast_sampling_seed + i * envs_per_agent + j
+                seed = run_settings.forecast_sampling_seed + i * run_settings.envs_per_agent
+                train_env = copy_env(internal_train_env, seed)
+            runners.append(
+                builder.build_runner(
+                    plugin, train_env, internal_eval_env, train_env.observations_generator, resume=resume
+                )
+            )
+        return runners
+
+    def build_runner(
+        self, plugin: AgentPlugin, internal_train_env, internal_eval_env, train_observation_generator, resume=False
+    ):
+        """
+        Build the agent on the environments.
+        """
+        agent_builder = self.build_agent_builder(internal_train_env, train_observation_generator)
+
+        async_trainer = None
+        if self.run_settings.rollout_workers:
+            folder = AsyncTrainer.agent_folder(self.agent_settings.output_checkpoint_folder, self.agent_settings.name)
+            async_trainer = AsyncTrainer(
+                folder,
+                self.run_settings.rollout_workers,
+                self.run_settings.policy_sync_period,
+                worker_args=(self.run_settings, self.agent_settings, self.project_run_id),
+            )
+            # The learner samples the transitions written by the workers, each to a shard of its own
+            agent_builder.shared_replay_buffer_folder = folder
+            agent_builder.replay_buffer_shard = self.run_settings.rollout_workers
+
+        num_actions = internal_train_env.hydro_system.get_num_actions()
+
+        training_checkpoint = TrainingCheckpoint(
+            TrainingCheckpoint.agent_folder(self.agent_settings.output_checkpoint_folder, self.agent_settings.name)
+        )
+        resume_state = None
+        if resume and training_checkpoint.exists():
+            resume_state = training_checkpoint.load_state()
+            agent = agent_builder.resume(training_checkpoint, self.agent_settings.output_checkpoint_folder)
+        else:
+            agent = agent_builder.build(
+                num_actions,
+                self.agent_settings.output_checkpoint_folder,
+                self.agent_settings.start_checkpoint_folder,
+                keep_buffer=self.agent_settings.keep_buffer_from_start_checkpoint,
+            )
+
+        return AgentRunner(
+            self.run_settings,
+            self.agent_settings,
+            agent,
+            internal_train_env,
+            internal_eval_env,
+            plugin,
+            training_checkpoint=training_checkpoint,
+            resume_state=resume_state,
+            async_trainer=async_trainer,
+        )
+
+    def build_environments(self, session):
+        """
+        Build the train and the evaluation environments of the agent.
 
+        :return: Train environment, evaluation environment and the observations generator of the train environment
+        """
         env_builder = EnvironmentBuilder(self.run_settings, self.project_run.ForecastId)
         train_time_indexer, eval_time_indexer = env_builder.build_time_indexers(session)
         train_inflow_price_sampler, eval_inflow_price_sampler = env_builder.build_samplers(
@@ -123,22 +227,6 @@ class RlBuilder:
             initial_collect_episodes=self.agent_settings.episodes_to_initially_collect,
         )
 
-        sac_params = self.run_settings.sac_settings
-
-        agent_builder = AgentBuilder(
-            self.run_settings.agent_algorithm,
-            sac_params,
-            internal_train_env,
-            train_observation_generator,
-            initial_steps_to_collect=self.agent_settings.episodes_to_initially_collect
-            * self.run_settings.train_intervals,
-        )
-
-        num_actions = internal_train_env.hydro_system.get_num_actions()
-
-        agent = agent_builder.build(
-            num_actions, self.agent_settings.output_checkpoint_folder, self.agent_settings.start_checkpoint_folder
-        )
         agent_q = None
         # if self.agent_settings.q_value_checkpoint_folder:
         #     agent_q = agent_builder.build(self.agent_settings.q_value_checkpoint_folder)
@@ -151,8 +239,29 @@ class RlBuilder:
             self.run_settings.end_energy_price,
             agent_q,
         )
+        return internal_train_env, internal_eval_env, train_observation_generator
 
-        return AgentRunner(self.run_settings, self.agent_settings, agent, internal_train_env, internal_eval_env, plugin)
+    def build_agent_builder(self, internal_train_env, train_observation_generator):
+        sac_params = self.agent_settings.sac_settings or self.run_settings.sac_settings
+        internal_train_env.action_space.exploration_policy = create_exploration_policy(
+            self.run_settings.exploration_policy, internal_train_env.action_space
+        )
+
+        return AgentBuilder(
+            self.run_settings.agent_algorithm,
+            sac_params,
+            internal_train_env,
+            train_observation_generator,
+            initial_steps_to_collect=self.agent_settings.episodes_to_initially_collect
+            * self.run_settings.train_intervals,
+            buffer_size=self.agent_settings.episodes_stored_in_buffer * internal_train_env.time_indexer.length,
+            use_memmap_replay_buffer=self.run_settings.use_memmap_replay_buffer,
+            shared_replay_buffer_folder=self.agent_settings.shared_replay_buffer_folder
+            if self.run_settings.use_shared_replay_buffer
+            else None,
+            replay_buffer_shard=self.agent_settings.replay_buffer_shard,
+            n_envs=self.run_settings.envs_per_agent,
+        )
 
     def init_end_value_calculation(
         self, session, internal_train_env, internal_eval_env, maximum_production, end_energy_price, tf_agent_q
@@ -0,0 +1,21 @@
+from typing import Sequence
+
+from core.data_structures import MyDataFrame
+
+
+class EvalRecorder(MyDataFrame):
+    """
+    Records the evaluation report of an episode, one row per step. The columns are fixed when the recorder is
+    created, and ``recorder[col]`` is a view of the column in the value matrix.
+    """
+
+    def record(self, step: int, values: Sequence[float]):
+        """
+        Write the values of all columns for a step.
+
+        :param step: Step
+        :type step: int
+        :param values: Values in the column order
+        :type values: Sequence[float]
+        """
+        self.values[step] = values
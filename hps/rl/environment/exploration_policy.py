@@ -0,0 +1,133 @@
+from typing import List, Optional
+
+import numpy as np
+
+from hps.rl.environment.hscomponents import DischargeAction, HSystem, PickGateAction, StationAction
+from hps.rl.settings import ExplorationPolicyType
+
+
+def station_action_indices(hydro_system: HSystem) -> List[int]:
+    """
+    Positions of the station actions in the action vector of the hydro system.
+    """
+    indices = []
+    action_index = 0
+    for a in hydro_system.sorted_actions:
+        if isinstance(a, StationAction):
+            indices.append(action_index)
+            action_index += 1
+        elif isinstance(a, PickGateAction):
+            action_index += len(a.input_actions) + 1
+        elif isinstance(a, DischargeAction):
+            action_index += 1
+    return indices
+
+
+def price_rank_masks(prices: np.ndarray):
+    """
+    Steps of an episode among the half with the highest prices, and among the tenth with the highest prices.
+
+    :param prices: Energy price of each step
+    :type prices: np.ndarray
+    :return: Masks of the good and of the best price steps
+    :rtype: Tuple[np.ndarray, np.ndarray]
+    """
+    num_steps = len(prices)
+    order = np.argsort(prices)
+    good = np.zeros(num_steps, dtype=bool)
+    best = np.zeros(num_steps, dtype=bool)
+    good[order[-num_steps // 2 :]] = True
+    best[order[-num_steps // 10 :]] = True
+    return good, best
+
+
+class PricePrimerPolicy:
+    """
+    Heuristic exploration policy priming the replay buffer with sensible production plans. The stations produce at
+    full capacity in the tenth of the steps with the highest prices, in the half with the highest prices when the
+    reservoirs are getting full, and otherwise only when the reservoirs are about to spill. Other actions are
+    uniformly random.
+
+    The actions of many environments are computed together. The price rank masks are computed once per episode of
+    each environment, and the relative volume is read from the reservoirs of the hydro system.
+
+    :param low: Lower bound of the actions
+    :type low: np.ndarray
+    :param high: Upper bound of the actions
+    :type high: np.ndarray
+    :param rng: Random generator of the other actions, defaults to None for a generator seeded from numpy
+    :type rng: Optional[np.random.Generator]
+    """
+
+    def __init__(self, low: np.ndarray, high: np.ndarray, rng: Optional[np.random.Generator] = None):
+        self.low = low
+        self.high = high
+        self.rng = rng or np.random.default_rng(np.random.randint(2**31))
+        self.station_indices = None
+        self.prices = []  # Price of the episode the masks of each environment are computed for
+        self.good = self.best = None
+        self.reservoirs = []
+        self.max_volumes = None
+
+    def _update_episodes(self, envs):
+        if self.station_indices is None:
+            self.station_indices = station_action_indices(envs[0].hydro_system)
+            reservoirs = [r for r in envs[0].hydro_system.reservoirs if not r.is_ocean]
+            self.max_volumes = np.array([r.max_volume for r in reservoirs])
+
+        if len(self.prices) != len(envs):
+            num_steps = len(envs[0].current_price)
+            self.prices = [None] * len(envs)
+            self.good = np.zeros((len(envs), num_steps), dtype=bool)
+            self.best = np.zeros((len(envs), num_steps), dtype=bool)
+            self.reservoirs = [[r for r in env.hydro_system.reservoirs if not r.is_ocean] for env in envs]
+
+        for i, env in enumerate(envs):
+            if env.current_price is not self.prices[i]:
+                self.good[i], self.best[i] = price_rank_masks(np.asarray(env.current_price))
+                self.prices[i] = env.current_price
+
+    def relative_volumes(self) -> np.ndarray:
+        volumes = np.array([[r.current_volume for r in reservoirs] for reservoirs in self.reservoirs])
+        return (volumes / self.max_volumes).mean(axis=1)
+
+    def __call__(self, envs) -> np.ndarray:
+        """
+        Actions of the environments for their current step.
+
+        :param envs: Hydro system environments, possibly wrapped
+        :type envs: List[HSEnvironment]
+        :return: Actions with the shape (n_envs, action_dim)
+        :rtype: np.ndarray
+        """
+        envs = [getattr(env, "unwrapped", env) for env in envs]
+        self._update_episodes(envs)
+
+        actions = self.rng.uniform(self.low, self.high, size=(len(envs),) + self.low.shape)
+        if not self.station_indices:
+            return actions
+
+        rows = np.arange(len(envs))
+        steps = np.array([env.current_step for env in envs])
+        good, best = self.good[rows, steps], self.best[rows, steps]
+        relvol = self.relative_volumes()
+        production = np.select(
+            [best, good & (relvol > 0.8), good & (relvol > 0.7), good, relvol > 0.95],
+            [1.0, 0.8, 0.5, 0.0, 1.0],
+            default=0.0,
+        )
+        actions[:, self.station_indices] = production[:, None]
+        return actions
+
+
+def create_exploration_policy(policy_type: ExplorationPolicyType, action_space):
+    """
+    Exploration policy used for the initially collected episodes.
+
+    :return: The policy, or None for uniformly random actions
+    """
+    if policy_type == ExplorationPolicyType.Uniform:
+        return None
+    elif policy_type == ExplorationPolicyType.PricePrimer:
+        return PricePrimerPolicy(action_space.low, action_space.high)
+    raise NotImplementedError("Exploration policy '{}' not implemented.".format(policy_type))
@@ -25,8 +25,10 @@ class HSComponent(object):
     def report(self):
         pass
 
-    @abstractmethod
-    def report_state(self, state):
+    def report_getters(self, getters):
+        """
+        Add a getter for each value reported by the component. A getter is called with the actions of the agent.
+        """
         pass
 
 
@@ -77,13 +79,13 @@ class Res(HSComponent):
             # mean_vol = round(mean_vol, 3) # Had some numerical issues with volume beeing slightly above max
             return self.head.get_head(mean_vol)
 
-    def report_state(self, state):
+    def report_getters(self, getters):
         if self.is_ocean:
             return
 
-        state[self.name] = self.current_volume
-        state[ReportName.spillage + self.spillage.get_name()] = self.spillage.get_value()
-        state[ReportName.water_value + self.name] = 0.0  # to be monkeypatched in evaluation loop
+        getters[self.name] = lambda actions: self.current_volume
+        getters[ReportName.spillage + self.spillage.get_name()] = lambda actions: self.spillage.get_value()
+        getters[ReportName.water_value + self.name] = lambda actions: 0.0  # to be monkeypatched in evaluation loop
 
     def report(self):
         if not self.is_ocean:
@@ -133,9 +135,9 @@ class Station(HSComponent):
     def get_value(self):
         return self.input
 
-    def report_state(self, state):
-        state[ReportName.power + self.name] = self.production
-        state[ReportName.discharge + self.name] = self.discharge
+    def report_getters(self, getters):
+        getters[ReportName.power + self.name] = lambda actions: self.production
+        getters[ReportName.discharge + self.name] = lambda actions: self.discharge
 
     def report(self):
         print(self.gen_func)
@@ -176,13 +178,12 @@ class PickGateAction(HSComponent):
     def get_value(self):
         return self.reward
 
-    def report_state(self, state):
-        action_index = np.argmax(self.last_actions)
-        state[ReportName.picked_gate + self.name] = action_index
-        state[ReportName.reward + self.name] = self.input_actions[action_index].reward
-        state[ReportName.decision_gate + self.name] = self.last_dec_action
+    def report_getters(self, getters):
+        getters[ReportName.picked_gate + self.name] = lambda actions: np.argmax(self.last_actions)
+        getters[ReportName.reward + self.name] = lambda actions: self.input_actions[np.argmax(self.last_actions)].reward
+        getters[ReportName.decision_gate + self.name] = lambda actions: self.last_dec_action
         for a in self.input_actions:
-            a.report_state(state)
+            a.report_getters(getters)
 
     def report(self):
         for a in self.input_actions:
@@ -215,8 +216,8 @@ class DischargeAction(HSComponent):
     def get_value(self):
         return self.reward
 
-    def report_state(self, state):
-        state[ReportName.reward + self.name] = self.reward
+    def report_getters(self, getters):
+        getters[ReportName.reward + self.name] = lambda actions: self.reward
 
     def report(self):
         print(
@@ -276,8 +277,8 @@ class StationAction(HSComponent):
     def get_value(self):
         return self.reward
 
-    def report_state(self, state):
-        state[ReportName.reward + self.name] = self.reward
+    def report_getters(self, getters):
+        getters[ReportName.reward + self.name] = lambda actions: self.reward
 
     def report(self):
         print(
@@ -376,8 +377,8 @@ class Spill(HSComponent):
     def get_name(self):
         return self.name
 
-    def report_state(self, state):
-        state[ReportName.reward + self.name] = self.reward
+    def report_getters(self, getters):
+        getters[ReportName.reward + self.name] = lambda actions: self.reward
 
     def execute(self, energy_equivalent):
         self.reward = -self.price_of_spillage * self.value * energy_equivalent * 10**3  # [EUR]
@@ -411,9 +412,6 @@ class VariableInflowAction(HSComponent):
     def get_value(self):
         return self.reward
 
-    def report_state(self, state):
-        pass
-
     def report(self):
         print(
             '{2} = VariableInflowAction(name="{2}", res={0}, yearly_inflow={1:.9f})'.format(
@@ -529,39 +527,45 @@ class HSystem:
     def report_state(self, actions):
         """
         :param actions: Actions provided by the agent.
+        :return: Dictionary with the values of ``report_getters``
+        :rtype: Dict[str, Any]
+        """
+        return {name: getter(actions) for name, getter in self.report_getters().items()}
+
+    def report_getters(self):
         """
-        state = {}
+        Getters for the values reported in each step, in the order of the report columns. Each getter is called with
+        the actions provided by the agent.
+
+        :return: Dictionary with the report names as keys and getters as values
+        :rtype: Dict[str, Callable]
+        """
+        getters = {}
 
         for res in self.reservoirs:
-            res.report_state(state)
+            res.report_getters(getters)
 
         for stat in self.stations:
-            stat.report_state(state)
+            stat.report_getters(getters)
+
+        def agent_getter(index):
+            return lambda actions: actions[index]
 
         action_index = 0
         for a in self.sorted_actions:
-            a.report_state(state)
-            if isinstance(a, StationAction):
-                val = actions[action_index]
-                state[ReportName.agent + a.name] = val
-                action_index += 1
-            elif isinstance(a, DischargeAction):
-                val = actions[action_index]
-                state[ReportName.agent + a.name] = val
+            a.report_getters(getters)
+            if isinstance(a, (StationAction, DischargeAction)):
+                getters[ReportName.agent + a.name] = agent_getter(action_index)
                 action_index += 1
             elif isinstance(a, PickGateAction):
-                sub_actions = actions[action_index : action_index + len(a.input_actions)]
-                used_action = np.argmax(sub_actions)
-
-                for sub_index, sub_a in enumerate(a.input_actions):
-                    val = actions[action_index]
-                    state[ReportName.agent + sub_a.name] = val
+                for sub_a in a.input_actions:
+                    getters[ReportName.agent + sub_a.name] = agent_getter(action_index)
                     action_index += 1
 
                 # Increment for dec action
                 action_index += 1
 
-        return state
+        return getters
 
     def report(self):
         print("#Reservoirs")
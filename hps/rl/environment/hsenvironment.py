@@ -12,9 +12,36 @@ from hps.rl.environment.observations_generator import ObservationsGenerator, Obs
 from hps.rl.environment.end_value_calculation import EmptyEndValueCalculation, ProvidedPriceEndValueCalculation
 from core.timeindex import ITimeIndexer
 from core.data_structures import MyDataFrame
+from hps.rl.environment.eval_recorder import EvalRecorder
 from hps.custom_box import CustomBox
 
 
+class EpisodeContext:
+    def __init__(self, scaled_price, inflows):
+        """
+        Values of an episode that do not depend on the actions, computed for all steps when the episode is reset.
+
+        :param scaled_price: Scaled energy price for each step
+        :type scaled_price: List[float]
+        :param inflows: Inflow to each reservoir for each step [m3/s]
+        :type inflows: List[Dict[str, float]]
+        """
+        self.scaled_price = scaled_price
+        self.inflows = inflows
+
+    @staticmethod
+    def create(current_price, current_inflow, price_scaler):
+        names = list(current_inflow)
+        if names:
+            inflow = np.array([current_inflow[name] for name in names], dtype=np.float64)
+            inflows = [dict(zip(names, values)) for values in inflow.T.tolist()]
+        else:
+            inflows = [{} for _ in range(len(current_price))]
+
+        scaled_price = np.asarray(price_scaler.scale(np.asarray(current_price, dtype=np.float64))).tolist()
+        return EpisodeContext(scaled_price, inflows)
+
+
 class HSEnvironment(Env):
     def __init__(
         self,
@@ -47,13 +74,20 @@ class HSEnvironment(Env):
         self.reservoir_scaling = self.get_reservoir_inflow_scaling(hydro_system, average_forecast_inflow)
 
         self.potential_function = ProvidedPriceEndValueCalculation(self.hydro_system.reservoirs, 0)
+        self.potential_reservoirs = [r for r in self.hydro_system.reservoirs if not r.is_ocean]
+        self.potential_factors = [r.energy_equivalent * 10**3 for r in self.potential_reservoirs]
 
         # Scaler used for the reward signals
         self.reward_scaler = reward_scaler
         self.discounter = discounter
         self.price_scaler = price_scaler
 
+        # Constant for all episodes
+        self.gamma = self.discounter.get_gammas(self.time_indexer.length).tolist()
+        self.step_size_hours = np.asarray(self.time_indexer.step_size_hours, dtype=np.float64).tolist()
+
         self.current_inflow, self.current_price, self.forecast_name = self.get_forecast()
+        self.episode_context = EpisodeContext.create(self.current_price, self.current_inflow, self.price_scaler)
 
         if self.is_eval:
             reward_cols = [a.get_name() for a in self.hydro_system.sorted_actions] + ["sum"]
@@ -150,9 +184,8 @@ class HSEnvironment(Env):
                         r.init_volume = np.random.random() * r.max_volume
 
         self.current_inflow, self.current_price, self.forecast_name = self.get_forecast()
+        self.episode_context = EpisodeContext.create(self.current_price, self.current_inflow, self.price_scaler)
         self.current_episode += 1
-        if self.current_episode < self.num_warmup_episodes:
-            self.action_space.new_episode(self.current_price)
         return self.get_observations(self.current_step)
 
     def step(self, norm_action):
@@ -193,28 +226,31 @@ class HSEnvironment(Env):
         """
 
         if self.current_episode < self.num_warmup_episodes:
-            if not self.is_eval:
+            # The initial volume of the next episode, only the last value set in an episode is used
+            if not self.is_eval and self.current_step == 0:
                 for r in self.hydro_system.reservoirs:
                     if not r.is_ocean:
                         r.init_volume = np.random.random() * r.max_volume
 
-            self.action_space.set_step(self.current_step, self.get_observations_dict(self.current_step))
-
-        is_final_time_step = self.current_step + 1 >= self.time_indexer.length
-        price = self.current_price[self.current_step]
-        scaled_price = self.price_scaler.scale(price)
-        step_size = self.time_indexer.step_size_hours[self.current_step]
+        step = self.current_step
+        is_final_time_step = step + 1 >= self.time_indexer.length
+        price = self.current_price[step]
+        scaled_price = self.episode_context.scaled_price[step]
+        step_size = self.step_size_hours[step]
+        inflows = self.episode_context.inflows[step]
 
-        inflows = {}
-        for res in self.current_inflow:
-            inflows[res] = self.current_inflow[res][self.current_step]
-
-        potential_0 = self.potential_function.calculate()
+        potential_price = self.potential_function.price
+        if potential_price:
+            volumes = [r.current_volume for r in self.potential_reservoirs]
 
         reward = self.hydro_system.execute(in_norm_action, step_size, scaled_price, inflows)
 
-        potential_1 = self.potential_function.calculate()
-        reward += potential_1 - potential_0
+        if potential_price:
+            # Change in potential from the change in volume
+            delta = 0.0
+            for r, volume, factor in zip(self.potential_reservoirs, volumes, self.potential_factors):
+                delta += (r.current_volume - volume) * factor
+            reward += delta * potential_price
 
         if self.is_eval:
             for action in self.hydro_system.sorted_actions:
@@ -240,7 +276,7 @@ class HSEnvironment(Env):
 
             reward += self.end_reward
 
-        reward = self.discounter.get_gamma(self.current_step) * reward
+        reward = self.gamma[step] * reward
         scaled_reward = self.reward_scaler.scale(reward) * 100
 
         if self.is_eval:
@@ -251,13 +287,14 @@ class HSEnvironment(Env):
         return scaled_reward, is_final_time_step, self.get_observations(self.current_step)
 
     def init_eval_report(self, actions, inflows):
-        state = self.hydro_system.report_state(actions)
-
-        report_cols = []
-        for name, _ in state.items():
-            report_cols.append(name)
-
-        for key, _ in inflows.items():
+        self.report_getters = list(self.hydro_system.report_getters().items())
+        self.report_power_positions = [
+            i for i, (name, _) in enumerate(self.report_getters) if ReportName.power in name
+        ]
+        self.report_inflow_names = list(inflows)
+
+        report_cols = [name for name, _ in self.report_getters]
+        for key in self.report_inflow_names:
             report_cols.append(ReportName.inflow + key)
 
         report_cols.append(ReportName.sum_money)
@@ -266,7 +303,7 @@ class HSEnvironment(Env):
         report_cols.append(ReportName.scaled_energy_price)
         report_cols.append(ReportName.end_value + "_" + self.end_value_calculation.end_type)
 
-        self.report_df = MyDataFrame(columns=report_cols, n_elements=self.time_indexer.length, dtype=np.float32)
+        self.report_df = EvalRecorder(columns=report_cols, n_elements=self.time_indexer.length, dtype=np.float32)
 
     def get_energy_equivalent(self, res_name):
         for res in self.hydro_system.reservoirs:
@@ -277,25 +314,22 @@ class HSEnvironment(Env):
         if self.report_df is None:
             self.init_eval_report(actions, inflows)
 
-        state = self.hydro_system.report_state(actions)
+        values = [getter(actions) for _, getter in self.report_getters]
 
+        step_size = self.step_size_hours[self.current_step]
         sum_money = 0
         sum_mega_watt_hours = 0
+        for i in self.report_power_positions:
+            sum_mega_watt_hours += values[i] * step_size
+            sum_money += values[i] * price * step_size
 
-        for col, value in state.items():
-            if ReportName.power in col:
-                sum_mega_watt_hours += value * self.time_indexer.step_size_hours[self.current_step]
-                sum_money += value * price * self.time_indexer.step_size_hours[self.current_step]
-
-            self.report_df[col][self.current_step] = value
+        for key in self.report_inflow_names:
+            values.append(inflows[key])
 
-        self.report_df[ReportName.sum_money][self.current_step] = sum_money
-        self.report_df[ReportName.energy_price][self.current_step] = price
-        self.report_df[ReportName.scaled_energy_price][self.current_step] = scaled_price
-        self.report_df[ReportName.sum_mwh][self.current_step] = sum_mega_watt_hours
-        self.report_df[ReportName.end_value + "_" + self.end_value_calculation.end_type][
-            self.current_step
-        ] = self.end_reward
+        values.append(sum_money)
+        values.append(sum_mega_watt_hours)
+        values.append(price)
+        values.append(scaled_price)
+        values.append(self.end_reward)
 
-        for key, value in inflows.items():
-            self.report_df[ReportName.inflow + key][self.current_step] = value
+        self.report_df.record(self.current_step, values)
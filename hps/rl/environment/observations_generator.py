@@ -38,6 +38,82 @@ class LinearTimePeriod(str, Enum):
     Yearly = "Yearly"
 
 
+class TimeFeatures:
+    # Features are shared by the generators using the same time index, and a run only uses a few time indexes
+    MaxCached = 16
+    _cache = {}
+
+    def __init__(self, time_indexer: ITimeIndexer, num_trig: int, hourly_bin_interval: int):
+        """
+        Observation features that only depend on the time index. The arrays are read only, as they are shared
+        between observation generators.
+
+        :param time_indexer: Time indexer of the episodes
+        :type time_indexer: ITimeIndexer
+        :param num_trig: Number of phase shifts of the cyclic features
+        :type num_trig: int
+        :param hourly_bin_interval: Hours in each hourly bin
+        :type hourly_bin_interval: int
+        """
+        index = time_indexer.index
+        self.acc_step_size_hours = np.append([0], np.cumsum(time_indexer.step_size_hours))
+        self.scaled_time = self.acc_step_size_hours / time_indexer.sum_hours
+        self.unique_step_size_hours = np.unique(time_indexer.step_size_hours)
+
+        self.cycles = []
+        if num_trig > 0:
+            trig_shifts = np.linspace(start=0, stop=1, num=num_trig, endpoint=False)
+            self.cycles = ObservationsGenerator._init_cyclic(self.scaled_time, trig_shifts)
+
+        self.seasonal_linear = ObservationsGenerator.normalize_to_year(index)
+        self.seasonal_cosine = np.cos(2 * np.pi * self.seasonal_linear)
+
+        self.hourly_cols, self.hourly_ohe = [""], None
+        if max(time_indexer.step_size_hours) < 24:
+            hourly_bins = pd.interval_range(start=0, end=24, periods=int(24 / hourly_bin_interval), closed="left")
+            df_hour_ohe = pd.get_dummies(pd.cut(index.hour, bins=hourly_bins))
+            self.hourly_cols, self.hourly_ohe = df_hour_ohe.columns.astype(str).to_list(), df_hour_ohe.values
+
+        df_weekday_ohe = pd.get_dummies(index.day_name())
+        self.weekday_cols, self.weekday_ohe = df_weekday_ohe.columns.astype(str).to_list(), df_weekday_ohe.values
+
+        for array in [
+            self.acc_step_size_hours,
+            self.scaled_time,
+            self.unique_step_size_hours,
+            self.seasonal_linear,
+            self.seasonal_cosine,
+            self.hourly_ohe,
+            self.weekday_ohe,
+            *self.cycles,
+        ]:
+            if array is not None:
+                array.setflags(write=False)
+
+    @classmethod
+    def get(cls, time_indexer: ITimeIndexer, num_trig: int, hourly_bin_interval: int) -> "TimeFeatures":
+        """
+        Get the features of the time index, computed once for each time index and settings.
+
+        :param time_indexer: Time indexer of the episodes
+        :type time_indexer: ITimeIndexer
+        :param num_trig: Number of phase shifts of the cyclic features
+        :type num_trig: int
+        :param hourly_bin_interval: Hours in each hourly bin
+        :type hourly_bin_interval: int
+        :return: Time features
+        :rtype: TimeFeatures
+        """
+        key = (time_indexer.index_hash, num_trig, hourly_bin_interval)
+        features = cls._cache.get(key)
+        if features is None:
+            features = cls(time_indexer, num_trig, hourly_bin_interval)
+            if len(cls._cache) >= cls.MaxCached:
+                cls._cache.pop(next(iter(cls._cache)))
+            cls._cache[key] = features
+        return features
+
+
 class ObservationsGenerator:
     def __init__(
         self,
@@ -57,35 +133,34 @@ class ObservationsGenerator:
         self.inflow_scaler = LogScaler(base_value=observation_settings.global_max_inflow)
 
         self.time_indexer = time_indexer
-        self.acc_step_size_hours = np.append([0], np.cumsum(time_indexer.step_size_hours))
-        self.scaled_time = self.acc_step_size_hours / self.time_indexer.sum_hours
+        self.time_features = TimeFeatures.get(
+            time_indexer, observation_settings.num_trig, observation_settings.hourly_bin_interval
+        )
+        if self.time_features.hourly_ohe is not None and 24 % observation_settings.hourly_bin_interval:
+            self.logger.warning("Hourly bins interval are not evenly distributed.")
+
+        self.acc_step_size_hours = self.time_features.acc_step_size_hours
+        self.scaled_time = self.time_features.scaled_time
         self.scaled_time_length = self.scaled_time[1] - self.scaled_time[0]
-        self.unique_step_size_hours = np.unique(self.time_indexer.step_size_hours)
+        self.unique_step_size_hours = self.time_features.unique_step_size_hours
         if len(self.unique_step_size_hours) < 2:
             observation_settings.include_different_time_lengths = False
 
-        self.weekday_encoding = pd.get_dummies(time_indexer.index.weekday)
-
         self.inflow_res = None
         self.observation_settings = observation_settings
-        if observation_settings.num_trig > 0:
-            trig_shifts = np.linspace(start=0, stop=1, num=observation_settings.num_trig, endpoint=False)
-            self.cycles = self._init_cyclic(self.scaled_time, trig_shifts)
+        self.cycles = self.time_features.cycles
 
-        self.seasonal_linear = [self.normalize_to_year(time_stamp) for time_stamp in self.time_indexer.index]
-        self.seasonal_cosine = [np.cos(2 * np.pi * i) for i in self.seasonal_linear]
+        self.seasonal_linear = self.time_features.seasonal_linear
+        self.seasonal_cosine = self.time_features.seasonal_cosine
 
-        if max(time_indexer.step_size_hours) < 24:
-            self.hourly_cols, self.hourly_ohe = self._init_hourly_ohe(self.observation_settings.hourly_bin_interval)
-        else:
-            self.hourly_cols, self.hourly_ohe = [""], None
-            if self.observation_settings.include_hourly_bins:
-                self.observation_settings.include_hourly_bins = False
-                self.logger.warning(
-                    "'include_hourly_bins' set to 'False' as it does not make sense when time resolution is above 24 hours."
-                )
+        self.hourly_cols, self.hourly_ohe = self.time_features.hourly_cols, self.time_features.hourly_ohe
+        if self.hourly_ohe is None and self.observation_settings.include_hourly_bins:
+            self.observation_settings.include_hourly_bins = False
+            self.logger.warning(
+                "'include_hourly_bins' set to 'False' as it does not make sense when time resolution is above 24 hours."
+            )
 
-        self.weekday_cols, self.weekday_ohe = self._init_weekday_ohe()
+        self.weekday_cols, self.weekday_ohe = self.time_features.weekday_cols, self.time_features.weekday_ohe
 
     def get_space(self, step, hydro_system, current_price, current_inflow):
         obs_dict = self.get_observations_dict(
@@ -104,11 +179,22 @@ class ObservationsGenerator:
         return observation_space
 
     @staticmethod
-    def normalize_to_year(time_stamp):
-        start = pd.Timestamp(year=time_stamp.year, month=1, day=1, hour=0, minute=0, tz=time_stamp.tz)
-        end = pd.Timestamp(year=time_stamp.year + 1, month=1, day=1, hour=0, minute=0, tz=time_stamp.tz)
-        seconds_in_year = (end - start).total_seconds()
-        return (time_stamp - start).total_seconds() / seconds_in_year
+    def normalize_to_year(time_index: pd.DatetimeIndex) -> np.ndarray:
+        """
+        Time of year of each time stamp, scaled to [0, 1).
+
+        :param time_index: Time stamps
+        :type time_index: pd.DatetimeIndex
+        :return: Scaled time of year
+        :rtype: np.ndarray
+        """
+        time_index = pd.DatetimeIndex(time_index)
+        years, year_index = np.unique(time_index.year, return_inverse=True)
+        bounds = np.array(
+            [pd.Timestamp(year=int(year) + i, month=1, day=1, tz=time_index.tz).value for year in years for i in (0, 1)]
+        ).reshape(-1, 2)
+        start, end = bounds[year_index, 0], bounds[year_index, 1]
+        return (time_index.asi8 - start) / (end - start)
 
     @staticmethod
     def _init_cyclic(scaled_values, trig_shifts):
@@ -118,20 +204,6 @@ class ObservationsGenerator:
             cycles.append(ObservationsGenerator._init_cos(scaled_values, shift))
         return cycles
 
-    def _init_hourly_ohe(self, interval: int):
-        if 24 % interval:
-            self.logger.warning("Hourly bins interval are not evenly distributed.")
-
-        hourly_bins = pd.interval_range(start=0, end=24, periods=int(24 / interval), closed="left")
-
-        binned_values = pd.cut(self.time_indexer.index.hour, bins=hourly_bins)
-        df_hour_ohe = pd.get_dummies(binned_values)
-        return df_hour_ohe.columns.astype(str).to_list(), df_hour_ohe.values
-
-    def _init_weekday_ohe(self) -> pd.DataFrame:
-        df_weekday_ohe = pd.get_dummies(self.time_indexer.index.day_name())
-        return df_weekday_ohe.columns.astype(str).to_list(), df_weekday_ohe.values
-
     @staticmethod
     def _init_cos(vals, phase_shift):
         return (np.cos(np.pi * (vals + phase_shift)) + 1) / 2.0
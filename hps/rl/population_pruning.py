@@ -0,0 +1,91 @@
+import copy
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from hps.rl.settings import SacSettings
+
+
+class AshaPruner:
+    def __init__(self, rungs: List[int], fraction: float = 0.5, min_agents: int = 2):
+        """
+        Asynchronous successive halving of an agent population. When an agent reaches a rung, its best evaluation
+        return up to the rung is compared with the returns recorded at the rung by all agents so far, including
+        agents pruned since. The agent is pruned if it is in the bottom fraction.
+
+        :param rungs: Steps at which the agents are compared
+        :type rungs: List[int]
+        :param fraction: Fraction of the agents pruned at each rung, defaults to 0.5
+        :type fraction: float
+        :param min_agents: Number of agents recorded at a rung before any agent is pruned there, defaults to 2
+        :type min_agents: int
+        """
+        if not 0 < fraction < 1:
+            raise ValueError("Expected 0 < fraction < 1, got {}".format(fraction))
+        self.rungs = sorted(rungs)
+        self.fraction = fraction
+        self.min_agents = min_agents
+        self.records = {rung: {} for rung in self.rungs}  # Rung -> {agent: best return up to the rung}
+
+    def update(self, curves: Dict[int, Tuple[np.ndarray, np.ndarray]], live_agents: Iterable[int]) -> List[int]:
+        """
+        Record the rungs reached by the live agents and return the agents to prune.
+
+        :param curves: Steps and evaluation returns of each agent
+        :type curves: Dict[int, Tuple[np.ndarray, np.ndarray]]
+        :param live_agents: Agents still training
+        :type live_agents: Iterable[int]
+        :return: Agents to prune
+        :rtype: List[int]
+        """
+        pruned = []
+        live_agents = [agent for agent in live_agents if agent in curves]
+        for rung in self.rungs:
+            # Record all the agents reaching the rung before comparing them
+            reached_rung = []
+            for agent in live_agents:
+                steps, returns = (np.asarray(x) for x in curves[agent])
+                if agent in self.records[rung] or len(steps) == 0 or steps.max() < rung:
+                    continue
+                reached = steps <= rung
+                # A clone starts after the rungs passed by its parent, it is not compared there
+                self.records[rung][agent] = returns[reached].max() if reached.any() else None
+                reached_rung.append(agent)
+
+            pruned_at_rung = [agent for agent in reached_rung if self._is_pruned(agent, rung)]
+            pruned += pruned_at_rung
+            live_agents = [agent for agent in live_agents if agent not in pruned_at_rung]
+        return pruned
+
+    def _is_pruned(self, agent, rung) -> bool:
+        value = self.records[rung][agent]
+        values = [v for v in self.records[rung].values() if v is not None]
+        if value is None or len(values) < self.min_agents:
+            return False
+        n_pruned = int(len(values) * self.fraction)
+        return n_pruned > 0 and value <= np.sort(values)[n_pruned - 1]
+
+
+def perturb_sac_settings(sac_settings: SacSettings, factor: float, rng: np.random.Generator) -> SacSettings:
+    """
+    Copy of the settings with the learning rate and the target update tau multiplied by a random factor between
+    1 / (1 + factor) and 1 + factor. The SAC agents use the actor learning rate for all their optimizers, so the
+    critic and alpha learning rates are not perturbed.
+
+    :param sac_settings: Settings to perturb
+    :type sac_settings: SacSettings
+    :param factor: Size of the perturbation
+    :type factor: float
+    :param rng: Random generator
+    :type rng: np.random.Generator
+    :return: Perturbed settings
+    :rtype: SacSettings
+    """
+    perturbed = copy.deepcopy(sac_settings)
+
+    def scale(value):
+        return float(value * (1 + factor) ** rng.uniform(-1, 1))
+
+    perturbed.actor.learning_rate = scale(perturbed.actor.learning_rate)
+    perturbed.target_update_tau = min(1.0, scale(perturbed.target_update_tau))
+    return perturbed
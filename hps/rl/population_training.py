@@ -0,0 +1,115 @@
+import copy
+from typing import List, Optional, Sequence
+
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.off_policy_algorithm import OffPolicyAlgorithm
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+# Read-only data of the inflow and price sampler, shared by the copies of an environment
+_SHARED_SAMPLER_DATA = ["df_i", "df_p", "data"]
+
+
+def copy_env(env, seed: Optional[int] = None):
+    """
+    Copy a train environment, with its own hydro system and episode state. The forecast data is shared with the
+    original environment, and the forecast generator of the copy is reseeded so it samples other episodes.
+
+    :param env: Environment to copy
+    :type env: HSEnvironment
+    :param seed: Seed of the forecast generator of the copy, defaults to None
+    :type seed: Optional[int]
+    :return: The copy
+    :rtype: HSEnvironment
+    """
+    memo = {}
+    sampler = getattr(env, "inflow_price_sampler", None)
+    for owner in (sampler, getattr(sampler, "forecast_generator", None)):
+        for name in _SHARED_SAMPLER_DATA:
+            value = getattr(owner, name, None)
+            if value is not None:
+                memo[id(value)] = value
+    env_copy = copy.deepcopy(env, memo)
+
+    forecast_generator = getattr(getattr(env_copy, "inflow_price_sampler", None), "forecast_generator", None)
+    if seed is not None and forecast_generator is not None:
+        forecast_generator.set_seed(seed)
+    return env_copy
+
+
+def make_vec_env(env, n_envs: int) -> DummyVecEnv:
+    """
+    Vectorize n_envs copies of the train environment, so the agent computes the actions of all of them with one
+    forward pass of its policy. The first environment is env itself.
+
+    :param env: Train environment
+    :type env: HSEnvironment
+    :param n_envs: Number of environments
+    :type n_envs: int
+    :rtype: DummyVecEnv
+    """
+    generator = getattr(getattr(env, "inflow_price_sampler", None), "forecast_generator", None)
+    seed = getattr(generator, "seed", None)
+    envs = [env] + [copy_env(env, None if seed is None else seed + i) for i in range(1, n_envs)]
+    return DummyVecEnv([lambda e=e: e for e in envs])
+
+
+def learn_population(
+    models: Sequence[OffPolicyAlgorithm],
+    total_timesteps: Sequence[int],
+    callbacks: Sequence[Optional[BaseCallback]],
+    reset_num_timesteps: Sequence[bool],
+    log_interval: int = 4,
+) -> List[OffPolicyAlgorithm]:
+    """
+    Train several off-policy models in one process, like ``model.learn`` for each of them. The models take turns
+    collecting a rollout and training on it, so they progress at the same pace and the process, the forecast and the
+    environments built for the run are shared. A model stops when it reaches its total steps or a callback returns
+    False, the others continue.
+
+    :param models: Models with their own networks, optimizers, replay buffers and environments
+    :type models: Sequence[OffPolicyAlgorithm]
+    :param total_timesteps: Number of environment steps of each model
+    :type total_timesteps: Sequence[int]
+    :param callbacks: Callback of each model
+    :type callbacks: Sequence[Optional[BaseCallback]]
+    :param reset_num_timesteps: Whether to reset the step count of each model
+    :type reset_num_timesteps: Sequence[bool]
+    :param log_interval: Episodes between logs, defaults to 4
+    :type log_interval: int
+    :return: The trained models
+    :rtype: List[OffPolicyAlgorithm]
+    """
+    active = []
+    for model, total, callback, reset in zip(models, total_timesteps, callbacks, reset_num_timesteps):
+        total, callback = model._setup_learn(total, callback, reset)
+        callback.on_training_start(locals(), globals())
+        active.append((model, total, callback))
+
+    while active:
+        still_active = []
+        for model, total, callback in active:
+            continue_training = model.num_timesteps < total
+            if continue_training:
+                rollout = model.collect_rollouts(
+                    model.env,
+                    train_freq=model.train_freq,
+                    action_noise=model.action_noise,
+                    callback=callback,
+                    learning_starts=model.learning_starts,
+                    replay_buffer=model.replay_buffer,
+                    log_interval=log_interval,
+                )
+                continue_training = rollout.continue_training
+
+            if continue_training and model.num_timesteps > 0 and model.num_timesteps > model.learning_starts:
+                gradient_steps = model.gradient_steps if model.gradient_steps >= 0 else rollout.episode_timesteps
+                if gradient_steps > 0:
+                    model.train(batch_size=model.batch_size, gradient_steps=gradient_steps)
+
+            if continue_training:
+                still_active.append((model, total, callback))
+            else:
+                callback.on_training_end()
+        active = still_active
+
+    return list(models)
@@ -0,0 +1,121 @@
+import math
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.off_policy_algorithm import OffPolicyAlgorithm
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from hps.rl.sac.replay_buffer import add_transitions
+
+# Actions of all the environments for their current step, with the shape (n_envs, action_dim)
+ExplorationPolicy = Callable[[List], np.ndarray]
+
+
+def _stack(observations: List[List[Dict[str, np.ndarray]]]) -> Dict[str, np.ndarray]:
+    return {key: np.array([[obs[key] for obs in row] for row in observations]) for key in observations[0][0]}
+
+
+def prefill_replay_buffer(
+    model: OffPolicyAlgorithm,
+    n_steps: int,
+    policy: Optional[ExplorationPolicy] = None,
+    rng: Optional[np.random.Generator] = None,
+) -> int:
+    """
+    Collect at least n_steps transitions with an exploration policy and write them to the replay buffer of the model
+    in one block. The environments of the model are stepped together, each step takes the actions of all of them
+    from one call of the policy. The collection continues from the last observations of the model, which the
+    environments are reset to when learning starts, and the training loop continues the episodes where the
+    collection stops. The step and episode counts of the model are advanced.
+
+    :param model: Off-policy model with a DummyVecEnv
+    :type model: OffPolicyAlgorithm
+    :param n_steps: Number of transitions to collect
+    :type n_steps: int
+    :param policy: Exploration policy, defaults to None for uniformly random actions
+    :type policy: Optional[ExplorationPolicy]
+    :param rng: Random generator of the uniform policy, defaults to None for a generator seeded from numpy
+    :type rng: Optional[np.random.Generator]
+    :return: Number of transitions collected
+    :rtype: int
+    """
+    envs = model.env.envs
+    low, high = model.action_space.low, model.action_space.high
+    if policy is None:
+        rng = rng or np.random.default_rng(np.random.randint(2**31))
+
+        def policy(envs):
+            return rng.uniform(low, high, size=(len(envs),) + low.shape)
+
+    n_rows = math.ceil(n_steps / len(envs))
+    observations, next_observations, actions, rewards, dones = [], [], [], [], []
+    if model._last_obs is None:
+        obs = [env.reset() for env in envs]
+    else:
+        obs = [{key: value[i] for key, value in model._last_obs.items()} for i in range(len(envs))]
+    n_episodes = 0
+    for _ in range(n_rows):
+        action = np.clip(policy(envs), low, high)
+        next_obs, reward, done = [], [], []
+        for env, env_action in zip(envs, action):
+            env_obs, env_reward, env_done, _ = env.step(env_action)
+            next_obs.append(env_obs)
+            reward.append(env_reward)
+            done.append(env_done)
+
+        observations.append(obs)
+        next_observations.append(next_obs)
+        actions.append(action)
+        rewards.append(reward)
+        dones.append(done)
+
+        n_episodes += sum(done)
+        obs = [env.reset() if env_done else env_obs for env, env_obs, env_done in zip(envs, next_obs, done)]
+
+    add_transitions(
+        model.replay_buffer,
+        _stack(observations),
+        _stack(next_observations),
+        model.policy.scale_action(np.array(actions, dtype=np.float32)),
+        np.array(rewards, dtype=np.float32),
+        np.array(dones, dtype=np.float32),
+    )
+
+    n_collected = n_rows * len(envs)
+    model.num_timesteps += n_collected
+    model._episode_num += n_episodes
+    # Stacked like the observations of the vectorized environment
+    spaces = model.env.observation_space.spaces
+    model._last_obs = {key: np.array([env_obs[key] for env_obs in obs], dtype=spaces[key].dtype) for key in spaces}
+    return n_collected
+
+
+class PrefillCallback(BaseCallback):
+    """
+    Collect the initial transitions of an off-policy model with prefill_replay_buffer when training starts, instead
+    of one step at a time in the training loop. The callbacks are not called for the collected steps.
+
+    :param policy: Exploration policy, defaults to None for uniformly random actions
+    :type policy: Optional[ExplorationPolicy]
+    """
+
+    def __init__(self, policy: Optional[ExplorationPolicy] = None, verbose: int = 0):
+        super().__init__(verbose)
+        self.policy = policy
+
+    def _on_training_start(self) -> None:
+        if not isinstance(self.model, OffPolicyAlgorithm) or not isinstance(self.model.env, DummyVecEnv):
+            return
+        n_steps = self.model.learning_starts - self.model.num_timesteps
+        if n_steps <= 0:
+            return
+
+        start_time = time.time()
+        n_collected = prefill_replay_buffer(self.model, n_steps, self.policy)
+        if self.verbose > 0:
+            print("Collected {} initial steps in {:.1f} s".format(n_collected, time.time() - start_time))
+
+    def _on_step(self) -> bool:
+        return True
@@ -0,0 +1,605 @@
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import torch as th
+from gym import spaces
+from stable_baselines3.common.buffers import DictReplayBuffer, ReplayBuffer
+from stable_baselines3.common.type_aliases import DictReplayBufferSamples
+from stable_baselines3.common.vec_env import VecNormalize
+
+
+class MemmapDictReplayBuffer(DictReplayBuffer):
+    """
+    Dict replay buffer storing the transitions in memory mapped files.
+
+    Observations from bounded boxes, e.g. the scaled ``obs`` features of the :class:`ObservationsGenerator`, are
+    stored as float16, other float observations as float32. The files are created on the first ``add``, so loading
+    a model for evaluation does not touch the files of a running agent.
+
+    Pickling the buffer, as done by ``save_replay_buffer``, flushes the files and only writes the buffer state.
+    Unpickling maps the files again, so ``load_replay_buffer`` does not read the transitions into memory.
+
+    :param buffer_size: Max number of transitions in the buffer
+    :type buffer_size: int
+    :param observation_space: Observation space
+    :type observation_space: spaces.Dict
+    :param action_space: Action space
+    :type action_space: spaces.Space
+    :param device: PyTorch device, defaults to "auto"
+    :type device: Union[th.device, str], optional
+    :param n_envs: Number of parallel environments, defaults to 1
+    :type n_envs: int, optional
+    :param optimize_memory_usage: Not supported by dict buffers, defaults to False
+    :type optimize_memory_usage: bool, optional
+    :param handle_timeout_termination: Treat timeouts separately from terminations, defaults to True
+    :type handle_timeout_termination: bool, optional
+    :param path: Folder of the memory mapped files. A temporary folder is used if not given, defaults to None
+    :type path: Optional[str], optional
+    """
+
+    def __init__(
+        self,
+        buffer_size: int,
+        observation_space: spaces.Dict,
+        action_space: spaces.Space,
+        device: Union[th.device, str] = "auto",
+        n_envs: int = 1,
+        optimize_memory_usage: bool = False,
+        handle_timeout_termination: bool = True,
+        path: Optional[str] = None,
+    ):
+        super(ReplayBuffer, self).__init__(buffer_size, observation_space, action_space, device, n_envs=n_envs)
+
+        assert isinstance(self.obs_shape, dict), "MemmapDictReplayBuffer must be used with Dict obs space only"
+        assert optimize_memory_usage is False, "MemmapDictReplayBuffer does not support optimize_memory_usage"
+        self.buffer_size = max(buffer_size // n_envs, 1)
+        self.optimize_memory_usage = optimize_memory_usage
+        self.handle_timeout_termination = handle_timeout_termination
+
+        if path is None:
+            path = tempfile.mkdtemp(prefix="replay_buffer_")
+        self.path = path
+
+        self.obs_dtypes = {key: self.storage_dtype(observation_space[key]) for key in self.obs_shape}
+        self.allocated = False
+        self._arrays: Dict[str, np.memmap] = {}
+        self.observations = self.next_observations = None
+        self.actions = self.rewards = self.dones = self.timeouts = None
+
+    @staticmethod
+    def storage_dtype(space: spaces.Space) -> np.dtype:
+        """
+        Dtype used to store observations from the given space.
+
+        :param space: Observation space
+        :type space: spaces.Space
+        :return: float16 for float boxes with finite bounds, float32 for other float boxes and the space dtype
+            otherwise.
+        :rtype: np.dtype
+        """
+        if isinstance(space, spaces.Box) and np.issubdtype(space.dtype, np.floating):
+            if np.all(np.isfinite(space.low)) and np.all(np.isfinite(space.high)):
+                return np.dtype(np.float16)
+            return np.dtype(np.float32)
+        return np.dtype(space.dtype)
+
+    def _array_specs(self, buffer_size: Optional[int] = None, n_envs: Optional[int] = None):
+        buffer_size = self.buffer_size if buffer_size is None else buffer_size
+        n_envs = self.n_envs if n_envs is None else n_envs
+        specs = {}
+        for i, (key, shape) in enumerate(self.obs_shape.items()):
+            specs["observations_{}".format(i)] = ((buffer_size, n_envs, *shape), self.obs_dtypes[key])
+            specs["next_observations_{}".format(i)] = ((buffer_size, n_envs, *shape), self.obs_dtypes[key])
+        specs["actions"] = ((buffer_size, n_envs, self.action_dim), np.dtype(np.float32))
+        for name in ["rewards", "dones", "timeouts"]:
+            specs[name] = ((buffer_size, n_envs), np.dtype(np.float32))
+        return specs
+
+    def _map_arrays(
+        self, path: str, mode: str, buffer_size: Optional[int] = None, n_envs: Optional[int] = None
+    ) -> Dict[str, np.memmap]:
+        os.makedirs(path, exist_ok=True)
+        return {
+            name: np.memmap(os.path.join(path, name + ".dat"), dtype=dtype, mode=mode, shape=shape)
+            for name, (shape, dtype) in self._array_specs(buffer_size, n_envs).items()
+        }
+
+    def _open(self, mode: str):
+        self._arrays = self._map_arrays(self.path, mode)
+        keys = list(self.obs_shape)
+        self.observations = {key: self._arrays["observations_{}".format(i)] for i, key in enumerate(keys)}
+        self.next_observations = {key: self._arrays["next_observations_{}".format(i)] for i, key in enumerate(keys)}
+        self.actions = self._arrays["actions"]
+        self.rewards = self._arrays["rewards"]
+        self.dones = self._arrays["dones"]
+        self.timeouts = self._arrays["timeouts"]
+        self.allocated = True
+
+    def _allocate(self):
+        self._open("w+")
+
+    def _memmaps(self) -> List[np.memmap]:
+        return list(self._arrays.values())
+
+    @property
+    def nbytes(self) -> int:
+        return sum(dtype.itemsize * int(np.prod(shape)) for shape, dtype in self._array_specs().values())
+
+    def flush(self):
+        for array in self._memmaps():
+            array.flush()
+
+    def copy_to(self, path: str):
+        """
+        Copy the files to a new folder and continue using the copy, e.g. when a warm started agent continues from the
+        buffer of another agent.
+
+        :param path: Folder of the copied files.
+        :type path: str
+        """
+        if os.path.abspath(path) == os.path.abspath(self.path):
+            return
+        if self.allocated:
+            self.flush()
+            os.makedirs(path, exist_ok=True)
+            for name in self._array_specs():
+                shutil.copyfile(os.path.join(self.path, name + ".dat"), os.path.join(path, name + ".dat"))
+            self.path = path
+            self._open("r+")
+        else:
+            self.path = path
+
+    def add(
+        self,
+        obs: Dict[str, np.ndarray],
+        next_obs: Dict[str, np.ndarray],
+        action: np.ndarray,
+        reward: np.ndarray,
+        done: np.ndarray,
+        infos: List[Dict[str, Any]],
+    ) -> None:
+        if not self.allocated:
+            self._allocate()
+        super().add(obs, next_obs, action, reward, done, infos)
+
+    def _get_samples(
+        self,
+        batch_inds: np.ndarray,
+        env: Optional[VecNormalize] = None,
+    ) -> DictReplayBufferSamples:
+        env_indices = np.random.randint(0, high=self.n_envs, size=(len(batch_inds),))
+        return self._to_samples(self._gather(self._arrays, batch_inds, env_indices), env)
+
+    @staticmethod
+    def _gather(arrays: Dict[str, np.ndarray], batch_inds: np.ndarray, env_indices: np.ndarray):
+        return {name: array[batch_inds, env_indices] for name, array in arrays.items()}
+
+    def _to_samples(self, batch: Dict[str, np.ndarray], env: Optional[VecNormalize]) -> DictReplayBufferSamples:
+        keys = list(self.obs_shape)
+        obs_ = self._normalize_obs(
+            {key: batch["observations_{}".format(i)].astype(np.float32) for i, key in enumerate(keys)}, env
+        )
+        next_obs_ = self._normalize_obs(
+            {key: batch["next_observations_{}".format(i)].astype(np.float32) for i, key in enumerate(keys)}, env
+        )
+
+        observations = {key: self.to_torch(obs) for key, obs in obs_.items()}
+        next_observations = {key: self.to_torch(obs) for key, obs in next_obs_.items()}
+
+        return DictReplayBufferSamples(
+            observations=observations,
+            actions=self.to_torch(batch["actions"]),
+            next_observations=next_observations,
+            # Only use dones that are not due to timeouts
+            dones=self.to_torch(batch["dones"] * (1 - batch["timeouts"])).reshape(-1, 1),
+            rewards=self.to_torch(self._normalize_reward(batch["rewards"].reshape(-1, 1), env)),
+        )
+
+    def __getstate__(self):
+        self.flush()
+        state = self.__dict__.copy()
+        for name in ["observations", "next_observations", "actions", "rewards", "dones", "timeouts"]:
+            state[name] = None
+        state["_arrays"] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.allocated:
+            self._open("r+")
+
+
+# Values in the state file of a shard: position, whether it is full, buffer size and number of environments
+STATE_LENGTH = 4
+
+
+class SharedMemmapDictReplayBuffer(MemmapDictReplayBuffer):
+    """
+    Replay buffer shared by the agents of a project run.
+
+    Every agent writes to a shard of its own, ``<path>/shard_<shard>``, and samples uniformly from the transitions
+    of all shards in ``path``. Each shard has a single writer, so no locking is needed. The number of transitions
+    in a shard is published in a small state file written after the transitions, and shards are mapped read-only
+    by the other agents as they appear. The state file also holds the buffer size and the number of environments
+    of the shard, so shards of agents with other buffer sizes are mapped with their own geometry.
+
+    :param path: Folder shared by the agents.
+    :type path: str
+    :param shard: Shard written by this agent, defaults to 0
+    :type shard: int, optional
+    :param refresh_interval: Seconds between looking for new shards, defaults to 10.0
+    :type refresh_interval: float, optional
+    """
+
+    def __init__(
+        self,
+        buffer_size: int,
+        observation_space: spaces.Dict,
+        action_space: spaces.Space,
+        device: Union[th.device, str] = "auto",
+        n_envs: int = 1,
+        optimize_memory_usage: bool = False,
+        handle_timeout_termination: bool = True,
+        path: Optional[str] = None,
+        shard: int = 0,
+        refresh_interval: float = 10.0,
+    ):
+        if path is None:
+            raise ValueError("A shared replay buffer needs a path.")
+        self.shared_path = path
+        self.shard = shard
+        self.refresh_interval = refresh_interval
+        self.state: Optional[np.memmap] = None
+        # Path -> arrays, state, buffer size and number of environments of the shards of other agents
+        self._other_shards: Dict[str, Tuple[Dict[str, np.memmap], np.memmap, int, int]] = {}
+        self._last_refresh: Optional[float] = None
+        super().__init__(
+            buffer_size,
+            observation_space,
+            action_space,
+            device,
+            n_envs,
+            optimize_memory_usage,
+            handle_timeout_termination,
+            path=self.shard_path(path, shard),
+        )
+
+    @staticmethod
+    def shard_path(path: str, shard: int) -> str:
+        return os.path.join(path, "shard_{}".format(shard))
+
+    @staticmethod
+    def _map_state(path: str, mode: str) -> np.memmap:
+        """
+        Map the state of a shard: position, whether it is full, buffer size and number of environments. Shards
+        written by older versions only hold the position and whether they are full.
+        """
+        file = os.path.join(path, "state.dat")
+        length = min(os.path.getsize(file) // np.dtype(np.int64).itemsize, STATE_LENGTH)
+        return np.memmap(file, dtype=np.int64, mode=mode, shape=(length,))
+
+    def _write_state(self):
+        # Replaced atomically, the other agents never see a state without the geometry
+        tmp_path = os.path.join(self.path, "state.dat.tmp")
+        np.array([self.pos, self.full, self.buffer_size, self.n_envs], dtype=np.int64).tofile(tmp_path)
+        os.replace(tmp_path, os.path.join(self.path, "state.dat"))
+        self.state = self._map_state(self.path, "r+")
+
+    def _allocate(self):
+        # Continue writing to the shard if it exists, e.g. when an agent is restarted
+        if os.path.isfile(os.path.join(self.path, "state.dat")):
+            state = self._map_state(self.path, "r")
+            if len(state) == STATE_LENGTH:
+                if int(state[3]) != self.n_envs:
+                    raise ValueError(
+                        "Shard {} has {} environments, not {}.".format(self.path, int(state[3]), self.n_envs)
+                    )
+                # The files have the size the shard was created with
+                self.buffer_size = int(state[2])
+            self.pos, self.full = int(state[0]), bool(state[1])
+            self._open("r+")
+            if len(state) == STATE_LENGTH:
+                # Written in place, the other agents keep reading the mapped state
+                self.state = self._map_state(self.path, "r+")
+                return
+        else:
+            self._open("w+")
+        self._write_state()
+
+    def add(
+        self,
+        obs: Dict[str, np.ndarray],
+        next_obs: Dict[str, np.ndarray],
+        action: np.ndarray,
+        reward: np.ndarray,
+        done: np.ndarray,
+        infos: List[Dict[str, Any]],
+    ) -> None:
+        super().add(obs, next_obs, action, reward, done, infos)
+        self.state[:2] = [self.pos, self.full]
+
+    def _refresh_shards(self):
+        now = time.monotonic()
+        if self._last_refresh is not None and now - self._last_refresh < self.refresh_interval:
+            return
+        self._last_refresh = now
+
+        for name in sorted(os.listdir(self.shared_path)):
+            shard_path = os.path.join(self.shared_path, name)
+            if (
+                not name.startswith("shard_")
+                or os.path.abspath(shard_path) == os.path.abspath(self.path)
+                or shard_path in self._other_shards
+                or not os.path.isfile(os.path.join(shard_path, "state.dat"))
+            ):
+                continue
+            state = self._map_state(shard_path, "r")
+            if len(state) == STATE_LENGTH:
+                buffer_size, n_envs = int(state[2]), int(state[3])
+            else:
+                buffer_size, n_envs = self.buffer_size, self.n_envs  # Written by an older version
+            arrays = self._map_arrays(shard_path, "r", buffer_size, n_envs)
+            self._other_shards[shard_path] = (arrays, state, buffer_size, n_envs)
+
+    def _shards(self) -> List[Tuple[Dict[str, np.ndarray], int, int]]:
+        """
+        :return: Arrays, number of filled rows and number of environments of the shards holding transitions.
+        """
+        self._refresh_shards()
+        shards = []
+        if self.allocated:
+            shards.append((self._arrays, self.size(), self.n_envs))
+        for arrays, state, buffer_size, n_envs in self._other_shards.values():
+            shards.append((arrays, buffer_size if state[1] else int(state[0]), n_envs))
+        return [(arrays, rows, n_envs) for arrays, rows, n_envs in shards if rows > 0]
+
+    def shared_size(self) -> int:
+        """
+        :return: Number of transitions in all shards.
+        """
+        return sum(rows * n_envs for _, rows, n_envs in self._shards())
+
+    def sample(self, batch_size: int, env: Optional[VecNormalize] = None) -> DictReplayBufferSamples:
+        shards = self._shards()
+        sizes = np.array([rows * n_envs for _, rows, n_envs in shards])
+        ends = np.cumsum(sizes)
+
+        inds = np.random.randint(0, ends[-1], size=batch_size)
+        shard_inds = np.searchsorted(ends, inds, side="right")
+        # Index of the transition in its shard, rows hold a transition for each environment
+        transition_inds = inds - (ends - sizes)[shard_inds]
+
+        batches = []
+        for i, (arrays, _, n_envs) in enumerate(shards):
+            shard_transitions = transition_inds[shard_inds == i]
+            batches.append(self._gather(arrays, shard_transitions // n_envs, shard_transitions % n_envs))
+        batch = {name: np.concatenate([b[name] for b in batches]) for name in batches[0]}
+        return self._to_samples(batch, env)
+
+    def flush(self):
+        super().flush()
+        if self.state is not None:
+            self.state.flush()
+
+    def copy_to(self, path: str):
+        raise ValueError("The shards of a shared replay buffer are not copied, open the shared path instead.")
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state["state"] = None
+        state["_other_shards"] = {}
+        state["_last_refresh"] = None
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        if self.allocated:
+            self.state = self._map_state(self.path, "r+")
+
+
+def add_transitions(
+    replay_buffer: DictReplayBuffer,
+    obs: Dict[str, np.ndarray],
+    next_obs: Dict[str, np.ndarray],
+    actions: np.ndarray,
+    rewards: np.ndarray,
+    dones: np.ndarray,
+):
+    """
+    Add the transitions of several steps of all the environments of a dict replay buffer at once, like calling
+    ``add`` for each step, with no timeouts.
+
+    :param replay_buffer: Dict replay buffer, e.g. a MemmapDictReplayBuffer
+    :type replay_buffer: DictReplayBuffer
+    :param obs: Observations, with the shape (n_steps, n_envs, ...)
+    :type obs: Dict[str, np.ndarray]
+    :param next_obs: Next observations, with the shape (n_steps, n_envs, ...)
+    :type next_obs: Dict[str, np.ndarray]
+    :param actions: Actions scaled to [-1, 1], with the shape (n_steps, n_envs, action_dim)
+    :type actions: np.ndarray
+    :param rewards: Rewards, with the shape (n_steps, n_envs)
+    :type rewards: np.ndarray
+    :param dones: Whether the episodes ended, with the shape (n_steps, n_envs)
+    :type dones: np.ndarray
+    """
+    if isinstance(replay_buffer, MemmapDictReplayBuffer) and not replay_buffer.allocated:
+        replay_buffer._allocate()
+
+    n_envs = replay_buffer.n_envs
+    n_steps = len(actions)
+    start = 0
+    while start < n_steps:
+        # Write up to the end of the buffer, and continue from its start
+        n = min(n_steps - start, replay_buffer.buffer_size - replay_buffer.pos)
+        rows, source = slice(replay_buffer.pos, replay_buffer.pos + n), slice(start, start + n)
+        for key, shape in replay_buffer.obs_shape.items():
+            replay_buffer.observations[key][rows] = obs[key][source].reshape((n, n_envs) + shape)
+            replay_buffer.next_observations[key][rows] = next_obs[key][source].reshape((n, n_envs) + shape)
+        replay_buffer.actions[rows] = actions[source].reshape((n, n_envs, replay_buffer.action_dim))
+        replay_buffer.rewards[rows] = rewards[source]
+        replay_buffer.dones[rows] = dones[source]
+        replay_buffer.timeouts[rows] = 0
+
+        replay_buffer.pos += n
+        if replay_buffer.pos == replay_buffer.buffer_size:
+            replay_buffer.full = True
+            replay_buffer.pos = 0
+        start += n
+
+    if isinstance(replay_buffer, SharedMemmapDictReplayBuffer):
+        replay_buffer.state[:2] = [replay_buffer.pos, replay_buffer.full]
+
+
+def _buffer_arrays(replay_buffer: ReplayBuffer) -> Dict[str, np.ndarray]:
+    arrays = {}
+    for name in ["observations", "next_observations"]:
+        value = getattr(replay_buffer, name)
+        if isinstance(value, dict):
+            for i, array in enumerate(value.values()):
+                arrays["{}_{}".format(name, i)] = array
+        elif value is not None:
+            arrays[name] = value
+    for name in ["actions", "rewards", "dones", "timeouts"]:
+        arrays[name] = getattr(replay_buffer, name)
+    return arrays
+
+
+class ReplayBufferCheckpoint:
+    """
+    Append-only checkpoint of a replay buffer.
+
+    Every save writes the transitions added since the previous save as a segment file, together with the ring
+    indices they were written to, and updates a small manifest. Loading applies the segments in order. When the
+    segments hold more rows than the buffer, or there are too many of them, the valid rows are written as a single
+    segment and the older segments are removed.
+
+    Memory mapped buffers are already on disk, so they are flushed and pickled instead. Saving again at the same
+    number of timesteps does nothing.
+
+    :param path: Folder of the checkpoint.
+    :type path: str
+    :param max_segments: Number of segments before compacting, defaults to 20
+    :type max_segments: int, optional
+    """
+
+    MANIFEST = "manifest.json"
+    MEMMAP_BUFFER = "buffer.pkl"
+
+    def __init__(self, path: str, max_segments: int = 20):
+        self.path = path
+        self.max_segments = max_segments
+        self._manifest: Optional[Dict[str, Any]] = None
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.isfile(os.path.join(path, ReplayBufferCheckpoint.MANIFEST))
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        tmp_path = os.path.join(self.path, self.MANIFEST + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(self.path, self.MANIFEST))
+        self._manifest = manifest
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        with open(os.path.join(self.path, self.MANIFEST)) as f:
+            return json.load(f)
+
+    def _write_segment(self, replay_buffer: ReplayBuffer, indices: np.ndarray, next_segment: int) -> Dict[str, Any]:
+        name = "segment_{}.npz".format(next_segment)
+        arrays = {key: array[indices] for key, array in _buffer_arrays(replay_buffer).items()}
+        np.savez(os.path.join(self.path, name), indices=indices, **arrays)
+        return {"file": name, "rows": len(indices)}
+
+    def save(self, replay_buffer: ReplayBuffer, num_timesteps: int):
+        """
+        Save the transitions added since the previous save.
+
+        :param replay_buffer: Replay buffer to save.
+        :type replay_buffer: ReplayBuffer
+        :param num_timesteps: Number of timesteps added to the buffer in total, used to find the new transitions.
+        :type num_timesteps: int
+        """
+        if self._manifest is not None and self._manifest["num_timesteps"] == num_timesteps:
+            # Already saved at this step, e.g. by the evaluation before a training checkpoint
+            return
+        os.makedirs(self.path, exist_ok=True)
+
+        if isinstance(replay_buffer, MemmapDictReplayBuffer):
+            tmp_path = os.path.join(self.path, self.MEMMAP_BUFFER + ".tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(replay_buffer, f)
+            os.replace(tmp_path, os.path.join(self.path, self.MEMMAP_BUFFER))
+            self._write_manifest({"memmap": True, "num_timesteps": num_timesteps})
+            return
+
+        previous = self._manifest
+        new_rows = None if previous is None else (num_timesteps - previous["num_timesteps"]) // replay_buffer.n_envs
+        segments = [] if previous is None else previous["segments"]
+        if previous is None and self.exists(self.path):
+            # Written by an earlier run, replaced by a compacted segment
+            previous = self._read_manifest()
+        compact = (
+            new_rows is None
+            or new_rows < 0
+            or sum(s["rows"] for s in segments) + new_rows > replay_buffer.buffer_size
+            or len(segments) >= self.max_segments
+        )
+
+        next_segment = 0 if previous is None else previous.get("next_segment", 0)
+        if compact:
+            segments = [self._write_segment(replay_buffer, np.arange(replay_buffer.size()), next_segment)]
+        elif new_rows > 0:
+            indices = (replay_buffer.pos - new_rows + np.arange(new_rows)) % replay_buffer.buffer_size
+            segments = segments + [self._write_segment(replay_buffer, indices, next_segment)]
+
+        old_files = set() if previous is None else {s["file"] for s in previous.get("segments", [])}
+        self._write_manifest(
+            {
+                "memmap": False,
+                "num_timesteps": num_timesteps,
+                "pos": replay_buffer.pos,
+                "full": replay_buffer.full,
+                "segments": segments,
+                "next_segment": next_segment + 1,
+            }
+        )
+        for file in old_files - {s["file"] for s in segments}:
+            os.remove(os.path.join(self.path, file))
+
+    def load(self, replay_buffer: Optional[ReplayBuffer] = None) -> ReplayBuffer:
+        """
+        Load the checkpoint.
+
+        :param replay_buffer: Buffer the transitions are written to. Not used for memory mapped buffers, defaults to
+            None
+        :type replay_buffer: Optional[ReplayBuffer], optional
+        :return: The loaded replay buffer.
+        :rtype: ReplayBuffer
+        """
+        manifest = self._read_manifest()
+
+        if manifest["memmap"]:
+            with open(os.path.join(self.path, self.MEMMAP_BUFFER), "rb") as f:
+                return pickle.load(f)
+
+        if replay_buffer is None:
+            raise ValueError("A replay buffer is needed to load the transitions into.")
+        if isinstance(replay_buffer, MemmapDictReplayBuffer) and not replay_buffer.allocated:
+            replay_buffer._allocate()
+
+        arrays = _buffer_arrays(replay_buffer)
+        for segment in manifest["segments"]:
+            with np.load(os.path.join(self.path, segment["file"])) as data:
+                indices = data["indices"]
+                for key, array in arrays.items():
+                    array[indices] = data[key]
+        replay_buffer.pos = manifest["pos"]
+        replay_buffer.full = manifest["full"]
+        return replay_buffer
@@ -12,6 +12,7 @@ from torch.autograd import Variable
 
 from hps.rl.environment.observations_generator import ObservationsName
 from hps.rl.logging.image_logging import ImageLogging
+from hps.rl.sac.replay_buffer import ReplayBufferCheckpoint
 
 
 class EvalCallback(EventCallback):
@@ -73,6 +74,9 @@ class EvalCallback(EventCallback):
         if log_path is not None:
             log_path = os.path.join(log_path, "evaluations")
         self.log_path = log_path
+        self.replay_buffer_checkpoint = (
+            ReplayBufferCheckpoint(os.path.join(log_path, "replay_buffer")) if log_path is not None else None
+        )
         self.evaluations_results = []
         self.evaluations_timesteps = []
         self.evaluations_length = []
@@ -106,10 +110,18 @@ class EvalCallback(EventCallback):
             if maybe_is_success is not None:
                 self._is_success_buffer.append(maybe_is_success)
 
+    def save_replay_buffer(self):
+        """
+        Save the transitions added to the replay buffer since the last save.
+        """
+        replay_buffer = getattr(self.model, "replay_buffer", None)
+        if self.replay_buffer_checkpoint is not None and replay_buffer is not None:
+            self.replay_buffer_checkpoint.save(replay_buffer, self.model.num_timesteps)
+
     def _on_step(self) -> bool:
 
         if self.eval_freq > 0 and self.n_calls % self.eval_freq == 0:
-            self.agent_runner.sb_agent.save_replay_buffer(self.log_path + "/replay_buffer")
+            self.save_replay_buffer()
 
             # Sync training and eval env if there is VecNormalize
             sync_envs_normalization(self.training_env, self.eval_env)
@@ -15,6 +15,11 @@ class AgentAlgorithm(str, Enum):
     PPO = "PPO"
 
 
+class ExplorationPolicyType(str, Enum):
+    Uniform = "Uniform"
+    PricePrimer = "PricePrimer"
+
+
 class NetworkSettings:
     """
     Settings applied to the networks.
@@ -55,7 +60,7 @@ class ObservationSettings:
 
 class SacSettings:
     def __init__(self):
-        self.actor = NetworkSettings()
+        self.actor = NetworkSettings()  # The learning rate of the actor is used by all the optimizers of SAC
         self.critic = NetworkSettings()
         self.alpha = NetworkSettings()
         self.target_update_period = 1
@@ -77,6 +82,10 @@ class AgentSettings:
         self.q_value_checkpoint_folder = None  # Provides critic networs to use as end q-value
         self.output_checkpoint_folder = None # type: Optional[str]
         self.reset_global_step = True
+        self.keep_buffer_from_start_checkpoint = False  # Continue from the replay buffer of the start checkpoint
+        self.shared_replay_buffer_folder = None  # type: Optional[str] # Used if the run shares the replay buffer
+        self.replay_buffer_shard = 0  # Shard of the shared replay buffer written by the agent
+        self.sac_settings = None  # type: Optional[SacSettings] # Replaces the SAC settings of the run
 
 
 class RunSettings:
@@ -86,6 +95,7 @@ class RunSettings:
         self.trains_per_episode = 3
         self.system = None
         self.n_clusters = 7
+        self.n_eval_scenarios = None  # type: Optional[int] # Reduce the evaluation forecast to this many scenarios
         self.train_intervals = 104  # [56, 100]
         self.train_step_frequency = "7D"  # ['3H', '7D']
         self.eval_intervals = 104  # [56, 100]
@@ -109,9 +119,22 @@ class RunSettings:
         )  # "White": White noise (N(0,1)), "Standard dev": Std.dev. of clusters, Off: No noise
         self.ensure_determinism = False  # Note that setting this flag to True this will reduce performance
         self.use_shared_replay_buffer = False
+        self.use_memmap_replay_buffer = True  # Store the replay buffer in memory mapped files with float16 features
         self.agent_algorithm = AgentAlgorithm.SAC
         self.log_to_tensorboard = True
         self.log_replay_buffer_when_finished = True
+        self.checkpoint_interval = 1  # type: Optional[int] # Evaluations between training checkpoints, None disables
+        self.rollout_workers = 0  # Processes stepping copies of the train env for a learner, 0 steps in the learner
+        self.policy_sync_period = 1000  # Steps between the rollout workers loading the policy of the learner
+        self.agents_per_process = 1  # Agents trained together in one process, sharing its environments and forecast
+        self.envs_per_agent = 1  # Copies of the train env stepped by each agent, with one forward pass of the policy
+        self.prefill_initial_collect = True  # Collect the initial episodes in one block before the training loop
+        self.exploration_policy = ExplorationPolicyType.Uniform  # Actions of the initially collected episodes
+        self.threads_per_agent = None  # type: Optional[int] # Cores of each agent, None shares the host cores
+        self.priority = 0  # Agents of runs with higher priority are started first when the host is full
+        self.pruning_rungs = None  # type: Optional[List[int]] # Steps where the worst agents are replaced by clones
+        self.pruning_fraction = 0.5  # Fraction of the agents pruned at each rung
+        self.perturbation_factor = None  # type: Optional[float] # Clones perturb the SAC settings of the best agent
 
 
 class SettingsEncoder(json.JSONEncoder):
@@ -0,0 +1,180 @@
+import os
+import pickle
+import random
+from typing import Any, Dict, Optional
+
+import numpy as np
+import torch as th
+from stable_baselines3.common.base_class import BaseAlgorithm
+from stable_baselines3.common.callbacks import BaseCallback
+
+from hps.rl.sac.replay_buffer import ReplayBufferCheckpoint
+
+# Counters and evaluation history of the EvalCallback, restored when training resumes
+EVAL_CALLBACK_STATE = [
+    "n_calls",
+    "best_mean_reward",
+    "last_mean_reward",
+    "evaluations_results",
+    "evaluations_timesteps",
+    "evaluations_length",
+    "evaluations_successes",
+]
+
+
+def _fsync(path: str):
+    with open(path, "rb+") as f:
+        os.fsync(f.fileno())
+
+
+def get_rng_state() -> Dict[str, Any]:
+    """
+    State of the global random generators of python, numpy and torch.
+    """
+    state = {"python": random.getstate(), "numpy": np.random.get_state(), "torch": th.get_rng_state()}
+    if th.cuda.is_available():
+        state["cuda"] = th.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state: Dict[str, Any]):
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    th.set_rng_state(state["torch"])
+    if "cuda" in state and th.cuda.is_available():
+        th.cuda.set_rng_state_all(state["cuda"])
+
+
+class TrainingCheckpoint:
+    """
+    Latest training state of an agent, used to resume the training after the process is killed.
+
+    A checkpoint holds the model with the optimizer states, the counters of the evaluation callback and the states
+    of the random generators. The model is written to a new file, and the checkpoint is switched to it by atomically
+    replacing ``state.pkl``, so a crash while saving leaves the previous checkpoint intact.
+
+    The replay buffer is saved by its append-only ``ReplayBufferCheckpoint``, and a memory mapped buffer continues
+    from its files. It can hold transitions collected after the checkpoint, they are kept when resuming.
+
+    :param path: Folder of the checkpoint
+    :type path: str
+    """
+
+    STATE = "state.pkl"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @staticmethod
+    def agent_folder(output_checkpoint_folder: str, agent_name: str) -> str:
+        """
+        Folder of the training checkpoint of an agent. The folder is named after the agent, so agents given the same
+        output folder do not overwrite each other's checkpoints.
+        """
+        return os.path.join(output_checkpoint_folder, "training_checkpoint", agent_name)
+
+    def exists(self) -> bool:
+        return os.path.isfile(os.path.join(self.path, self.STATE))
+
+    def save(
+        self,
+        model: BaseAlgorithm,
+        callback_state: Dict[str, Any],
+        replay_buffer_checkpoint: Optional[ReplayBufferCheckpoint] = None,
+    ):
+        """
+        Save the training state.
+
+        :param model: Model being trained
+        :type model: BaseAlgorithm
+        :param callback_state: Counters of the callbacks
+        :type callback_state: Dict[str, Any]
+        :param replay_buffer_checkpoint: Checkpoint the replay buffer is saved to, defaults to None
+        :type replay_buffer_checkpoint: Optional[ReplayBufferCheckpoint]
+        """
+        os.makedirs(self.path, exist_ok=True)
+        replay_buffer = getattr(model, "replay_buffer", None)
+        if replay_buffer_checkpoint is not None and replay_buffer is not None:
+            replay_buffer_checkpoint.save(replay_buffer, model.num_timesteps)
+
+        model_file = "model_{}.zip".format(model.num_timesteps)
+        model.save(os.path.join(self.path, model_file))
+        _fsync(os.path.join(self.path, model_file))
+
+        state = {
+            "model": model_file,
+            "num_timesteps": model.num_timesteps,
+            "callback": callback_state,
+            "rng": get_rng_state(),
+            "replay_buffer": None if replay_buffer_checkpoint is None else replay_buffer_checkpoint.path,
+        }
+        tmp_path = os.path.join(self.path, self.STATE + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.path, self.STATE))
+
+        for file in os.listdir(self.path):
+            if file.startswith("model_") and file != model_file:
+                os.remove(os.path.join(self.path, file))
+
+    def load_state(self) -> Dict[str, Any]:
+        with open(os.path.join(self.path, self.STATE), "rb") as f:
+            return pickle.load(f)
+
+    def load(self, model_class, env, **kwargs) -> BaseAlgorithm:
+        """
+        Load the model with its replay buffer and restore the random generators.
+
+        :param model_class: Algorithm of the model, e.g. SAC
+        :param env: Training environment
+        :param kwargs: Passed to ``model_class.load``, e.g. the replay buffer arguments
+        :return: The model, ready to continue learning with ``reset_num_timesteps=False``
+        :rtype: BaseAlgorithm
+        """
+        state = self.load_state()
+        model = model_class.load(os.path.join(self.path, state["model"]), env=env, **kwargs)
+
+        replay_buffer_path = state["replay_buffer"]
+        if replay_buffer_path is not None and ReplayBufferCheckpoint.exists(replay_buffer_path):
+            model.replay_buffer = ReplayBufferCheckpoint(replay_buffer_path).load(model.replay_buffer)
+            model.replay_buffer.device = model.device
+
+        # The environment is new, the episode in progress is not continued
+        model._last_obs = None
+        set_rng_state(state["rng"])
+        return model
+
+
+class TrainingCheckpointCallback(BaseCallback):
+    """
+    Save a training checkpoint every ``save_freq`` calls, after the evaluation callback at the same step.
+
+    :param checkpoint: Checkpoint to save to
+    :type checkpoint: TrainingCheckpoint
+    :param eval_callback: Evaluation callback, its counters and replay buffer checkpoint are saved
+    :param save_freq: Calls between checkpoints
+    :type save_freq: int
+    """
+
+    def __init__(self, checkpoint: TrainingCheckpoint, eval_callback, save_freq: int, verbose: int = 0):
+        super().__init__(verbose)
+        self.checkpoint = checkpoint
+        self.eval_callback = eval_callback
+        self.save_freq = save_freq
+
+    def _on_step(self) -> bool:
+        if self.save_freq > 0 and self.eval_callback.n_calls % self.save_freq == 0:
+            callback_state = {name: getattr(self.eval_callback, name) for name in EVAL_CALLBACK_STATE}
+            self.checkpoint.save(self.model, callback_state, self.eval_callback.replay_buffer_checkpoint)
+            if self.verbose > 0:
+                print("Saved training checkpoint at {} steps".format(self.model.num_timesteps))
+        return True
+
+    def restore(self, state: Dict[str, Any]):
+        """
+        Restore the counters of the evaluation callback from the state of a checkpoint.
+        """
+        for name, value in state["callback"].items():
+            setattr(self.eval_callback, name, value)
@@ -83,30 +83,38 @@ class HydroSystemSerializer:
         elif "array" in o:
             obj = np.array(o["array"])
         elif "HydroSystem" in o:
-            obj = HydroSystem(
-                name=o["HydroSystem"]["name"],
-                nodes=(
-                    o["HydroSystem"]["reservoirs"]
-                    + o["HydroSystem"]["power stations"]
-                    + o["HydroSystem"]["oceans"]
-                    + o["HydroSystem"]["creeks"]
-                    + o["HydroSystem"]["gates"]
-                ),
-            )
-
-            edges = o["HydroSystem"]["discharges"] + o["HydroSystem"]["spillages"] + o["HydroSystem"]["bypasses"]
-            for edge in edges:
-                parent_node = [node for node in obj.nodes if node.name == edge.parent][0]  # Assume unique names
-                child_node = [node for node in obj.nodes if node.name == edge.child][0]  # Assume unique names
-                edge.parent = parent_node
-                edge.child = child_node
-
-            obj.add_edges_from(edges)
+            obj = HydroSystemSerializer.build_hydro_system(o["HydroSystem"])
 
         if obj is not None:
             return obj
         return o
 
+    @staticmethod
+    def build_hydro_system(dct):
+        """Create a hydro system from its deserialized nodes and edges.
+
+        The edges refer to their parent and child by name, these are replaced by the node instances.
+
+        :param dct: Dictionary as created by :meth:`HydroSystem.to_dict`, with nodes and edges deserialized
+        :type dct: dict
+        :return: Hydro system
+        :rtype: HydroSystem
+        """
+        obj = HydroSystem(
+            name=dct["name"],
+            nodes=(dct["reservoirs"] + dct["power stations"] + dct["oceans"] + dct["creeks"] + dct["gates"]),
+        )
+
+        nodes = {node.name: node for node in obj.nodes}  # Assume unique names
+        edges = dct["discharges"] + dct["spillages"] + dct["bypasses"]
+        for edge in edges:
+            edge.parent = nodes[edge.parent]
+            edge.child = nodes[edge.child]
+
+        obj.add_edges_from(edges)
+
+        return obj
+
 
 # %%
 def dummy():
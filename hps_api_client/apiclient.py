@@ -1,3 +1,5 @@
+import threading
+
 import pandas as pd
 import requests
 from matplotlib import pyplot as plt
@@ -10,11 +12,25 @@ class ApiClient:
     def __init__(self, uri, return_json = False):
         self.uri = uri
         self.return_json = return_json
-    
+        self.local = threading.local()
+
+    @property
+    def session(self):
+        """Keep-alive session of the calling thread.
+
+        requests.Session is not thread safe, so each thread downloading concurrently gets a session of its own.
+        """
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({"Accept-Encoding": "gzip, deflate"})
+            self.local.session = session
+        return session
+
     def prep_content(self, response):
         json_data = response.json()
-        dataframe = pd.json_normalize(json_data)
-        return json_data, dataframe    
+        dataframe = None if self.return_json else pd.json_normalize(json_data)
+        return json_data, dataframe
 
     def error_check(self, response):
         if response.status_code != requests.codes.ok:
@@ -22,31 +38,36 @@ class ApiClient:
             response.raise_for_status()
 
     def fetch(self, uri):
-        response = requests.get(uri)
+        response = self.session.get(uri)
         self.error_check(response)
         return self.prep_content(response)
 
+    def fetch_json(self, uri):
+        response = self.session.get(uri)
+        self.error_check(response)
+        return response.json()
+
     def post_no_body(self, uri):
-        response = requests.post(uri)
+        response = self.session.post(uri)
         self.error_check(response)
         return self.prep_content(response)
 
     def post_with_body(self, uri, body):
-        response = requests.post(uri, json = body)
+        response = self.session.post(uri, json = body)
         self.error_check(response)
         return self.prep_content(response)
 
     def post_with_body_no_response(self, uri, body):
-        response = requests.post(uri, json = body)
+        response = self.session.post(uri, json = body)
         self.error_check(response)
 
     def put_with_body(self, uri, body):
-        response = requests.put(uri, json = body)
+        response = self.session.put(uri, json = body)
         self.error_check(response)
         return self.prep_content(response)
     
     def action(self, uri):
-        response = requests.put(uri)
+        response = self.session.put(uri)
         self.error_check(response)
         return response
     
@@ -81,9 +102,24 @@ class ApiClient:
 
     def get_forecast_data(self, forecast_uid, forecast_scenario):        
         forecast_uri = self.uri + "forecasts/{}/scenarios/{}".format(forecast_uid, forecast_scenario)
-    
+
+        if self.return_json:
+            return self.fetch_json(forecast_uri)
         forecast_data, df = self.fetch(forecast_uri)
-        return forecast_data if self.return_json else df
+        return df
+
+    def get_forecast_data_bulk(self, forecast_uid):
+        """Get all scenarios of a forecast in one request, or None if the server has no bulk endpoint.
+
+        The response has the format {"timeIndex": [...], "scenarios": [{"name", "inflowSeries", "priceSeries"}, ..]}
+        """
+        forecast_uri = self.uri + "forecasts/{}/scenarios".format(forecast_uid)
+
+        response = self.session.get(forecast_uri)
+        if response.status_code in (requests.codes.not_found, requests.codes.method_not_allowed):
+            return None
+        self.error_check(response)
+        return response.json()
 
     def create_forecast(self, forecast_name, hydro_system_uid):
         args = {"hydrosystemUid" : hydro_system_uid, "forecastName" : forecast_name}
@@ -1,3 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
 from hps_api_client.poco import *
 from hps_api_client.apiclient import ApiClient
 import tqdm
@@ -8,17 +12,22 @@ class ApiProxy:
     Part of the HydroRL SDK, facilitates access to the HydroRL API by constructing
     client-side objects and pandas dataframes from the API results.
     """
+
+    # Server uri -> whether it has the bulk forecast endpoint, shared by the proxies of the process
+    bulk_forecast_endpoints = {}
     
-    def __init__(self, uri : str = "http://hps/api/v1/"):
+    def __init__(self, uri : str = "http://hps/api/v1/", max_workers : int = 8):
         """Constructs the proxy and binds it the the provided uri.
         
         Parameters
         ----------
         uri : Uri for the API instance.
+        max_workers : Maximum number of scenarios downloaded concurrently.
         user_name : Assigned username
         password : Assigned password"""
 
         self.uri = uri
+        self.max_workers = max_workers
         self.api_client = ApiClient(uri, True)
 
     def get_hydro_systems(self) -> ApiHydroSystemCollection:
@@ -94,26 +103,43 @@ class ApiProxy:
         """Get data for the entire forcast.
 
         The resulting Dataframe is MultiIndex'ed with price and inflow for each scenario.
-        Since retrieval is somewhat time consuming, a progressbar is displayed while loading the dataframe.
+        The forecast is downloaded in one request if the server supports it, otherwise the scenarios are 
+        downloaded concurrently while a progressbar is displayed.
 
         Parameters
         ----------
         forecast : The forecast to retrieve data for.
         """
 
+        if ApiProxy.bulk_forecast_endpoints.get(self.uri) is not False:
+            bulk_data = self.api_client.get_forecast_data_bulk(forecast.uid)
+            ApiProxy.bulk_forecast_endpoints[self.uri] = bulk_data is not None
+            if bulk_data is not None:
+                scenarios = [s["name"] for s in bulk_data["scenarios"]]
+                return self._forecast_frame(scenarios, bulk_data["timeIndex"], bulk_data["scenarios"])
+
         scenarios = self.get_forecast_scenarios(forecast)
-        data = {}
 
-        for scenario in tqdm.tqdm(scenarios):
-            scen_data = ApiForecastScenario(self.api_client.get_forecast_data(forecast.uid, scenario))
-            data[("Price", scenario)] = scen_data.priceSeries
-            data[("Inflow", scenario)] = scen_data.inflowSeries
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            responses = executor.map(
+                lambda scenario: self.api_client.get_forecast_data(forecast.uid, scenario), scenarios
+            )
+            scenario_data = list(tqdm.tqdm(responses, total=len(scenarios)))
 
+        return self._forecast_frame(scenarios, scenario_data[0]["timeIndex"], scenario_data)
 
-        df = pd.DataFrame(data)
-        df["Date"] = pd.to_datetime(scen_data.timeIndex)
-        df.set_index("Date", inplace=True)
-        return df
+    @staticmethod
+    def _forecast_frame(scenarios, time_index, scenario_data) -> pd.DataFrame:
+        """Write the price and inflow of each scenario into a preallocated MultiIndex'ed frame."""
+
+        values = np.empty((len(time_index), 2 * len(scenarios)))
+        for i, data in enumerate(scenario_data):
+            values[:, 2 * i] = data["priceSeries"]
+            values[:, 2 * i + 1] = data["inflowSeries"]
+
+        columns = pd.MultiIndex.from_tuples([(kind, scenario) for scenario in scenarios for kind in ("Price", "Inflow")])
+        index = pd.DatetimeIndex(pd.to_datetime(time_index), name="Date")
+        return pd.DataFrame(values, index=index, columns=columns, copy=False)
 
     def add_forecast(self, forecast_name : str, hydro_system : ApiHydroSystem, data : pd.DataFrame):
         """Add a new forecast associated with the specified hydro system.
@@ -152,13 +178,18 @@ class ApiProxy:
 
         forecast = ApiForecast(self.api_client.create_forecast(forecast_name, hydro_system.uid))
 
-        scenarios = list(set([i[1] for i in data.columns]))
+        scenarios = list(dict.fromkeys([i[1] for i in data.columns]))
 
+        # The time index is formatted once for all scenarios, and the columns are converted as a whole
+        time_index = pd.DatetimeIndex(data.index)
+        if time_index.tz is not None:
+            time_index = time_index.tz_convert("UTC")
+        time_index = time_index.strftime("%Y-%m-%dT%H:%M:%S.%fZ").tolist()
         for scenario in tqdm.tqdm(scenarios):
             fc = ApiForecastScenario({})
-            fc.timeIndex = [str(t) for t in data.index]
-            fc.inflowSeries = [float(t) for t in data[("Inflow", scenario)]]
-            fc.priceSeries = [float(p) for p in data[("Price", scenario)]]
+            fc.timeIndex = time_index
+            fc.inflowSeries = data[("Inflow", scenario)].astype(float).tolist()
+            fc.priceSeries = data[("Price", scenario)].astype(float).tolist()
             self.api_client.add_forecast_scenario(forecast.uid, scenario, fc.to_dict())
 
         print("Forecast '{}' with {} scenarios succeessfully uploaded to server".format(forecast_name, len(scenarios)))
@@ -287,4 +287,33 @@ def hydro_system():
     return HydroSystem(
         nodes=[res1, res2, res3, ps1, ps2, gate, ocean],
         edges=[dis1, dis2, dis3, dis4, dis5, dis6, spi, spi2, spi3, byp]
-    )
\ No newline at end of file
+    )
+
+
+def hydro_system_cascade(n_reservoirs=500):
+    """Synthetic cascade of reservoirs, each discharging through a power station to the next reservoir."""
+    hydro_system = HydroSystem()
+
+    reservoirs = []
+    stations = []
+    for i in range(1, n_reservoirs + 1):
+        head = LinearHeadFunction(lrv=100 + 10*i, hrv=105 + 10*i, v_min=0, v_max=100)
+        reservoirs.append(
+            Reservoir(f"res{i}", 0, 100, inflow_model=ScaleYearlyInflowModel(mean_yearly_inflow=100), head=head))
+
+        gen_func = ConstantGenerationFunction(10, 50, 0.5)
+        stations.append(
+            PowerStation(f"station{i}", 2e4, initial_state=False, generation_function=gen_func, nominal_discharge=100))
+    ocean = Ocean("ocean")
+
+    hydro_system.add_nodes_from(reservoirs + stations + [ocean])
+
+    lower_nodes = reservoirs[1:] + [ocean]
+    for res, station, lower in zip(reservoirs, stations, lower_nodes):
+        hydro_system.add_edges_from([
+            Discharge(res, station, max_flow=100),
+            Discharge(station, lower, max_flow=100),
+            Spillage(res, lower)
+        ])
+
+    return hydro_system
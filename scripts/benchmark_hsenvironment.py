@@ -0,0 +1,72 @@
+#%%
+import sys, os
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from core.timeindex import FromPeriodTimeIndexer
+from core.value_scaler import Discounter, PriceScaler, RewardScaler
+from hps.exogenous.inflow_and_price import InflowPriceForecastData, InflowPriceSampler
+from hps.rl.environment.hsenvironment import HSEnvironment
+from hps.rl.environment.observations_generator import ObservationsGenerator
+from hps.rl.settings import ObservationSettings
+from hydro_systems import HSGen
+
+n_steps = 104
+n_episodes = 50
+repeats = 5
+
+rng = np.random.default_rng(0)
+index = pd.date_range("2020-01-01", periods=3 * 365, freq="1D")
+columns = ["scenario_{}".format(i) for i in range(10)]
+inflow = pd.DataFrame(rng.uniform(5, 50, size=(len(index), len(columns))), index=index, columns=columns)
+price = pd.DataFrame(rng.uniform(10, 80, size=(len(index), len(columns))), index=index, columns=columns)
+forecast_data = InflowPriceForecastData("small", inflow=inflow, price=price)
+
+time_indexer = FromPeriodTimeIndexer(from_datetime=index[0], periods=n_steps, freq="7D")
+sampler = InflowPriceSampler(forecast_data, time_indexer, is_eval=True)
+
+observation_settings = ObservationSettings()
+observation_settings.global_max_price = 80.0
+observation_settings.global_max_inflow = 50.0
+
+hydro_system = HSGen.create_system("small", {"res1": 100.0}, price_of_spillage=0.0, use_linear_model=False)
+
+
+def make_env(is_eval):
+    return HSEnvironment(
+        name="evaluate" if is_eval else "train",
+        hydro_system=HSGen.create_system("small", {"res1": 100.0}, price_of_spillage=0.0, use_linear_model=False),
+        time_indexer=time_indexer,
+        inflow_price_sampler=sampler,
+        observations_generator=ObservationsGenerator(observation_settings, time_indexer, is_eval=is_eval),
+        reward_scaler=RewardScaler(hydro_system.maximum_production, n_steps, time_indexer.sum_hours / n_steps, 10),
+        discounter=Discounter(discount_rate=0.04, time_indexer=time_indexer),
+        price_scaler=PriceScaler(max_value=80.0, min_value=0, scale_by=1),
+        initial_collect_episodes=0,
+        is_eval=is_eval,
+    )
+
+
+actions = rng.uniform(0, 1, size=(n_steps, hydro_system.get_num_actions())).astype(np.float32)
+
+
+def run_episodes(env):
+    for _ in range(n_episodes):
+        env.reset()
+        for action in actions:
+            env.step(action)
+
+
+print("HSEnvironment.step on the small system, {} steps per episode".format(n_steps))
+for is_eval in [False, True]:
+    env = make_env(is_eval)
+    timings = timeit.repeat(lambda: run_episodes(env), number=1, repeat=repeats)
+    print("{}: best: {:.2f} us/step, mean: {:.2f} us/step".format(
+        env.name,
+        min(timings) / (n_episodes * n_steps) * 1e6,
+        sum(timings) / repeats / (n_episodes * n_steps) * 1e6,
+    ))
@@ -0,0 +1,20 @@
+#%%
+import sys, os
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+import timeit
+from contextlib import redirect_stdout
+
+from hps.rl.builders.hydro_rl_builder import HydroRLBuilder
+from hydro_system_models import hydro_system_cascade
+
+n_reservoirs = 500
+repeats = 5
+
+hydro_system = hydro_system_cascade(n_reservoirs)
+
+with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+    timings = timeit.repeat(lambda: HydroRLBuilder.Build(hydro_system), number=1, repeat=repeats)
+
+print("HydroRLBuilder.Build on a {} reservoir cascade".format(n_reservoirs))
+print("best: {:.4f} s, mean: {:.4f} s".format(min(timings), sum(timings) / repeats))
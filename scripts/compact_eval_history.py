@@ -0,0 +1,45 @@
+"""
+Downsample the evaluation reports of old steps, keeping the best step and the last evaluated steps of each agent at
+full resolution. Safe to run while agents are training, e.g. nightly.
+
+    python scripts/compact_eval_history.py [--keep-last 5] [--bin-size 24] [--vacuum] [--enable-incremental-vacuum]
+"""
+import sys, os
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+
+import argparse
+import logging
+
+from sqlalchemy.orm import sessionmaker
+
+from server.db_connection import create_engine
+from server.history_compaction import HistoryCompaction, incremental_vacuum
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Downsample the evaluation reports of old steps")
+    parser.add_argument("--keep-last", type=int, default=5, help="Last evaluated steps kept at full resolution")
+    parser.add_argument("--bin-size", type=int, default=24, help="Number of values averaged into one")
+    parser.add_argument("--vacuum", action="store_true", help="Return the free pages to the file system")
+    parser.add_argument(
+        "--enable-incremental-vacuum",
+        action="store_true",
+        help="Switch the database to auto_vacuum=INCREMENTAL with a full VACUUM, which locks the database",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    engine = create_engine()
+    if args.enable_incremental_vacuum:
+        with engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+            connection.exec_driver_sql("VACUUM")
+
+    session = sessionmaker(bind=engine)()
+    n_compacted = HistoryCompaction(session, keep_last=args.keep_last, bin_size=args.bin_size).run()
+    session.close()
+    print("Compacted {} report series steps".format(n_compacted))
+
+    if args.vacuum:
+        print("Freed {} pages".format(incremental_vacuum(engine)))
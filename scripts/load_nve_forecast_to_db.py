@@ -11,12 +11,11 @@ import pandas as pd
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from server.appsettings import appSettings
-import urllib3 as url3
-import json
 
 from hps.exogenous.nve_forecast import DbClient, NVEDataClient
 from hps.exogenous.lyse_forecast import populate_forecast_from_df_to_db
 from hps.exogenous.inflow_and_price import get_start_end_time_forecast, read_forecast_from_db
+from hps_api_client.apiproxy import ApiProxy
 
 #%%
 config = configparser.ConfigParser(interpolation=None)
@@ -110,40 +109,14 @@ if not (dd_i.index == dd_p.index).all(): # Assert equal time index
 
 
 #%%
-#Set up metadata for webreq
-webreq=url3.PoolManager(num_pools=1)
-base_uri = "http://leviathan:5400/api/v1/"
-# Get hydrosystems
-response = webreq.request("GET", base_uri + "hydrosystems")
-hs_dt = pd.read_json(response.data)
-#%%
-# Create forecasts
-forecast_uid = []
-for index, row in hs_dt.iterrows():
-    hs_uid = row["uid"]
-    forecast_name = "NVE+Spot forecast"
-    response = webreq.request("POST", base_uri + "forecasts?hydrosystemUid={0}&forecastName={1}".format(hs_uid, forecast_name))
-    forecast_uid.append(json.loads(response.data)["uid"])
-#%%
-years = list(dd_p.columns)
-print("loading a total of {0} forecasts".format(len(forecast_uid)))
-for forecast in forecast_uid:
-    print("Loading forecast_uid {0}".format(forecast))
-    for year in years:
-        print("\tLoading scenario {0}".format(year))
-        ht = {}
-        ht["inflowSeries"] = dd_i[year].to_list()
-        ht["priceSeries"] = dd_p[year].to_list()
-        ht["timeIndex"] = dd_p.index.strftime("%Y-%m-%dT%H:%M:%S.%fZ").to_list()
-        forecast_body = json.dumps(ht)
-
-        response = webreq.request(
-            method="POST", 
-            url=base_uri + "forecasts/{0}?scenario={1}".format(forecast, year), 
-            body=forecast_body,
-            headers={"Content-Type": "application/json"})
-        if(response.data != b''):
-            print(response.data)
+# Upload the forecast to every hydro system
+api_proxy = ApiProxy("http://leviathan:5400/api/v1/")
+forecast_data = pd.concat({"Price": dd_p, "Inflow": dd_i}, axis=1)
+hydro_systems = api_proxy.get_hydro_systems()
+print("loading a total of {0} forecasts".format(len(hydro_systems)))
+for hydro_system in hydro_systems:
+    print("Loading forecast for {0}".format(hydro_system.name))
+    api_proxy.add_forecast("NVE+Spot forecast", hydro_system, forecast_data)
 
 
 
@@ -0,0 +1,97 @@
+"""
+Copy ReportValues and TrainStepValues into the packed tables read by server.packed_series.
+
+    python scripts/migrate_packed_series.py [--delete] [--vacuum]
+
+Series that already have packed values are skipped, so the migration can be resumed. With --delete the copied rows
+are removed from the original tables, and --vacuum shrinks the SQLite file afterwards.
+"""
+import sys, os
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+
+import argparse
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from server.appsettings import appSettings
+from server.model import PackedReportValue, PackedStepValue, ReportValue, StepValue
+from server.packed_series import PackedStepSeries, add_report_values, create_packed_tables
+
+
+def migrate_report_series(session, report_series_id, delete):
+    rows = session.execute(
+        select(ReportValue.Step, ReportValue.TimeStamp, ReportValue.Value)
+        .where(ReportValue.ReportSeriesId == report_series_id)
+        .order_by(ReportValue.Step, ReportValue.Index)
+    ).all()
+    steps = np.array([row[0] for row in rows])
+    values = np.array([row[2] for row in rows])
+    boundaries = np.flatnonzero(np.diff(steps)) + 1
+    for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(rows)]):
+        time_index = pd.DatetimeIndex([row[1] for row in rows[start:end]])
+        add_report_values(session, report_series_id, int(steps[start]), time_index, values[start:end])
+    if delete:
+        session.query(ReportValue).filter_by(ReportSeriesId=report_series_id).delete(synchronize_session=False)
+    session.commit()
+    return len(rows)
+
+
+def migrate_step_series(session, step_series_id, delete):
+    rows = session.execute(
+        select(StepValue.Step, StepValue.TimeStamp, StepValue.Value)
+        .where(StepValue.StepSeriesId == step_series_id)
+        .order_by(StepValue.Step)
+    ).all()
+    series = PackedStepSeries(session, step_series_id)
+    for step, time_stamp, value in rows:
+        series.append(step, pd.Timestamp(time_stamp), value)
+    if delete:
+        session.query(StepValue).filter_by(StepSeriesId=step_series_id).delete(synchronize_session=False)
+    session.commit()
+    return len(rows)
+
+
+def migrate(session, delete=False):
+    create_packed_tables(session)
+
+    packed = {row[0] for row in session.query(PackedReportValue.ReportSeriesId).distinct()}
+    report_series = [row[0] for row in session.query(ReportValue.ReportSeriesId).distinct()]
+    n_rows = 0
+    for report_series_id in report_series:
+        if report_series_id not in packed:
+            n_rows += migrate_report_series(session, report_series_id, delete)
+        elif delete:  # Packed by an earlier run
+            session.query(ReportValue).filter_by(ReportSeriesId=report_series_id).delete(synchronize_session=False)
+            session.commit()
+    print("Packed {} report values of {} series".format(n_rows, len(report_series)))
+
+    packed = {row[0] for row in session.query(PackedStepValue.StepSeriesId).distinct()}
+    step_series = [row[0] for row in session.query(StepValue.StepSeriesId).distinct()]
+    n_rows = 0
+    for step_series_id in step_series:
+        if step_series_id not in packed:
+            n_rows += migrate_step_series(session, step_series_id, delete)
+        elif delete:
+            session.query(StepValue).filter_by(StepSeriesId=step_series_id).delete(synchronize_session=False)
+            session.commit()
+    print("Packed {} train step values of {} series".format(n_rows, len(step_series)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy report and train step values into the packed tables")
+    parser.add_argument("--delete", action="store_true", help="Remove the copied rows from the original tables")
+    parser.add_argument("--vacuum", action="store_true", help="Shrink the SQLite file after the migration")
+    args = parser.parse_args()
+
+    engine = create_engine(appSettings.get_connection_string())
+    session = sessionmaker(bind=engine)()
+    migrate(session, delete=args.delete)
+    session.close()
+
+    if args.vacuum:
+        with engine.connect() as connection:
+            connection.exec_driver_sql("VACUUM")
@@ -5,13 +5,14 @@ per_process_gpu_init()
 from hps.rl.builders.rl_builder import RlBuilder
 from hps.rl.agent_runner import AgentRunner
 from sqlalchemy import desc
-from server.db_connection import create_engine
+from server.db_connection import get_engine, retry_commit
 from sqlalchemy.orm import sessionmaker, joinedload
 from model import Project, Agent, AgentControl, ProjectRun
 import uuid
 from datetime import datetime as dt
 from server.namegenerator import get_random_name
 from db_logger import DbLogger
+from server.agent_scheduler import apply_thread_budget
 
 import numpy as np
 import os
@@ -26,11 +27,17 @@ TERMINATE_CHECK_INTERVAL = 2
 
 
 class AgentExecutor:
-    def __init__(self, project_guid, project_run_id, agent_index, step_offset, parent_id):
+    def __init__(self, project_guid, project_run_id, agent_index, step_offset, parent_id, agent_id=None):
+        """
+        Trains an agent of a project run.
+
+        With agent_id, the agent was interrupted, e.g. by a restart of the server. It continues from its training
+        checkpoint and logs to the same agent.
+        """
 
         np.random.seed()
 
-        self.engine = create_engine()
+        self.engine = get_engine()
         self.Session = sessionmaker(bind=self.engine)
         self.session = self.Session()
         self.project = self.session.query(Project).filter_by(ProjectUid=project_guid).first()
@@ -44,27 +51,39 @@ class AgentExecutor:
         self.agent_name = get_random_name()
 
         self.best_model_path = self.agent_settings.output_checkpoint_folder
-        self.agent = Agent(
-            ProjectId=self.project.ProjectId,
-            ProjectRunId=self.run_id,
-            AgentUid=self.agent_settings.name,
-            Seed=self.agent_settings.seed,
-            BestModelPath=self.best_model_path,
-            StartTime=str(dt.now()),
-            Ancestor=parent_id,
-        )
+        self.resume = agent_id is not None
+        if self.resume:
+            self.agent = self.session.query(Agent).filter_by(AgentId=agent_id).first()
+        else:
+            self.agent = Agent(
+                ProjectId=self.project.ProjectId,
+                ProjectRunId=self.run_id,
+                AgentUid=self.agent_settings.name,
+                Seed=self.agent_settings.seed,
+                BestModelPath=self.best_model_path,
+                StartTime=str(dt.now()),
+                Ancestor=parent_id,
+            )
 
         self.start_model_path = None
         if parent_id is not None:
             parent_agent = self.session.query(Agent).filter_by(AgentId=parent_id).first()
             self.start_model_path = parent_agent.BestModelPath
 
-        self.session.add(self.agent)
-        self.session.commit()
+        retry_commit(self.session, lambda: self.session.add(self.agent))
         self.step_offset = step_offset
         self.last_terminate_check_time = None
 
-        self.db_logger = DbLogger(self.session, self.agent.AgentId, project_run_id, "scalars", "plot")
+        self.db_logger = DbLogger(
+            self.session,
+            self.agent.AgentId,
+            project_run_id,
+            "scalars",
+            "plot",
+            packed=appSettings.use_packed_series(),
+        )
+        if self.resume:
+            self.db_logger.continue_series()
 
     def should_terminate(self):
         if self.last_terminate_check_time is None:
@@ -118,9 +137,12 @@ class AgentExecutor:
         )
 
         if new_best["eval"]:
-            self.agent.BestStep = step
-            self.agent.BestStepValue = avg_return
-            self.session.commit()
+
+            def set_best_step():
+                self.agent.BestStep = step
+                self.agent.BestStepValue = avg_return
+
+            retry_commit(self.session, set_best_step)
 
     def get_best_step(self):
         return self.agent.BestStep
@@ -135,18 +157,51 @@ class AgentExecutor:
         self.settings.train_episodes = self.settings.train_episodes - self.step_offset
 
         rl_builder = RlBuilder(self.settings, self.agent_settings, self.project_run)
-        runner = rl_builder.build(self)
+        runner = rl_builder.build(self, resume=self.resume)
         runner.run()
+        self.finish()
 
+    def finish(self):
         end_time = str(dt.now())
         self.db_logger.terminate_series(end_time)
-        self.agent.EndTime = end_time
-        self.session.commit()
+        retry_commit(self.session, lambda: setattr(self.agent, "EndTime", end_time))
 
     def log_h_params(self, h_params):
         pass
 
 
-def execute_agent(project_guid, project_run_id, agent_index, step_offset, parent_id):
-    executor = AgentExecutor(project_guid, project_run_id, agent_index, step_offset, parent_id)
+def execute_agent(
+    project_guid, project_run_id, agent_index, step_offset, parent_id, agent_id=None, cores=None, n_threads=None
+):
+    if cores is not None:
+        apply_thread_budget(cores, n_threads)
+    executor = AgentExecutor(project_guid, project_run_id, agent_index, step_offset, parent_id, agent_id)
     executor.run()
+
+
+def execute_population(
+    project_guid, project_run_id, agent_indices, step_offset, parent_ids, agent_ids, cores=None, n_threads=None
+):
+    """
+    Train several agents of a project run together in this process, see AgentRunner.run_population. Each agent logs
+    to its own Agent, and is stopped by its own control signal.
+    """
+    if cores is not None:
+        apply_thread_budget(cores, n_threads)
+    executors = [
+        AgentExecutor(project_guid, project_run_id, agent_index, step_offset, parent_id, agent_id)
+        for agent_index, parent_id, agent_id in zip(agent_indices, parent_ids, agent_ids)
+    ]
+    settings = executors[0].settings
+    settings.train_episodes = settings.train_episodes - step_offset
+
+    runners = RlBuilder.build_population(
+        settings,
+        [executor.agent_settings for executor in executors],
+        executors[0].project_run,
+        executors,
+        resume=any(executor.resume for executor in executors),
+    )
+    AgentRunner.run_population(runners)
+    for executor in executors:
+        executor.finish()
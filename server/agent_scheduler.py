@@ -0,0 +1,200 @@
+import fcntl
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import List, Optional
+
+
+def host_cores() -> List[int]:
+    """
+    The cores the process may run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def apply_thread_budget(cores: List[int], n_threads: int):
+    """
+    Pin the calling process to cores and limit the threads used by the numerical libraries to n_threads. Called by
+    an agent process before building the agent.
+
+    :param cores: Cores of the agent
+    :type cores: List[int]
+    :param n_threads: Number of intra-op threads
+    :type n_threads: int
+    """
+    import torch
+
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(n_threads)
+    torch.set_num_threads(n_threads)
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Process of another user
+    try:
+        # A process that ended stays a zombie until its parent waits for it
+        with open("/proc/{}/stat".format(pid)) as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+class AgentScheduler:
+    def __init__(self, folder: str, cores: Optional[List[int]] = None):
+        """
+        Assigns cores to the agents of all the runs on the host. The runs share the state through files in folder,
+        as each run is managed by its own process.
+
+        An agent is submitted with the number of cores it needs and the priority of its run, and is started when
+        try_start assigns it cores. Waiting agents are started strictly by priority, then in submission order, so a
+        large agent is not starved by smaller ones behind it. The cores of an agent are freed by release, or when
+        its process is no longer alive.
+
+        :param folder: Folder with the state of the scheduler, shared by all the runs on the host
+        :type folder: str
+        :param cores: Cores available to the agents, defaults to the cores of the host
+        :type cores: Optional[List[int]]
+        """
+        self.folder = folder
+        self.cores = sorted(cores) if cores is not None else host_cores()
+        self.queue_folder = os.path.join(folder, "queue")
+        self.lease_folder = os.path.join(folder, "leases")
+        os.makedirs(self.queue_folder, exist_ok=True)
+        os.makedirs(self.lease_folder, exist_ok=True)
+
+    def threads_per_agent(self, n_agents: int) -> int:
+        """
+        Number of cores of each agent when n_agents share the host.
+        """
+        return max(1, len(self.cores) // max(1, n_agents))
+
+    def submit(self, run_id: int, agent_name: str, n_threads: int, priority: int = 0) -> str:
+        """
+        Queue an agent.
+
+        :param run_id: Project run of the agent
+        :type run_id: int
+        :param agent_name: Name of the agent
+        :type agent_name: str
+        :param n_threads: Number of cores of the agent, at most the number of cores of the scheduler
+        :type n_threads: int
+        :param priority: Priority of the run, higher is started first, defaults to 0
+        :type priority: int
+        :return: Ticket of the agent
+        :rtype: str
+        """
+        ticket = str(uuid.uuid4())
+        entry = {
+            "run": run_id,
+            "agent": agent_name,
+            "threads": min(max(1, n_threads), len(self.cores)),
+            "priority": priority,
+            "time": time.time(),
+            "pid": os.getpid(),  # The submitting process, until the agent process is started
+        }
+        with self._locked():
+            self._write(os.path.join(self.queue_folder, ticket), entry)
+        return ticket
+
+    def try_start(self, ticket: str) -> Optional[List[int]]:
+        """
+        Assign cores to a queued agent if the agents before it are started and enough cores are free.
+
+        :param ticket: Ticket of the agent
+        :type ticket: str
+        :return: Cores of the agent, None if it has to wait
+        :rtype: Optional[List[int]]
+        """
+        with self._locked():
+            leases = self._read_all(self.lease_folder)
+            queue = self._read_all(self.queue_folder)
+            if ticket not in queue:
+                raise ValueError("Unknown ticket {}".format(ticket))
+
+            leased = {core for lease in leases.values() for core in lease["cores"]}
+            free = [core for core in self.cores if core not in leased]
+            for waiting, entry in sorted(queue.items(), key=lambda item: (-item[1]["priority"], item[1]["time"])):
+                if entry["threads"] > len(free):
+                    return None
+                cores, free = free[: entry["threads"]], free[entry["threads"] :]
+                if waiting == ticket:
+                    entry["cores"] = cores
+                    self._write(os.path.join(self.lease_folder, ticket), entry)
+                    os.remove(os.path.join(self.queue_folder, ticket))
+                    return cores
+            return None
+
+    def set_pid(self, ticket: str, pid: int):
+        """
+        Bind the cores of an agent to its process, the cores are freed when the process ends.
+        """
+        with self._locked():
+            path = os.path.join(self.lease_folder, ticket)
+            entry = self._read(path)
+            if entry is not None:
+                entry["pid"] = pid
+                self._write(path, entry)
+
+    def release(self, ticket: str):
+        """
+        Remove a queued agent or free the cores of a started agent.
+        """
+        with self._locked():
+            for folder in (self.queue_folder, self.lease_folder):
+                if os.path.exists(os.path.join(folder, ticket)):
+                    os.remove(os.path.join(folder, ticket))
+
+    def status(self):
+        """
+        The started and the queued agents.
+        """
+        with self._locked():
+            return {"leases": self._read_all(self.lease_folder), "queue": self._read_all(self.queue_folder)}
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.folder, "lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_all(self, folder):
+        """
+        The entries of a folder, removing those of processes that are no longer alive.
+        """
+        entries = {}
+        for ticket in os.listdir(folder):
+            path = os.path.join(folder, ticket)
+            entry = self._read(path)
+            if entry is None or not _is_alive(entry["pid"]):
+                os.remove(path)
+            else:
+                entries[ticket] = entry
+        return entries
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    @staticmethod
+    def _write(path, entry):
+        with open(path + ".tmp", "w") as f:
+            json.dump(entry, f)
+        os.replace(path + ".tmp", path)
@@ -35,6 +35,14 @@ except Exception as e:
 logger.info("Service started")
 
 
+def cached_response(cached):
+    """Response with the ETag of the cached body, 304 if the client already has it."""
+    response = Response(cached.body, mimetype=cached.mimetype)
+    response.set_etag(cached.etag)
+    response.cache_control.no_cache = True  # Clients revalidate with If-None-Match
+    return response.make_conditional(request)
+
+
 @app.route("/create_run_settings/<path:project_uid>/<path:agent_id>")
 @app.route("/create_run_settings/<path:project_uid>")
 def create_run_settings(project_uid, agent_id=None):
@@ -76,8 +84,7 @@ def evaluate(eval_id):
 @app.route("/drawing/<path:system>")
 def get_image(system):
     try:
-        image = reqHandler.get_image(system)
-        return Response(image.getvalue(), mimetype="image/png")
+        return cached_response(reqHandler.get_image(system))
     except Exception as e:
         e_str = "Exception encountered in /drawing/<path:system>:\n"
         logger.exception(e_str + format_exception(e))
@@ -95,11 +102,23 @@ def postCsv(filetype):
         raise e
 
 
+@app.route("/ingestion/<path:job_id>")
+def get_ingestion_status(job_id):
+    try:
+        status = reqHandler.get_ingestion_status(job_id)
+        if status is None:
+            return Response("Unknown ingestion job " + job_id, status=404)
+        return status
+    except Exception as e:
+        e_str = "Exception encountered in /ingestion/<path:job_id>:\n"
+        logger.exception(e_str + format_exception(e))
+        raise e
+
+
 @app.route("/hydropowersystem/<path:system>")
 def get_hydrosystem(system):
     try:
-        system = reqHandler.get_system(system)
-        return Response(system, mimetype="application/json")
+        return cached_response(reqHandler.get_system(system))
     except Exception as e:
         e_str = "Exception encountered in /hydropowersystem/<path:system>:\n"
         logger.exception(e_str + format_exception(e))
@@ -9,6 +9,12 @@ class AppSettings:
     def use_gpu(self):
         return True
 
+    def use_packed_series(self):
+        return self.settings.get("PackedSeries", False)
+
+    def resume_runs_on_start(self):
+        return self.settings.get("ResumeRuns", True)
+
     def get_connection_string(self):
         return self.settings["ConnectionStrings"]["PConnection"]
 
@@ -21,6 +27,15 @@ class AppSettings:
     def get_checkpoint_folder(self, project_run_uid, agent_name):
         return self.get_workspace_folder() + "projects/" + project_run_uid + "/" + agent_name + "/checkpoints"
 
+    def get_shared_replay_buffer_folder(self, project_run_uid, generation=0):
+        return self.get_workspace_folder() + "projects/" + project_run_uid + "/replay_buffer/" + str(generation)
+
+    def get_system_folder(self):
+        return self.get_workspace_folder() + "systems/"
+
+    def get_scheduler_folder(self):
+        return self.get_workspace_folder() + "scheduler/"
+
     def get_logging_config(self):
         return self.settings["PLogConfig"]
 
@@ -1,7 +1,145 @@
-from server.appsettings import appSettings
+import contextlib
+import logging
+import os
+import random
+import threading
+import time
+
 import sqlalchemy
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from server.appsettings import appSettings
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  # Readers do not block the writer
+    "synchronous": "NORMAL",  # Durable in WAL mode except for the last transactions on power loss
+    "mmap_size": 256 * 1024**2,
+    "cache_size": -64 * 1024,  # Negative values are KiB
+}
+
+_lock = threading.Lock()
+_engine = None
+_engine_pid = None
+_session_factory = None
+
+logger = logging.getLogger(__name__)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute("PRAGMA {} = {}".format(name, value))
+    cursor.close()
 
 
 def create_engine():
+    """
+    Create an engine for the database in the app settings. SQLite connections wait up to 60 s for locks and are
+    configured with SQLITE_PRAGMAS. Use get_engine to share the engine of the process.
+    """
     engine = sqlalchemy.create_engine(appSettings.get_connection_string(), connect_args={"timeout": 60})
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
     return engine
+
+
+def get_engine():
+    """
+    The engine shared by the process, created on first use. A child process creates its own engine.
+    """
+    global _engine, _engine_pid, _session_factory
+    with _lock:
+        if _engine is None or _engine_pid != os.getpid():
+            _engine = create_engine()
+            _engine_pid = os.getpid()
+            _session_factory = sessionmaker(bind=_engine)
+        return _engine
+
+
+def create_session():
+    """
+    New session of the shared engine. The caller closes it.
+    """
+    get_engine()
+    return _session_factory()
+
+
+@contextlib.contextmanager
+def session_scope():
+    """
+    Session that is committed when the block exits, and rolled back if it raises.
+
+        with session_scope() as session:
+            session.add(...)
+    """
+    session = create_session()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def is_busy(error: Exception) -> bool:
+    return isinstance(error, OperationalError) and "database is locked" in str(error.orig).lower()
+
+
+def retry_on_busy(function, retries: int = 5, base_delay: float = 0.1, max_delay: float = 5.0):
+    """
+    Call function, retrying with jittered exponential backoff while the database is locked. The busy timeout of the
+    connection does not apply when a read transaction in WAL mode cannot become a write transaction, SQLite then
+    reports the database as locked immediately and the transaction has to be rolled back and run again.
+
+    :param function: Function running a complete transaction, e.g. with session_scope
+    :param retries: Number of retries, defaults to 5
+    :type retries: int
+    :param base_delay: Delay before the first retry in seconds, defaults to 0.1
+    :type base_delay: float
+    :param max_delay: Maximum delay in seconds, defaults to 5.0
+    :type max_delay: float
+    :return: Return value of function
+    """
+    for attempt in range(retries + 1):
+        try:
+            return function()
+        except OperationalError as e:
+            if attempt == retries or not is_busy(e):
+                raise
+            delay = min(max_delay, base_delay * 2**attempt) * random.uniform(0.5, 1.5)
+            logger.warning("Database is locked, retrying in {:.2f} s".format(delay))
+            time.sleep(delay)
+
+
+def retry_commit(session, apply, on_rollback=None, **kwargs):
+    """
+    Make changes in a long-lived session and commit them, retrying while the database is locked, see retry_on_busy.
+    A failed commit rolls back the session, which discards its pending changes and expires its objects. apply is
+    called again for each attempt, so it has to make all the changes of the transaction.
+
+        retry_commit(session, lambda: session.add(AgentControl(AgentId=agent_id, Signal=1)))
+
+    :param session: Session, without uncommitted changes
+    :param apply: Function making the changes
+    :param on_rollback: Function called after a rollback, e.g. to drop state derived from the expired objects,
+        defaults to None
+    :param kwargs: Arguments of retry_on_busy
+    :return: Return value of apply
+    """
+
+    def transaction():
+        try:
+            result = apply()
+            session.commit()
+            return result
+        except Exception:
+            session.rollback()
+            if on_rollback is not None:
+                on_rollback()
+            raise
+
+    return retry_on_busy(transaction, **kwargs)
@@ -2,10 +2,20 @@ from server.model import Agent
 from server.model import StepValue, StepDatum, ReportDatum, ReportValue, EvaluationEpisode
 from datetime import datetime as dt
 from hps.rl.logging.report_name import filter_report_columns
+from server.db_connection import retry_commit
+from server.packed_series import PackedStepSeries, add_report_values, create_packed_tables
 
 
 class DbLogger:
-    def __init__(self, session, agent_id, project_run_id, log_type, plot_type, log_steps=True):
+    def __init__(self, session, agent_id, project_run_id, log_type, plot_type, log_steps=True, packed=False):
+        """
+        Logs train steps and evaluation reports of an agent.
+
+        With packed, the values of a report series at a step are stored as a single PackedReportValues row and the
+        train step values in PackedStepValues chunks, instead of one ReportValues or TrainStepValues row per value.
+
+        Each write is committed with retry_commit, so it is retried while other processes lock the database.
+        """
         self.session = session
         self.agent_id = agent_id
         self.project_run_id = project_run_id
@@ -16,6 +26,18 @@ class DbLogger:
         self.report_series = {}
         self.reported_steps = []
         self.episode_mapping = {}
+        self.packed = packed
+        self.packed_step_series = {}
+        if packed:
+            create_packed_tables(session)
+
+    def continue_series(self):
+        """
+        Continue the step series of the agent, when a resumed agent logs to the same agent.
+        """
+        series = self.session.query(StepDatum).filter_by(AgentId=self.agent_id, Type=self.log_type, EndTime=None).all()
+        if series:
+            self.step_series = {s.Description: s for s in series}
 
     def log_step_series(
         self,
@@ -37,33 +59,52 @@ class DbLogger:
         data = {"Test Return": sum_return, "Best Return": currentbest["eval"]}
 
         if self.step_series is None:
-            self.step_series = {}
-            for label, _ in data.items():
-                description = label
-                seires = StepDatum(
-                    AgentId=self.agent_id, StartTime=str(now_time), Description=description, Type=self.log_type
+
+            def add_series():
+                step_series = {}
+                for label, _ in data.items():
+                    description = label
+                    seires = StepDatum(
+                        AgentId=self.agent_id, StartTime=str(now_time), Description=description, Type=self.log_type
+                    )
+                    self.session.add(seires)
+                    step_series[label] = seires
+                return step_series
+
+            self.step_series = retry_commit(self.session, add_series)
+
+        def add_values():
+            for label, value in data.items():
+                if self.packed:
+                    if label not in self.packed_step_series:
+                        step_series_id = self.step_series[label].StepSeriesId
+                        self.packed_step_series[label] = PackedStepSeries(self.session, step_series_id)
+                    self.packed_step_series[label].append(step, now_time, float(value))
+                    continue
+                series_value = StepValue(
+                    TimeStamp=str(now_time),
+                    Step=step,
+                    Value=float(value),
+                    StepSeriesId=self.step_series[label].StepSeriesId,
                 )
-                self.session.add(seires)
-                self.step_series[label] = seires
-
-            self.session.commit()
-            self.session.flush()
-
-        for label, value in data.items():
-            series_value = StepValue(
-                TimeStamp=str(now_time),
-                Step=step,
-                Value=float(value),
-                StepSeriesId=self.step_series[label].StepSeriesId,
-            )
-            self.session.add(series_value)
-        self.session.commit()
+                self.session.add(series_value)
 
-    def add_report_series(self, step, values, is_best, name, episode_id, time_index=None):
+        # The packed series hold the last chunk, which is expired by a rollback
+        retry_commit(self.session, add_values, on_rollback=self.packed_step_series.clear)
 
+    def add_report_series(self, step, values, is_best, name, episode_id, time_index=None):
+        """
+        Log the values of a report series at a step, one value per time step of the episode.
+
+        :param values: Value of each time step
+        :type values: np.ndarray
+        :param time_index: Time steps of the episode, starting with the first value. It can end with the end of the
+            last step, e.g. the index of the time indexer. Defaults to None for the current time.
+        """
         if time_index is not None:
             start_time = time_index[0]
             end_time = time_index[-1]
+            time_index = time_index[: len(values)]
         else:
             start_time = dt.now()
             end_time = start_time
@@ -72,43 +113,54 @@ class DbLogger:
         series_key = name + "_" + str(episode_id)
 
         if not series_key in self.report_series:
-            report = ReportDatum(
-                EvaluationEpisodeId=episode_id,
-                StartTime=str(start_time),
-                EndTime=str(end_time),
-                Description=name,
-                Type=self.plot_type,
-            )
-            self.session.add(report)
-            self.session.commit()
-            self.session.flush()
-            self.report_series[series_key] = report.ReportSeriesId
-
-        for i, (key, value) in enumerate(values.items()):
-            report_value = ReportValue(
-                ReportSeriesId=self.report_series[series_key],
-                Index=key,
-                TimeStamp=str(time_index[i]),
-                Value=value,
-                Step=step,
-            )
-            self.session.add(report_value)
 
-        self.session.commit()
+            def add_series():
+                report = ReportDatum(
+                    EvaluationEpisodeId=episode_id,
+                    StartTime=str(start_time),
+                    EndTime=str(end_time),
+                    Description=name,
+                    Type=self.plot_type,
+                )
+                self.session.add(report)
+                return report
+
+            self.report_series[series_key] = retry_commit(self.session, add_series).ReportSeriesId
+
+        series_id = self.report_series[series_key]
+        if self.packed:
+            retry_commit(self.session, lambda: add_report_values(self.session, series_id, step, time_index, values))
+            return
+
+        def add_values():
+            for i, value in enumerate(values):
+                report_value = ReportValue(
+                    ReportSeriesId=series_id,
+                    Index=i,
+                    TimeStamp=str(time_index[i]),
+                    Value=float(value),
+                    Step=step,
+                )
+                self.session.add(report_value)
+
+        retry_commit(self.session, add_values)
 
     def log_eval_episode(self, step, episode_name, eval_env):
         if not episode_name in self.episode_mapping:
             desc = str(episode_name)
-            eval_episode = EvaluationEpisode(ProjectRunId=self.project_run_id, Description=desc, AgentId=self.agent_id)
-            self.session.add(eval_episode)
-            self.session.commit()
-            self.session.flush()
-            self.episode_mapping[episode_name] = eval_episode.EvaluationEpisodeId
+
+            def add_episode():
+                eval_episode = EvaluationEpisode(
+                    ProjectRunId=self.project_run_id, Description=desc, AgentId=self.agent_id
+                )
+                self.session.add(eval_episode)
+                return eval_episode
+
+            self.episode_mapping[episode_name] = retry_commit(self.session, add_episode).EvaluationEpisodeId
 
         episode_id = self.episode_mapping[episode_name]
         for col in filter_report_columns(eval_env.report_df.columns):
-            dictionary = {i: v for i, v in enumerate(eval_env.report_df[col])}
-            self.add_report_series(step, dictionary, True, col, episode_id, eval_env.time_indexer.index)
+            self.add_report_series(step, eval_env.report_df[col], True, col, episode_id, eval_env.time_indexer.index)
 
     def log_info(
         self,
@@ -147,6 +199,9 @@ class DbLogger:
 
     def terminate_series(self, end_time):
         if self.step_series is not None:
-            for series in self.step_series.values():
-                series.EndTime = end_time
-            self.session.commit()
+
+            def end_series():
+                for series in self.step_series.values():
+                    series.EndTime = end_time
+
+            retry_commit(self.session, end_series)
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import sessionmaker
-from server.db_connection import create_engine
+from server.db_connection import get_engine
 from model import ProjectRun
 
 from setting_combiner import SettingsCombiner
@@ -15,7 +15,7 @@ from datetime import datetime as dt
 
 class Evaluator:
     def __init__(self, eval_id):
-        self.engine = create_engine()
+        self.engine = get_engine()
         self.Session = sessionmaker(bind=self.engine)
         self.session = self.Session()
         self.project_run = self.session.query(ProjectRun).filter_by(ProjectRunGuid=eval_id).first()
@@ -32,7 +32,13 @@ class Evaluator:
             self.session.commit()
 
         self.db_logger = DbLogger(
-            self.session, self.project_run.EvaluatedOn, self.project_run.ProjectRunId, None, "eplots", log_steps=False
+            self.session,
+            self.project_run.EvaluatedOn,
+            self.project_run.ProjectRunId,
+            None,
+            "eplots",
+            log_steps=False,
+            packed=appSettings.use_packed_series(),
         )
 
     def should_terminate(self):
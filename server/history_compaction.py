@@ -0,0 +1,224 @@
+import logging
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import func, inspect
+
+from core.packed_array import decode_steps, encode_steps, pack_float32, unpack_float32
+from server.db_connection import retry_on_busy
+from server.model import (
+    Agent,
+    CompactedReportStep,
+    EvaluationEpisode,
+    PackedReportValue,
+    ReportDatum,
+    ReportValue,
+    metadata,
+)
+
+
+def steps_to_compact(
+    lengths: Dict[Tuple[int, int], int], compacted: Dict[Tuple[int, int], int], keep: Set[int]
+) -> List[Tuple[int, int]]:
+    """
+    Report series steps to compact. The full resolution length of a series is the length of its kept steps, or the
+    length before compaction of its compacted steps. Steps already compacted, shorter than the full resolution, and
+    the steps of series without a full resolution length are skipped.
+
+    :param lengths: Number of values of each series and step
+    :type lengths: Dict[Tuple[int, int], int]
+    :param compacted: Length before compaction of the compacted series steps
+    :type compacted: Dict[Tuple[int, int], int]
+    :param keep: Steps kept at full resolution
+    :type keep: Set[int]
+    :return: The series and steps, in order
+    :rtype: List[Tuple[int, int]]
+    """
+    full_length = {}
+    kept_lengths = [(key, length) for key, length in lengths.items() if key[1] in keep]
+    for (series_id, _), length in kept_lengths + list(compacted.items()):
+        full_length[series_id] = max(full_length.get(series_id, 0), length)
+
+    return [
+        (series_id, step)
+        for (series_id, step), length in sorted(lengths.items())
+        if step not in keep
+        and (series_id, step) not in compacted
+        and series_id in full_length
+        and length >= full_length[series_id]
+        and length > 1
+    ]
+
+
+class HistoryCompaction:
+    def __init__(self, session, keep_last: int = 5, bin_size: int = 24, logger=None):
+        """
+        Downsample the evaluation reports of old steps. The reports of the best step and of the keep_last last
+        evaluated steps of each agent keep their full resolution, the reports of the other steps are replaced by the
+        mean of bin_size consecutive values.
+
+        Each report series is compacted at a step in its own short transaction, so agents logging to the database
+        meanwhile are only blocked briefly. Only steps older than the keep_last last ones are changed. The compacted
+        steps are recorded in CompactedReportSteps, so running the compaction again does not change them, see
+        steps_to_compact.
+
+        :param session: Database session
+        :param keep_last: Number of last evaluated steps kept at full resolution, defaults to 5
+        :type keep_last: int
+        :param bin_size: Number of values averaged into one, defaults to 24
+        :type bin_size: int
+        """
+        if keep_last < 1 or bin_size < 2:
+            raise ValueError("Expected keep_last >= 1 and bin_size >= 2")
+        self.session = session
+        self.keep_last = keep_last
+        self.bin_size = bin_size
+        self.logger = logger or logging.getLogger(__name__)
+        self.has_packed = inspect(session.get_bind()).has_table(PackedReportValue.__tablename__)
+        metadata.create_all(session.get_bind(), tables=[CompactedReportStep.__table__], checkfirst=True)
+
+    def run(self):
+        """
+        Compact the reports of all agents.
+
+        :return: Number of compacted report series steps
+        :rtype: int
+        """
+        agents = self.session.query(Agent.AgentId, Agent.BestStep).all()
+        self.session.commit()
+        return sum(self.compact_agent(agent_id, best_step) for agent_id, best_step in agents)
+
+    def compact_agent(self, agent_id: int, best_step) -> int:
+        series_ids = [
+            row[0]
+            for row in self.session.query(ReportDatum.ReportSeriesId)
+            .join(EvaluationEpisode, ReportDatum.EvaluationEpisodeId == EvaluationEpisode.EvaluationEpisodeId)
+            .filter(EvaluationEpisode.AgentId == agent_id)
+        ]
+        if not series_ids:
+            return 0
+
+        steps = self._lengths(ReportValue, func.count(), series_ids)
+        if self.has_packed:
+            steps.update(self._lengths(PackedReportValue, PackedReportValue.Length, series_ids))
+        compacted = {
+            (series_id, step): length
+            for series_id, step, length in self.session.query(
+                CompactedReportStep.ReportSeriesId, CompactedReportStep.Step, CompactedReportStep.OriginalLength
+            ).filter(CompactedReportStep.ReportSeriesId.in_(series_ids))
+        }
+        self.session.commit()
+
+        evaluated_steps = sorted({step for _, step in steps})
+        keep = set(evaluated_steps[-self.keep_last :]) | {best_step}
+
+        n_compacted = 0
+        for series_id, step in steps_to_compact(steps, compacted, keep):
+            if retry_on_busy(lambda: self.compact(series_id, step)):
+                n_compacted += 1
+        if n_compacted:
+            self.logger.info("Compacted {} report series steps of agent {}".format(n_compacted, agent_id))
+        return n_compacted
+
+    def compact(self, series_id: int, step: int) -> bool:
+        """
+        Replace the values of a report series at a step by the mean of each bin of bin_size values, and record the
+        step as compacted.
+        """
+        try:
+            length = self._compact_rows(series_id, step)
+            if length is None and self.has_packed:
+                length = self._compact_packed(series_id, step)
+            if length is not None:
+                self.session.add(CompactedReportStep(ReportSeriesId=series_id, Step=step, OriginalLength=length))
+            self.session.commit()
+            return length is not None
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def _lengths(self, table, length, series_ids):
+        """
+        Number of values of each series and step.
+        """
+        query = (
+            self.session.query(table.ReportSeriesId, table.Step, length)
+            .filter(table.ReportSeriesId.in_(series_ids))
+            .group_by(table.ReportSeriesId, table.Step)
+        )
+        return {(series_id, step): value for series_id, step, value in query}
+
+    def _compact_rows(self, series_id, step) -> Optional[int]:
+        rows = (
+            self.session.query(ReportValue.TimeStamp, ReportValue.Value)
+            .filter_by(ReportSeriesId=series_id, Step=step)
+            .order_by(ReportValue.Index)
+            .all()
+        )
+        if not rows:
+            return None
+
+        starts = np.arange(0, len(rows), self.bin_size)
+        means = self._bin_means(np.array([value for _, value in rows], dtype=np.float64), starts)
+        self.session.query(ReportValue).filter_by(ReportSeriesId=series_id, Step=step).delete(
+            synchronize_session=False
+        )
+        self.session.execute(
+            ReportValue.__table__.insert(),
+            [
+                {"ReportSeriesId": series_id, "Step": step, "Index": i, "TimeStamp": rows[start][0], "Value": mean}
+                for i, (start, mean) in enumerate(zip(starts.tolist(), means.tolist()))
+            ],
+        )
+        return len(rows)
+
+    def _compact_packed(self, series_id, step) -> Optional[int]:
+        row = self.session.query(PackedReportValue).get((series_id, step))
+        if row is None:
+            return None
+
+        starts = np.arange(0, row.Length, self.bin_size)
+        time_index = decode_steps(row.StartTime, row.StepDescription)[starts]
+        means = self._bin_means(unpack_float32(row.Values, row.Length).astype(np.float64), starts)
+        length = row.Length
+        row.StepDescription = encode_steps(time_index)
+        row.Length = len(means)
+        row.Values = pack_float32(means)
+        return length
+
+    @staticmethod
+    def _bin_means(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        counts = np.diff(np.r_[starts, len(values)])
+        return np.add.reduceat(values, starts) / counts
+
+
+def incremental_vacuum(engine, pages_per_commit: int = 256, pause: float = 0.05, logger=None) -> int:
+    """
+    Return the free pages of a SQLite database to the file system a few at a time, so the database is only locked
+    briefly. Requires auto_vacuum=INCREMENTAL, which a full VACUUM of the database sets once.
+
+    :param engine: Engine of the database
+    :param pages_per_commit: Number of pages freed per transaction, defaults to 256
+    :type pages_per_commit: int
+    :param pause: Seconds to wait between transactions, defaults to 0.05
+    :type pause: float
+    :return: Number of pages freed
+    :rtype: int
+    """
+    logger = logger or logging.getLogger(__name__)
+    freed = 0
+    with engine.connect() as connection:
+        if connection.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            logger.warning("auto_vacuum is not INCREMENTAL, the free pages are kept in the database file")
+            return 0
+        free_pages = connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+        while free_pages:
+            # The sqlite3 module only steps the pragma once, which frees a single page
+            for _ in range(min(pages_per_commit, free_pages)):
+                connection.exec_driver_sql("PRAGMA incremental_vacuum(1)")
+            connection.commit()
+            freed += min(pages_per_commit, free_pages)
+            time.sleep(pause)
+            free_pages = connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+    return freed
@@ -1,5 +1,5 @@
 # coding: utf-8
-from sqlalchemy import Column, Float, ForeignKey, Integer, Table, Text
+from sqlalchemy import Column, Float, ForeignKey, Integer, LargeBinary, Table, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.sqltypes import NullType
 from sqlalchemy.ext.declarative import declarative_base
@@ -257,3 +257,57 @@ class ReportValue(Base):
     Value = Column(Float, nullable=False)
 
     ReportDatum = relationship("ReportDatum")
+
+
+class PackedReportValue(Base):
+    """All the values of a report series at a step, see core.packed_array for the encoding."""
+
+    __tablename__ = "PackedReportValues"
+
+    ReportSeriesId = Column(
+        ForeignKey("ReportData.ReportSeriesId", ondelete="CASCADE"), primary_key=True, nullable=False
+    )
+    Step = Column(Integer, primary_key=True, nullable=False)
+    StartTime = Column(Text, nullable=False)
+    StepDescription = Column(Text, nullable=False)
+    Length = Column(Integer, nullable=False)
+    Values = Column(LargeBinary, nullable=False)
+
+    ReportDatum = relationship("ReportDatum")
+
+
+class PackedStepValue(Base):
+    """Up to PackedStepValue.ChunkLength consecutive values of a train step series."""
+
+    __tablename__ = "PackedStepValues"
+    ChunkLength = 256
+
+    StepSeriesId = Column(
+        ForeignKey("TrainStepData.StepSeriesId", ondelete="CASCADE"), primary_key=True, nullable=False
+    )
+    Chunk = Column(Integer, primary_key=True, nullable=False)
+    StartTime = Column(Text, nullable=False)
+    EndTime = Column(Text, nullable=False)
+    Length = Column(Integer, nullable=False)
+    Steps = Column(LargeBinary, nullable=False)
+    Milliseconds = Column(LargeBinary, nullable=False)  # Time stamps as milliseconds after StartTime
+    Values = Column(LargeBinary, nullable=False)
+
+    TrainStepDatum = relationship("StepDatum")
+
+
+class CompactedReportStep(Base):
+    """A report series step downsampled by server.history_compaction, with its length before compaction."""
+
+    __tablename__ = "CompactedReportSteps"
+
+    ReportSeriesId = Column(
+        ForeignKey("ReportData.ReportSeriesId", ondelete="CASCADE"), primary_key=True, nullable=False
+    )
+    Step = Column(Integer, primary_key=True, nullable=False)
+    OriginalLength = Column(Integer, nullable=False)
+
+    ReportDatum = relationship("ReportDatum")
+
+
+packed_tables = [PackedReportValue.__table__, PackedStepValue.__table__]
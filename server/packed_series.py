@@ -0,0 +1,172 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from core.packed_array import decode_steps, encode_steps, pack_float32, pack_int64, unpack_float32, unpack_int64
+from server.model import PackedReportValue, PackedStepValue, metadata, packed_tables
+
+
+def create_packed_tables(session):
+    """
+    Create the packed tables if they do not exist.
+    """
+    metadata.create_all(session.get_bind(), tables=packed_tables, checkfirst=True)
+
+
+def add_report_values(session, report_series_id: int, step: int, time_index, values):
+    """
+    Add the values of a report series at a step as a single row. The caller commits.
+
+    :param session: Database session
+    :param report_series_id: Report series
+    :type report_series_id: int
+    :param step: Step
+    :type step: int
+    :param time_index: Time stamp of each value
+    :param values: Values
+    """
+    values = np.asarray(values)
+    if len(time_index) != len(values):
+        raise ValueError("Expected {} values, got {}".format(len(time_index), len(values)))
+    session.add(
+        PackedReportValue(
+            ReportSeriesId=report_series_id,
+            Step=step,
+            StartTime=str(time_index[0]),
+            StepDescription=encode_steps(time_index),
+            Length=len(values),
+            Values=pack_float32(values),
+        )
+    )
+
+
+def read_report_values(session, report_series_id: int, step: int):
+    """
+    Read the values of a report series at a step.
+
+    :param session: Database session
+    :param report_series_id: Report series
+    :type report_series_id: int
+    :param step: Step
+    :type step: int
+    :return: The time index and the values as float32
+    :rtype: Tuple[pd.DatetimeIndex, np.ndarray]
+    """
+    row = session.query(PackedReportValue).get((report_series_id, step))
+    if row is None:
+        raise ValueError("No values for report series {} at step {}".format(report_series_id, step))
+    return decode_steps(row.StartTime, row.StepDescription), unpack_float32(row.Values, row.Length)
+
+
+def read_report_series(session, report_series_id: int):
+    """
+    Read the values of a report series at all steps. The series must have the same time index at every step.
+
+    :param session: Database session
+    :param report_series_id: Report series
+    :type report_series_id: int
+    :return: The steps, the time index and a matrix with one row of values per step
+    :rtype: Tuple[np.ndarray, pd.DatetimeIndex, np.ndarray]
+    """
+    rows = (
+        session.query(PackedReportValue)
+        .filter_by(ReportSeriesId=report_series_id)
+        .order_by(PackedReportValue.Step)
+        .all()
+    )
+    if not rows:
+        return np.empty(0, dtype=np.int64), pd.DatetimeIndex([]), np.empty((0, 0), dtype=np.float32)
+    if len({(row.StartTime, row.StepDescription, row.Length) for row in rows}) > 1:
+        raise ValueError("The time index of report series {} changes between steps".format(report_series_id))
+
+    values = np.empty((len(rows), rows[0].Length), dtype=np.float32)
+    for i, row in enumerate(rows):
+        values[i] = unpack_float32(row.Values, row.Length)
+    time_index = decode_steps(rows[0].StartTime, rows[0].StepDescription)
+    return np.array([row.Step for row in rows], dtype=np.int64), time_index, values
+
+
+class PackedStepSeries:
+    def __init__(self, session, step_series_id: int):
+        """
+        Appends values of a train step series to PackedStepValue chunks. Only the last chunk is rewritten when a
+        value is added.
+
+        :param session: Database session
+        :param step_series_id: Train step series
+        :type step_series_id: int
+        """
+        self.session = session
+        self.step_series_id = step_series_id
+        self.chunk = None
+        self.steps, self.milliseconds, self.values = [], [], []
+
+        last = (
+            session.query(PackedStepValue)
+            .filter_by(StepSeriesId=step_series_id)
+            .order_by(PackedStepValue.Chunk.desc())
+            .first()
+        )
+        if last is not None and last.Length < PackedStepValue.ChunkLength:
+            self.chunk = last
+            self.steps = unpack_int64(last.Steps, last.Length).tolist()
+            self.milliseconds = unpack_int64(last.Milliseconds, last.Length).tolist()
+            self.values = unpack_float32(last.Values, last.Length).tolist()
+        self.next_chunk = 0 if last is None else last.Chunk + 1
+
+    def append(self, step: int, time_stamp: datetime, value: float):
+        """
+        Add a value. The caller commits.
+        """
+        if self.chunk is None or self.chunk.Length >= PackedStepValue.ChunkLength:
+            self.chunk = PackedStepValue(StepSeriesId=self.step_series_id, Chunk=self.next_chunk)
+            self.chunk.StartTime = str(time_stamp)
+            self.session.add(self.chunk)
+            self.next_chunk += 1
+            self.steps, self.milliseconds, self.values = [], [], []
+
+        self.steps.append(step)
+        elapsed = pd.Timestamp(time_stamp) - pd.Timestamp(self.chunk.StartTime)
+        self.milliseconds.append(elapsed // pd.Timedelta(1, "ms"))
+        self.values.append(value)
+
+        self.chunk.EndTime = str(time_stamp)
+        self.chunk.Length = len(self.values)
+        self.chunk.Steps = pack_int64(self.steps)
+        self.chunk.Milliseconds = pack_int64(self.milliseconds)
+        self.chunk.Values = pack_float32(self.values)
+
+
+def _elapsed(row: PackedStepValue) -> pd.TimedeltaIndex:
+    return pd.to_timedelta(unpack_int64(row.Milliseconds, row.Length), "ms")
+
+
+def read_step_values(session, step_series_id: int, after=None):
+    """
+    Read the values of a train step series.
+
+    :param session: Database session
+    :param step_series_id: Train step series
+    :type step_series_id: int
+    :param after: Only read values logged after this time, defaults to None
+    :return: The steps, the time stamps and the values as float32
+    :rtype: Tuple[np.ndarray, pd.DatetimeIndex, np.ndarray]
+    """
+    query = session.query(PackedStepValue).filter_by(StepSeriesId=step_series_id)
+    if after is not None:
+        query = query.filter(PackedStepValue.EndTime > str(after))
+    rows = query.order_by(PackedStepValue.Chunk).all()
+
+    if not rows:
+        return np.empty(0, dtype=np.int64), pd.DatetimeIndex([]), np.empty(0, dtype=np.float32)
+
+    steps = np.concatenate([unpack_int64(row.Steps, row.Length) for row in rows])
+    time_stamps = pd.DatetimeIndex(
+        np.concatenate([pd.Timestamp(row.StartTime) + _elapsed(row) for row in rows]).astype("datetime64[ns]")
+    )
+    values = np.concatenate([unpack_float32(row.Values, row.Length) for row in rows])
+    if after is not None:
+        keep = time_stamps > pd.Timestamp(after)
+        steps, time_stamps, values = steps[keep], time_stamps[keep], values[keep]
+    return steps, time_stamps, values
@@ -1,12 +1,15 @@
 from sqlalchemy import desc
 from sqlalchemy.orm import sessionmaker
 
-from model import Project, Agent, ProjectRun, AgentControl, ProjectRunControl
-from server.db_connection import create_engine
+from model import Project, Agent, ProjectRun, AgentControl, ProjectRunControl, StepDatum, StepValue
+from server.db_connection import get_engine, retry_commit, session_scope
+from server.agent_scheduler import AgentScheduler
+from server.packed_series import read_step_values
+from hps.rl.population_pruning import AshaPruner, perturb_sac_settings
 import numpy as np
 import copy
 
-from agent_executor import execute_agent
+from agent_executor import execute_agent, execute_population
 from hps.rl.settings import RunSettingsSerializer
 from appsettings import appSettings
 from server.namegenerator import get_random_names
@@ -14,6 +17,8 @@ from setting_combiner import SettingsCombiner
 from multiprocessing import Process
 from datetime import datetime as dt
 from datetime import timedelta as td
+import fcntl
+import os
 import time
 
 NUM_AGENTS = 5
@@ -27,26 +32,40 @@ ControlAcc = 10
 
 
 class ProjectRunner:
-    def __init__(self, project_guid, run_id):
-        self.engine = create_engine()
+    def __init__(self, project_guid, run_id, resume=False):
+        self.engine = get_engine()
         self.Session = sessionmaker(bind=self.engine)
         self.session = self.Session()
         self.project = self.session.query(Project).filter_by(ProjectUid=project_guid).first()
         self.active_agents = {}
+        self.pending_agents = []  # (ticket, target, args, agent settings) of processes waiting for cores
+        self.tickets = {}  # Agent name -> ticket of the started agents
+        self.scheduler = AgentScheduler(appSettings.get_scheduler_folder())
 
         self.project_run = self.session.query(ProjectRun).filter_by(ProjectRunId=run_id).first()
 
-        self.project_run.StartTime = str(dt.now())
-        self.session.commit()
+        self.resume = resume
+        if not resume:
+            start_time = str(dt.now())
+            retry_commit(self.session, lambda: setattr(self.project_run, "StartTime", start_time))
 
         combinder = SettingsCombiner(self.session)
         self.run_settings, settings_modified = combinder.combine_settings(self.project_run)
         self.agent_count = len(self.run_settings.agent_settings)
+        self.pruner = None
+        if self.run_settings.pruning_rungs:
+            self.pruner = AshaPruner(self.run_settings.pruning_rungs, self.run_settings.pruning_fraction)
+        self.rng = np.random.default_rng()
+
+        if self.run_settings.use_shared_replay_buffer and any(
+            a.shared_replay_buffer_folder is None for a in self.run_settings.agent_settings
+        ):
+            self.assign_shared_replay_buffer(self.run_settings.agent_settings, 0, 0)
+            settings_modified = True
 
         if settings_modified:
-            self.project_run.Settings = RunSettingsSerializer.serialize(self.run_settings)
-            self.session.add(self.project_run)
-            self.session.commit()
+            ser_settings = RunSettingsSerializer.serialize(self.run_settings)
+            retry_commit(self.session, lambda: setattr(self.project_run, "Settings", ser_settings))
 
     def SurvivalOfTheFittest(self, keep_buffer):
         """Spawn new agents from the current best.
@@ -54,7 +73,7 @@ class ProjectRunner:
         :param keep_buffer: Whether to keep the replay buffer or not
         :type keep_buffer: Bool
         """
-        agents = self.session.query(Agent).filter_by(ProjectRunId=self.project_run.ProjectRunId, EndTime=None)
+        agents = self.session.query(Agent).filter_by(ProjectRunId=self.project_run.ProjectRunId, EndTime=None).all()
 
         current_best_agent = agents[0]
         current_best_value = agents[0].BestStepValue
@@ -68,26 +87,96 @@ class ProjectRunner:
         for a in agents:
             if a.AgentId == best_agent_id:
                 continue
-            killmsg = AgentControl(AgentId=a.AgentId, Signal=1)
-            self.session.add(killmsg)
-            del self.active_agents[a.AgentUid]
+            self.kill_agent(a)
+        self.cancel_pending_agents()  # Agents of the same generation as the killed agents
 
         _, a_settings = self.active_agents[current_best_agent.AgentUid]
 
         new_settings = self.spawn_agent(self.agent_count - 1, a_settings, keep_buffer)
+        self.add_agents(new_settings, best_agent_id)
 
+    def prune_population(self):
+        """
+        Replace the agents pruned at the rungs of the run by clones of the best agent, optionally with perturbed
+        SAC settings. The clones are queued in the scheduler and get the cores of the pruned agents.
+        """
+        agents = self.session.query(Agent).filter_by(ProjectRunId=self.project_run.ProjectRunId, EndTime=None).all()
+        live = {a.AgentId: a for a in agents if a.AgentUid in self.active_agents}
+        pruned = self.pruner.update(self.get_eval_curves(list(live)), live)
+        survivors = [a for agent_id, a in live.items() if agent_id not in pruned]
+        if not pruned or not survivors:
+            return
+
+        best_agent = max(survivors, key=lambda a: -np.inf if a.BestStepValue is None else a.BestStepValue)
+        for agent_id in pruned:
+            self.kill_agent(live[agent_id])
+        print("Pruned agents {}, cloning agent {}".format([live[i].AgentUid for i in pruned], best_agent.AgentUid))
+
+        _, a_settings = self.active_agents[best_agent.AgentUid]
+        new_settings = self.spawn_agent(len(pruned), a_settings, keep_buffer=False)
+        if self.run_settings.perturbation_factor:
+            sac_settings = a_settings.sac_settings or self.run_settings.sac_settings
+            for settings in new_settings:
+                settings.sac_settings = perturb_sac_settings(
+                    sac_settings, self.run_settings.perturbation_factor, self.rng
+                )
+        self.add_agents(new_settings, best_agent.AgentId)
+
+    def get_eval_curves(self, agent_ids):
+        """
+        Steps and evaluation returns of the agents.
+        """
+        series = (
+            self.session.query(StepDatum.StepSeriesId, StepDatum.AgentId)
+            .filter(StepDatum.AgentId.in_(agent_ids), StepDatum.Description == "Test Return")
+            .all()
+        )
+        curves = {}
+        for series_id, agent_id in series:
+            if appSettings.use_packed_series():
+                steps, _, values = read_step_values(self.session, series_id)
+            else:
+                rows = self.session.query(StepValue.Step, StepValue.Value).filter_by(StepSeriesId=series_id).all()
+                steps, values = np.array([r[0] for r in rows]), np.array([r[1] for r in rows])
+            curves[agent_id] = (steps, values)
+        return curves
+
+    def kill_agent(self, agent):
+        agent_id = agent.AgentId
+        retry_commit(self.session, lambda: self.session.add(AgentControl(AgentId=agent_id, Signal=1)))
+        del self.active_agents[agent.AgentUid]
+
+    def add_agents(self, new_settings, parent_id):
+        """
+        Add the agents to the settings of the run and start them.
+        """
         index_offset = len(self.run_settings.agent_settings)
 
         # Update settings of projectrun
         self.run_settings.agent_settings += new_settings
         ser_settings = RunSettingsSerializer.serialize(self.run_settings)
-        self.session.query(ProjectRun).filter_by(ProjectRunId=self.project_run.ProjectRunId).update(
-            {"Settings": ser_settings}
+        run_id = self.project_run.ProjectRunId
+        retry_commit(
+            self.session,
+            lambda: self.session.query(ProjectRun).filter_by(ProjectRunId=run_id).update({"Settings": ser_settings}),
         )
 
-        self.session.commit()
+        self.start_agents(new_settings, index_offset, 0, parent_id)
 
-        self.start_agents(new_settings, index_offset, 0, best_agent_id)
+    def assign_shared_replay_buffer(self, agent_settings, start_index, generation):
+        """Let the agents share a replay buffer, each agent writing to a shard of its own.
+
+        :param agent_settings: Settings of the agents sharing the buffer
+        :type agent_settings: List[AgentSettings]
+        :param start_index: Index of the first agent in the run settings, used as its shard
+        :type start_index: int
+        :param generation: Generation of the shared buffer. Agents of different generations do not share buffers.
+        :type generation: int
+        """
+        folder = appSettings.get_shared_replay_buffer_folder(self.run_settings.uid, generation)
+        for i, a_settings in enumerate(agent_settings):
+            a_settings.shared_replay_buffer_folder = folder
+            a_settings.replay_buffer_shard = start_index + i
 
     def get_fresh_seeds(self, count: int) -> np.ndarray:
         return np.array(100) + np.random.choice(500, size=count, replace=False)
@@ -102,19 +191,37 @@ class ProjectRunner:
             a_settings.start_checkpoint_folder = from_agent_settings.output_checkpoint_folder
             a_settings.keep_buffer_from_start_checkpoint = keep_buffer
             a_settings.name = self.run_settings.spare_agent_names[0]
+            # The clone writes its models and replay buffer files to a folder of its own
+            a_settings.output_checkpoint_folder = appSettings.get_checkpoint_folder(
+                self.run_settings.uid, a_settings.name
+            )
             a_settings.reset_global_step = False  # Continue with current global step
             self.run_settings.spare_agent_names = self.run_settings.spare_agent_names[1:]
 
             new_agent_settings.append(a_settings)
 
+        if self.run_settings.use_shared_replay_buffer:
+            start_index = len(self.run_settings.agent_settings)
+            if keep_buffer:
+                # Continue on the live buffer of the best agent, the folder is copied with its settings
+                for i, a_settings in enumerate(new_agent_settings):
+                    a_settings.replay_buffer_shard = start_index + i
+            else:
+                self.assign_shared_replay_buffer(new_agent_settings, start_index, generation=start_index)
+
         return new_agent_settings
 
     def terminate_all_agents(self):
-        agents = self.session.query(Agent).filter_by(ProjectRunId=self.project_run.ProjectRunId, EndTime=None)
-        for a in agents:
-            killmsg = AgentControl(AgentId=a.AgentId, Signal=1)
-            self.session.add(killmsg)
-        self.session.commit()
+        self.cancel_pending_agents()
+        run_id = self.project_run.ProjectRunId
+
+        def kill_agents():
+            agents = self.session.query(Agent).filter_by(ProjectRunId=run_id, EndTime=None)
+            for a in agents:
+                killmsg = AgentControl(AgentId=a.AgentId, Signal=1)
+                self.session.add(killmsg)
+
+        retry_commit(self.session, kill_agents)
 
     def sleepUntilSignal(self, sleep_seconds):
 
@@ -129,14 +236,16 @@ class ProjectRunner:
             )
             if control is not None and control.Signal != ControlAcc:
                 print("Control signal received ", control.Signal)
-                acc = ProjectRunControl(ProjectRunId=self.project_run.ProjectRunId, Signal=ControlAcc)
-                self.session.add(acc)
-                self.session.commit()
-                return control.Signal
+                signal, run_id = control.Signal, self.project_run.ProjectRunId
+                retry_commit(
+                    self.session, lambda: self.session.add(ProjectRunControl(ProjectRunId=run_id, Signal=ControlAcc))
+                )
+                return signal
+            self.start_pending_agents()
             active_agent = (
                 self.session.query(Agent).filter_by(ProjectRunId=self.project_run.ProjectRunId, EndTime=None).first()
             )
-            if active_agent is None:
+            if active_agent is None and not self.pending_agents:
                 print("Agents terminated ", AgentsTerminated)
                 return AgentsTerminated
 
@@ -145,14 +254,110 @@ class ProjectRunner:
         return SleepComplete
 
     def start_agents(self, agent_settings, start_index, step_offset, parent_id):
-        for i, a_settings in enumerate(agent_settings):
-            args = (self.project.ProjectUid, self.project_run.ProjectRunId, i + start_index, step_offset, parent_id)
-            p = Process(target=execute_agent, args=args)
-            self.active_agents[a_settings.name] = (p, a_settings)
+        agents = [(i + start_index, a_settings, parent_id, None) for i, a_settings in enumerate(agent_settings)]
+        self.queue_agents(agents, step_offset)
+        self.start_pending_agents()
+
+    def queue_agents(self, agents, step_offset):
+        """
+        Queue agents in the scheduler of the host, in groups of agents_per_process agents trained together in one
+        process. A group is started as soon as it is assigned cores.
+
+        :param agents: Index, settings, parent id and agent id of each agent. Agent id None starts a new agent, else
+            the agent is resumed.
+        :type agents: List[Tuple[int, AgentSettings, Optional[int], Optional[int]]]
+        """
+        n_threads = self.run_settings.threads_per_agent or self.scheduler.threads_per_agent(self.agent_count)
+        agents_per_process = max(1, self.run_settings.agents_per_process)
+        for start in range(0, len(agents), agents_per_process):
+            group = agents[start : start + agents_per_process]
+            indices, settings, parent_ids, agent_ids = (list(values) for values in zip(*group))
+            run_args = (self.project.ProjectUid, self.project_run.ProjectRunId)
+            if len(indices) == 1:
+                target = execute_agent
+                args = run_args + (indices[0], step_offset, parent_ids[0], agent_ids[0])
+            else:
+                target = execute_population
+                args = run_args + (indices, step_offset, parent_ids, agent_ids)
+            ticket = self.scheduler.submit(
+                self.project_run.ProjectRunId,
+                "+".join(a_settings.name for a_settings in settings),
+                n_threads * len(indices),
+                self.run_settings.priority,
+            )
+            self.pending_agents.append((ticket, target, args, settings))
+
+    def resume_agents(self):
+        """
+        Restart the agents of an interrupted run. Agents that did not end continue from their training checkpoints,
+        and agents that were signaled to stop are ended. Agents after the last started agent were waiting for cores
+        and are started, the agents before it that never started were cancelled.
+        """
+        agents = {
+            a.AgentUid: a for a in self.session.query(Agent).filter_by(ProjectRunId=self.project_run.ProjectRunId)
+        }
+        started = [i for i, a_settings in enumerate(self.run_settings.agent_settings) if a_settings.name in agents]
+        first_waiting = started[-1] + 1 if started else 0
+
+        ended = []
+        stopped = []
+        queued = []
+        for index, a_settings in enumerate(self.run_settings.agent_settings):
+            agent = agents.get(a_settings.name)
+            if agent is None:
+                if index >= first_waiting:
+                    queued.append((index, a_settings, None, None))
+            elif agent.EndTime is not None:
+                ended.append(agent.AgentId)
+            elif self.session.query(AgentControl).filter_by(AgentId=agent.AgentId).first() is not None:
+                stopped.append(agent.AgentId)
+            else:
+                print("Resuming agent {}".format(agent.AgentUid))
+                queued.append((index, a_settings, agent.Ancestor, agent.AgentId))
+        self.session.commit()
+
+        if stopped:
+            end_time = str(dt.now())
+            retry_commit(
+                self.session,
+                lambda: self.session.query(Agent)
+                .filter(Agent.AgentId.in_(stopped))
+                .update({"EndTime": end_time}, synchronize_session=False),
+            )
+            ended += stopped
+        self.queue_agents(queued, 0)
+
+        if self.pruner is not None and ended:
+            # Agents reaching a rung are compared with the ended agents as well
+            self.pruner.update(self.get_eval_curves(ended), ended)
+        self.start_pending_agents()
+
+    def start_pending_agents(self):
+        while self.pending_agents:
+            ticket, target, args, settings = self.pending_agents[0]
+            cores = self.scheduler.try_start(ticket)
+            if cores is None:
+                return
+            n_threads = len(cores)
+            p = Process(target=target, args=args, kwargs=dict(cores=cores, n_threads=n_threads))
             p.start()
+            self.scheduler.set_pid(ticket, p.pid)
+            for a_settings in settings:
+                print("Agent {} started on cores {}".format(a_settings.name, cores))
+                self.active_agents[a_settings.name] = (p, a_settings)
+                self.tickets[a_settings.name] = ticket
+            self.pending_agents.pop(0)
+
+    def cancel_pending_agents(self):
+        for ticket, *_ in self.pending_agents:
+            self.scheduler.release(ticket)
+        self.pending_agents = []
 
     def start(self):
-        self.start_agents(self.run_settings.agent_settings, 0, 0, None)
+        if self.resume:
+            self.resume_agents()
+        else:
+            self.start_agents(self.run_settings.agent_settings, 0, 0, None)
 
         # Allow processes to start
         time.sleep(10)
@@ -168,6 +373,8 @@ class ProjectRunner:
                     termianted = True
                 elif signal == SpawnBestNoBuffer or signal == SpawnBestWithBuffer:
                     self.SurvivalOfTheFittest(signal == SpawnBestWithBuffer)
+                elif self.pruner is not None:
+                    self.prune_population()
 
             except Exception as e:
                 print(e)
@@ -176,20 +383,65 @@ class ProjectRunner:
 
         for p, s in self.active_agents.values():
             p.join()
+        for ticket in set(self.tickets.values()):
+            self.scheduler.release(ticket)
 
         print("All agents joined")
 
-        self.project_run.EndTime = str(dt.now())
-        self.session.commit()
+        end_time = str(dt.now())
+        retry_commit(self.session, lambda: setattr(self.project_run, "EndTime", end_time))
 
         print("Successfully terminated")
 
 
-def run_project(projectGuid, run_id):
-    runner = ProjectRunner(projectGuid, run_id)
+def lock_run(run_id):
+    """
+    Lock of the process managing a run, released when the process ends.
+
+    :return: The open lock file, to be kept while managing the run, or None if another process manages the run
+    """
+    folder = os.path.join(appSettings.get_scheduler_folder(), "runs")
+    os.makedirs(folder, exist_ok=True)
+    lock = open(os.path.join(folder, "{}.lock".format(run_id)), "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return None
+    return lock
+
+
+def run_project(projectGuid, run_id, resume=False):
+    run_lock = lock_run(run_id)
+    if run_lock is None:
+        print("Run {} is managed by another process".format(run_id))
+        return
+    runner = ProjectRunner(projectGuid, run_id, resume)
     runner.start()
+    run_lock.close()
 
 
-def start_run_project(projectGuid, run_id):
-    p = Process(target=run_project, args=(projectGuid, run_id))
+def start_run_project(projectGuid, run_id, resume=False):
+    p = Process(target=run_project, args=(projectGuid, run_id, resume))
     p.start()
+
+
+def resume_interrupted_runs():
+    """
+    Resume the training runs that were started and never ended, e.g. because the server was stopped.
+
+    :return: Project and run ids of the resumed runs
+    :rtype: List[Tuple[str, int]]
+    """
+    with session_scope() as session:
+        runs = (
+            session.query(ProjectRun)
+            .filter(ProjectRun.StartTime.isnot(None), ProjectRun.EndTime.is_(None), ProjectRun.EvaluatedOn.is_(None))
+            .all()
+        )
+        interrupted = [(run.Project.ProjectUid, run.ProjectRunId) for run in runs]
+
+    for project_uid, run_id in interrupted:
+        print("Resuming run {}".format(run_id))
+        start_run_project(project_uid, run_id, resume=True)
+    return interrupted
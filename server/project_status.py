@@ -1,5 +1,5 @@
 from sqlalchemy import desc
-from server.db_connection import create_engine
+from server.db_connection import get_engine
 
 from sqlalchemy.orm import sessionmaker, joinedload
 
@@ -9,7 +9,7 @@ from appsettings import appSettings
 
 class ProjectStatus:
     def __init__(self, projectGuid):
-        self.engine = create_engine()
+        self.engine = get_engine()
         self.Session = sessionmaker(bind=self.engine)
         self.session = self.Session()
         self.project = self.session.query(Project).filter_by(ProjectUid=projectGuid).first()
@@ -1,25 +1,31 @@
 #%%
-import io
+import os
+import tempfile
 import numpy as np
 import jsonpickle.ext.pandas as pickle_pandas
 import jsonpickle.ext.numpy as pickle_numpy
-from hps.utils.draw_hydro_system import draw_hydro_system
 from system_manager import SystemManager
-from matplotlib.backends.backend_agg import FigureCanvasAgg
 from evaluator import start_evalaution
-from project_runner import start_run_project
+from project_runner import resume_interrupted_runs, start_run_project
 from project_status import ProjectStatus
 from hps.rl.settings import RunSettings, RunSettingsSerializer
 from server.namegenerator import get_random_names
 from server.appsettings import appSettings
-from hps.utils.serializer import HydroSystemSerializer
+from response_cache import ResponseCache
+from server.series_ingestion import IngestionJob, IngestionJobs, TimeDataSeriesType, start_ingestion
 
 
 class RequestHandler:
     def __init__(self):
         self.system_manager = SystemManager()
+        if os.path.isdir(appSettings.get_system_folder()):
+            self.system_manager.register_folder(appSettings.get_system_folder())
+        self.response_cache = ResponseCache(self.system_manager)
+        self.ingestion_jobs = IngestionJobs()
         pickle_pandas.register_handlers()
         pickle_numpy.register_handlers()
+        if appSettings.resume_runs_on_start():
+            resume_interrupted_runs()
 
     def start_agents(self, project_uid, run_id):
         status = ProjectStatus(project_uid)
@@ -37,12 +43,7 @@ class RequestHandler:
         return "evalauting"
 
     def get_image(self, system):
-        hs = self.system_manager.get_system(system)
-        drawing = draw_hydro_system(hs, system)
-        drawing.patch.set_alpha(0)
-        output = io.BytesIO()
-        FigureCanvasAgg(drawing).print_png(output)
-        return output
+        return self.response_cache.get_drawing(system)
 
     def create_run_settings(self, project_uid, agent_id):
         settings = RunSettings()
@@ -72,5 +73,22 @@ class RequestHandler:
         return RunSettingsSerializer.serialize(settings)
 
     def get_system(self, system):
-        hs = self.system_manager.get_system(system)
-        return HydroSystemSerializer.serialize(hs)
+        return self.response_cache.get_system(system)
+
+    def add_series(self, filetype, file):
+        TimeDataSeriesType.from_filetype(filetype)  # Fail before storing the file
+
+        upload_folder = appSettings.get_workspace_folder() + "uploads"
+        os.makedirs(upload_folder, exist_ok=True)
+        handle, path = tempfile.mkstemp(suffix=".csv", dir=upload_folder)
+        with os.fdopen(handle, "wb") as f:
+            file.save(f)
+
+        job = IngestionJob(filetype, file.filename, os.path.getsize(path))
+        self.ingestion_jobs.add(job)
+        start_ingestion(path, job)
+        return job.to_dict()
+
+    def get_ingestion_status(self, job_id):
+        job = self.ingestion_jobs.get(job_id)
+        return None if job is None else job.to_dict()
@@ -0,0 +1,87 @@
+import hashlib
+import io
+import threading
+import weakref
+
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from hps.utils.draw_hydro_system import draw_hydro_system
+from hps.utils.serializer import HydroSystemSerializer
+
+
+class CachedResponse:
+    def __init__(self, body: bytes, mimetype: str):
+        """
+        Rendered response body with the ETag identifying it.
+
+        :param body: Response body
+        :type body: bytes
+        :param mimetype: Mime type of the body
+        :type mimetype: str
+        """
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+
+
+class ResponseCache:
+    Drawing = "drawing"
+    System = "system"
+
+    def __init__(self, system_manager):
+        """
+        Rendered drawings and serialized hydro systems, keyed by system name and a hash of the serialized system.
+        Each response is rendered once, on first request, and the responses of a system are dropped when its
+        content changes.
+
+        :param system_manager: Provides the hydro systems by name
+        :type system_manager: SystemManager
+        """
+        self.system_manager = system_manager
+        self.content_hashes = {}  # System name -> (weak reference to the system, hash of the serialized system)
+        self.responses = {}  # (system name, content hash, kind) -> CachedResponse
+        self.lock = threading.Lock()  # Rendering uses the global pyplot state
+
+    def get_drawing(self, system_name: str) -> CachedResponse:
+        return self._get(system_name, ResponseCache.Drawing)
+
+    def get_system(self, system_name: str) -> CachedResponse:
+        return self._get(system_name, ResponseCache.System)
+
+    def _get(self, system_name, kind) -> CachedResponse:
+        hs = self.system_manager.get_system(system_name)
+        with self.lock:
+            key = (system_name, self._content_hash(system_name, hs), kind)
+            if key not in self.responses:  # The system response is stored when computing the content hash
+                self.responses[key] = CachedResponse(self._render_drawing(hs, system_name), "image/png")
+            return self.responses[key]
+
+    def _content_hash(self, system_name, hs) -> str:
+        """
+        Hash of the serialized system. The system is serialized again only if the system manager returns
+        another system object, and the serialized system is kept as the system response. The responses of the
+        previous content of the system are removed.
+        """
+        system_ref, content_hash = self.content_hashes.get(system_name, (None, None))
+        # Weak reference, so systems evicted by the system manager are freed
+        if system_ref is None or system_ref() is not hs:
+            serialized = HydroSystemSerializer.serialize(hs).encode("utf-8")
+            previous_hash, content_hash = content_hash, hashlib.sha256(serialized).hexdigest()
+            if previous_hash not in (None, content_hash):
+                for kind in (ResponseCache.Drawing, ResponseCache.System):
+                    self.responses.pop((system_name, previous_hash, kind), None)
+            self.content_hashes[system_name] = (weakref.ref(hs), content_hash)
+            key = (system_name, content_hash, ResponseCache.System)
+            if key not in self.responses:
+                self.responses[key] = CachedResponse(serialized, "application/json")
+        return content_hash
+
+    @staticmethod
+    def _render_drawing(hs, system_name) -> bytes:
+        figure = draw_hydro_system(hs, system_name).figure
+        figure.patch.set_alpha(0)
+        output = io.BytesIO()
+        FigureCanvasAgg(figure).print_png(output)
+        plt.close(figure)
+        return output.getvalue()
@@ -0,0 +1,238 @@
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from server.db_connection import create_session
+from server.model import TimeDataSery, TimeDataValue, Upload
+
+
+class TimeDataSeriesType:
+    # Same values as the TimeDataSeriesType enum of the web application
+    Inflow = 0
+    Price = 1
+
+    @staticmethod
+    def from_filetype(filetype: str) -> int:
+        types = {"inflow": TimeDataSeriesType.Inflow, "price": TimeDataSeriesType.Price}
+        if filetype.lower() not in types:
+            raise ValueError("Unknown file type {}, expected one of {}".format(filetype, list(types)))
+        return types[filetype.lower()]
+
+
+def format_time_stamps(time_index: pd.DatetimeIndex):
+    """
+    Format UTC time stamps the way DateTimeOffset is stored by the web application.
+    """
+    return (time_index.strftime("%Y-%m-%d %H:%M:%S") + "+00:00").tolist()
+
+
+class IngestionJob:
+    def __init__(self, filetype: str, source_file: str, total_bytes: int):
+        """
+        Progress of a CSV upload that is ingested in the background.
+
+        :param filetype: Type of the series in the file, inflow or price
+        :type filetype: str
+        :param source_file: Name of the uploaded file
+        :type source_file: str
+        :param total_bytes: Size of the uploaded file
+        :type total_bytes: int
+        """
+        self.job_id = str(uuid.uuid4())
+        self.filetype = filetype
+        self.source_file = source_file
+        self.total_bytes = total_bytes
+        self.read_bytes = 0
+        self.rows = 0
+        self.upload_id = None
+        self.status = "queued"
+        self.error = None
+
+    def to_dict(self):
+        return {
+            "jobId": self.job_id,
+            "status": self.status,
+            "progress": self.read_bytes / self.total_bytes if self.total_bytes else 1.0,
+            "rows": self.rows,
+            "uploadId": self.upload_id,
+            "error": self.error,
+        }
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+
+class IngestionJobs:
+    def __init__(self, max_finished: int = 100):
+        """
+        Ingestion jobs by job id. Running jobs are kept, and only the latest max_finished finished jobs, so the
+        status of a job can be polled for a while after it finished.
+
+        :param max_finished: Number of finished jobs kept, defaults to 100
+        :type max_finished: int
+        """
+        self.max_finished = max_finished
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def add(self, job: IngestionJob):
+        with self._lock:
+            finished = [job_id for job_id, j in self._jobs.items() if j.finished]
+            for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+                del self._jobs[job_id]
+            self._jobs[job.job_id] = job
+
+    def get(self, job_id: str):
+        """
+        :return: The job, or None if it is unknown or dropped
+        :rtype: Optional[IngestionJob]
+        """
+        return self._jobs.get(job_id)
+
+    def __len__(self):
+        return len(self._jobs)
+
+
+class CsvSeriesIngestion:
+    def __init__(self, path: str, job: IngestionJob, chunk_rows: int = 50_000, logger=None):
+        """
+        Stream a CSV file with a time stamp column followed by one column per scenario into the database.
+
+        The file is parsed chunk_rows rows at a time. Each chunk is validated and inserted in its own transaction, so
+        memory use does not grow with the file size.
+
+        :param path: Path of the uploaded file
+        :type path: str
+        :param job: Job reporting the progress
+        :type job: IngestionJob
+        :param chunk_rows: Number of rows parsed and inserted at a time, defaults to 50_000
+        :type chunk_rows: int
+        """
+        self.path = path
+        self.job = job
+        self.chunk_rows = chunk_rows
+        self.logger = logger or logging.getLogger(__name__)
+        self.series_type = TimeDataSeriesType.from_filetype(job.filetype)
+
+    def run(self):
+        self.job.status = "running"
+        session = create_session()
+        try:
+            self._ingest(session)
+            self.job.status = "done"
+        except Exception as e:
+            self.logger.exception("Failed to ingest " + self.job.source_file)
+            session.rollback()
+            self._remove_upload(session)
+            self.job.status = "failed"
+            self.job.error = str(e)
+        finally:
+            session.close()
+            os.remove(self.path)
+
+    def _ingest(self, session):
+        columns = pd.read_csv(self.path, nrows=0).columns
+        if len(columns) < 2:
+            raise ValueError("Expected a time stamp column followed by at least one series column")
+        dtype = {col: np.float64 for col in columns[1:]}
+        dtype[columns[0]] = str
+
+        upload = Upload(UploadTime=format_time_stamps(pd.DatetimeIndex([datetime.now(timezone.utc)]))[0])
+        upload.SourceFile = self.job.source_file
+        session.add(upload)
+        session.flush()
+        self.job.upload_id = upload.UploadId
+
+        series = []
+        last_time = None
+        with open(self.path, "rb") as handle:
+            for chunk in pd.read_csv(handle, dtype=dtype, chunksize=self.chunk_rows):
+                time_index = self._validate(chunk, last_time)
+                time_stamps = format_time_stamps(time_index)
+
+                if not series:
+                    series = self._create_series(session, upload, columns[1:], time_stamps[0])
+
+                for sery, col in zip(series, columns[1:]):
+                    session.execute(
+                        TimeDataValue.__table__.insert(),
+                        [
+                            {"TimeDataSeriesId": sery.TimeDataSeriesId, "TimeStampOffset": t, "Value": v}
+                            for t, v in zip(time_stamps, chunk[col].values.tolist())
+                        ],
+                    )
+
+                for sery in series:
+                    sery.EndTime = time_stamps[-1]
+                session.commit()
+
+                last_time = time_index[-1]
+                self.job.rows += len(chunk)
+                self.job.read_bytes = handle.tell()
+
+        if not series:
+            raise ValueError("The file has no rows")
+
+    def _validate(self, chunk: pd.DataFrame, last_time) -> pd.DatetimeIndex:
+        first_row = self.job.rows + 1
+        time_index = pd.DatetimeIndex(pd.to_datetime(chunk.iloc[:, 0], utc=True, errors="coerce"))
+        if time_index.hasnans:
+            row = first_row + int(np.argmax(time_index.isna()))
+            raise ValueError("Invalid time stamp at row {}".format(row))
+
+        steps = np.diff(time_index.asi8)
+        if len(steps) and steps.min() <= 0:
+            row = first_row + 1 + int(np.argmax(steps <= 0))
+            raise ValueError("Time stamps must be increasing, row {}".format(row))
+        if last_time is not None and time_index[0] <= last_time:
+            raise ValueError("Time stamps must be increasing, row {}".format(first_row))
+
+        values = chunk.iloc[:, 1:].values
+        if np.isnan(values).any():
+            row = first_row + int(np.argmax(np.isnan(values).any(axis=1)))
+            raise ValueError("Missing value at row {}".format(row))
+
+        return time_index
+
+    def _create_series(self, session, upload, descriptions, start_time):
+        series = [
+            TimeDataSery(
+                UploadId=upload.UploadId,
+                StartTime=start_time,
+                EndTime=start_time,
+                Description=str(description),
+                Type=self.series_type,
+            )
+            for description in descriptions
+        ]
+        session.add_all(series)
+        session.flush()
+        return series
+
+    def _remove_upload(self, session):
+        if self.job.upload_id is None:
+            return
+        series_ids = [
+            s.TimeDataSeriesId for s in session.query(TimeDataSery).filter_by(UploadId=self.job.upload_id).all()
+        ]
+        session.query(TimeDataValue).filter(TimeDataValue.TimeDataSeriesId.in_(series_ids)).delete(
+            synchronize_session=False
+        )
+        session.query(TimeDataSery).filter_by(UploadId=self.job.upload_id).delete(synchronize_session=False)
+        session.query(Upload).filter_by(UploadId=self.job.upload_id).delete(synchronize_session=False)
+        session.commit()
+
+
+def start_ingestion(path: str, job: IngestionJob) -> threading.Thread:
+    """
+    Ingest the file in a background thread, so the request returns the job id immediately.
+    """
+    thread = threading.Thread(target=CsvSeriesIngestion(path, job).run, daemon=True)
+    thread.start()
+    return thread
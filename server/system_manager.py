@@ -1,16 +1,89 @@
+import os
+import threading
+from collections import OrderedDict
+
 from hydro_system_models import hydro_system_large, hydro_system_medium, hydro_system_small
+from hps.utils.serializer import HydroSystemSerializer
 
 
 class SystemManager:
-    def __init__(self):
-        self.system_lookup = {
-            "large": hydro_system_large(),
-            "medium": hydro_system_medium(),
-            "small": hydro_system_small()
-        }
+    def __init__(self, cache_size: int = 8):
+        """
+        Registry of hydro systems by name. A system is registered as a factory and built on first use, and the
+        cache_size most recently used systems are kept.
+
+        :param cache_size: Number of built systems to keep, defaults to 8
+        :type cache_size: int
+        """
+        self.cache_size = cache_size
+        self.factories = {}
+        self.systems = OrderedDict()  # Built systems, least recently used first
+        self.lock = threading.Lock()
+
+        self.register("large", hydro_system_large)
+        self.register("medium", hydro_system_medium)
+        self.register("small", hydro_system_small)
+
+    @property
+    def system_names(self):
+        return list(self.factories)
+
+    def register(self, system_name: str, factory):
+        """
+        Register a system built by calling factory without arguments. Replaces a system with the same name.
+
+        :param system_name: Name of the system
+        :type system_name: str
+        :param factory: Function returning the hydro system
+        """
+        with self.lock:
+            self.factories[system_name] = factory
+            self.systems.pop(system_name, None)
+
+    def register_json(self, system_name: str, path: str):
+        """
+        Register a system serialized with HydroSystemSerializer. The file is read when the system is first used.
+
+        :param system_name: Name of the system
+        :type system_name: str
+        :param path: Path of the serialized system
+        :type path: str
+        """
+
+        def load():
+            with open(path, encoding="utf-8") as f:
+                return HydroSystemSerializer.deserialize(f.read())
+
+        self.register(system_name, load)
+
+    def register_folder(self, folder: str):
+        """
+        Register every <system name>.json file of a folder.
+
+        :param folder: Folder with serialized systems
+        :type folder: str
+        """
+        for file_name in sorted(os.listdir(folder)):
+            system_name, extension = os.path.splitext(file_name)
+            if extension == ".json":
+                self.register_json(system_name, os.path.join(folder, file_name))
 
     def get_system(self, system_name):
-        if not system_name in self.system_lookup:
+        if not system_name in self.factories:
             raise ValueError("Unknown system : {0}".format(system_name))
 
-        return self.system_lookup[system_name]
+        with self.lock:
+            if system_name in self.systems:
+                self.systems.move_to_end(system_name)
+                return self.systems[system_name]
+            factory = self.factories[system_name]
+
+        system = factory()  # Built outside the lock, so other systems can be served meanwhile
+
+        with self.lock:
+            # Keep the system built first if another thread built it meanwhile
+            system = self.systems.setdefault(system_name, system)
+            self.systems.move_to_end(system_name)
+            while len(self.systems) > self.cache_size:
+                self.systems.popitem(last=False)
+        return system
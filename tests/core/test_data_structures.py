@@ -1,3 +1,6 @@
+import copy
+import pickle
+
 import pytest
 import numpy as np
 from core.data_structures import MyDataFrame
@@ -15,7 +18,7 @@ def test_constructor(simple_data_frame):
     assert simple_data_frame.n_elements == n_elements
     assert simple_data_frame.dtype == dtype
     np.testing.assert_array_equal(simple_data_frame.index, np.arange(0, n_elements))
-    assert simple_data_frame.columns == set(columns)
+    assert set(simple_data_frame.columns) == set(columns)
     
     expected = {col: np.zeros(n_elements, dtype=dtype) for col in columns}
     for col in columns:
@@ -75,4 +78,47 @@ def test_sum_column(simple_data_frame):
     expected = 3
     actual = simple_data_frame["aa"].sum()
 
-    assert expected == actual
\ No newline at end of file
+    assert expected == actual
+
+def test_columns_keep_order():
+    columns = ["bc", "aa", "ab"]
+    data_frame = MyDataFrame(columns=columns, n_elements=3)
+
+    assert list(data_frame.columns) == columns
+    assert data_frame["aa"].flags["C_CONTIGUOUS"]
+
+
+def test_slicing(simple_data_frame):
+    simple_data_frame["aa"] = np.arange(3, dtype=np.float32)
+    simple_data_frame["ab"] = np.arange(3, dtype=np.float32) * 10
+
+    rows = simple_data_frame[1:]
+    assert rows.n_elements == 2
+    np.testing.assert_equal(rows["ab"], [10, 20])
+
+    block = simple_data_frame[["aa", "ab"]]
+    np.testing.assert_equal(block, [[0, 0], [1, 10], [2, 20]])
+    assert np.shares_memory(block, simple_data_frame.values)
+
+
+def test_to_pandas_and_numpy(simple_data_frame):
+    simple_data_frame["bc"] = np.ones(3, dtype=np.float32)
+
+    df = simple_data_frame.to_pandas()
+    assert list(df.columns) == ["aa", "ab", "bc"]
+    np.testing.assert_equal(df["bc"].values, np.ones(3))
+    assert np.shares_memory(df.values, simple_data_frame.values)
+    assert simple_data_frame.to_numpy() is simple_data_frame.values
+
+
+@pytest.mark.parametrize("round_trip", [lambda df: pickle.loads(pickle.dumps(df)), copy.deepcopy])
+def test_pickle_and_deepcopy(simple_data_frame, round_trip):
+    simple_data_frame["ab"] = np.arange(3, dtype=np.float32)
+
+    restored = round_trip(simple_data_frame)
+
+    assert restored.columns == ("aa", "ab", "bc")
+    np.testing.assert_equal(restored["ab"], [0, 1, 2])
+    restored["bc"] = np.ones(3, dtype=np.float32)
+    np.testing.assert_equal(restored.values[:, 2], np.ones(3))
+    np.testing.assert_equal(simple_data_frame["bc"], np.zeros(3))
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.packed_array import (
+    decode_steps,
+    encode_steps,
+    pack_float32,
+    pack_int64,
+    unpack_float32,
+    unpack_int64,
+)
+
+
+def test_pack_roundtrip():
+    values = np.random.default_rng(0).normal(size=1000) * 100
+
+    unpacked = unpack_float32(pack_float32(values), len(values))
+
+    assert unpacked.dtype == np.float32
+    np.testing.assert_array_equal(unpacked, values.astype(np.float32))
+
+
+def test_pack_empty():
+    assert len(unpack_float32(pack_float32([]), 0)) == 0
+
+
+def test_unpack_wrong_length():
+    with pytest.raises(ValueError):
+        unpack_float32(pack_float32([1.0, 2.0]), 3)
+
+
+def test_pack_compresses_smooth_series():
+    values = np.cumsum(np.full(8760, 0.5))
+
+    assert len(pack_float32(values)) < values.astype(np.float32).nbytes / 4
+
+
+def test_pack_int64_roundtrip():
+    values = np.array([0, 5000, 10000, 2**40, 2**40 + 1, -3])
+
+    np.testing.assert_array_equal(unpack_int64(pack_int64(values), len(values)), values)
+
+
+def test_steps_roundtrip():
+    hourly = pd.date_range("2021-01-01", periods=48, freq="H", tz="UTC")
+    daily = pd.date_range(hourly[-1] + pd.Timedelta("1D"), periods=10, freq="D")
+    time_index = hourly.append(daily)
+
+    description = encode_steps(time_index)
+
+    assert description == "[[3600, 47], [86400, 10]]"
+    pd.testing.assert_index_equal(decode_steps(time_index[0], description), time_index, check_names=False)
+
+
+def test_steps_single_time_stamp():
+    time_index = pd.DatetimeIndex([pd.Timestamp("2021-01-01")])
+
+    assert list(decode_steps(time_index[0], encode_steps(time_index))) == list(time_index)
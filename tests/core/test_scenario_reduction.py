@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from core.scenario_reduction import fast_forward_selection, fast_forward_selection_algo
+
+
+@pytest.fixture()
+def scenarios():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(60, 5))
+
+
+def test_reduce_to_all_scenarios(scenarios):
+    selected, probabilities = fast_forward_selection(scenarios, len(scenarios))
+
+    assert sorted(selected) == list(range(len(scenarios)))
+    np.testing.assert_allclose(probabilities, 1 / len(scenarios))
+
+
+def test_probabilities_are_redistributed(scenarios):
+    reduced, probabilities = fast_forward_selection_algo(scenarios, 6)
+
+    assert reduced.shape == (6, 5)
+    assert np.isclose(np.sum(probabilities), 1)
+    assert np.all(np.asarray(probabilities) >= 1 / len(scenarios))
+
+
+def test_chunked_same_as_full_cost_matrix(scenarios):
+    selected, probabilities = fast_forward_selection(scenarios, 8)
+    selected_chunked, probabilities_chunked = fast_forward_selection(scenarios, 8, chunk_size=7)
+
+    np.testing.assert_array_equal(selected, selected_chunked)
+    np.testing.assert_allclose(probabilities, probabilities_chunked)
+
+
+def test_weighted_scenarios():
+    scenarios = np.array([[0.0], [1.0], [10.0]])
+    selected, probabilities = fast_forward_selection(scenarios, 1, probabilities=np.array([0.1, 0.1, 0.8]))
+
+    assert list(selected) == [2]
+    np.testing.assert_allclose(probabilities, [1.0])
@@ -104,4 +104,5 @@ def test_discounter():
     discounter = Discounter(discount_rate=discount_rate, time_indexer=time_indexer)
     actual_discount = [discounter.get_gamma(i) for i in range(time_indexer.length)]
 
-    assert exp_discount == actual_discount
\ No newline at end of file
+    assert exp_discount == actual_discount
+    np.testing.assert_allclose(discounter.get_gammas(time_indexer.length), exp_discount, rtol=1e-15)
@@ -111,3 +111,22 @@ def test_episode_sampling_eval(inflow_price_sampler_eval):
     assert_array_almost_equal(ep2[:,0], inflow_price_sampler_eval.df_p.iloc[:,1].values)
     assert_array_almost_equal(ep2[:,1], inflow_price_sampler_eval.df_i.iloc[:,1].values)
 
+
+
+def test_eval_scenario_reduction():
+    import numpy as np
+
+    index = pd.date_range("2020-01-01", periods=120, freq="1D")
+    columns = [f"scen_{i}" for i in range(20)]
+    rng = np.random.default_rng(0)
+    levels = np.where(np.arange(20) < 15, 10.0, 50.0)  # Two groups of scenarios
+    df = pd.DataFrame(levels + rng.normal(0, 1, size=(120, 20)), index=index, columns=columns)
+    forecast_data = InflowPriceForecastData("Sys", inflow=df, price=df)
+    time_indexer = TimeIndexer(pd.date_range(index[0], periods=4 + 1, freq="7D"))
+
+    sampler = InflowPriceSampler(forecast_data, time_indexer, is_eval=True, n_clusters=None, n_eval_scenarios=2)
+
+    assert sampler.n_raw_episodes == 2
+    assert_almost_equal(sorted(sampler.scenario_weights), [0.25, 0.75])
+    names = [sampler.sample_episode()[1] for _ in range(3)]
+    assert names[0] != names[1] and names[2] == names[0]
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from hps.rl.environment.eval_recorder import EvalRecorder
+
+
+def test_record_and_read_columns():
+    recorder = EvalRecorder(["Power_ps1", "Power_ps2", "res1"], n_elements=3)
+    for step in range(3):
+        recorder.record(step, [step, 10 * step, 100 * step])
+
+    assert list(recorder.columns) == ["Power_ps1", "Power_ps2", "res1"]
+    np.testing.assert_array_equal(recorder["Power_ps2"], [0, 10, 20])
+    assert recorder["res1"].flags["C_CONTIGUOUS"]
+    assert "res1" in recorder
+    assert list(recorder.filter("Power_")) == ["Power_ps1", "Power_ps2"]
+
+
+def test_unique_columns():
+    with pytest.raises(ValueError):
+        EvalRecorder(["res1", "res1"], n_elements=3)
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from hps.custom_box import CustomBox
+from hps.rl.environment.exploration_policy import (
+    PricePrimerPolicy,
+    create_exploration_policy,
+    price_rank_masks,
+    station_action_indices,
+)
+from hps.rl.environment.hscomponents import HSystem, Res, Station, StationAction, VariableInflowAction
+from hps.rl.settings import ExplorationPolicyType
+from hps.system.generation_function import ConstantGenerationFunction
+from hps.system.head_function import ConstantHeadFunction
+from hps.system.inflow import ScaleYearlyInflowModel
+
+
+def create_hydro_system():
+    inflow_model = ScaleYearlyInflowModel(mean_yearly_inflow=200)
+    head = ConstantHeadFunction(head=430, v_min=0, v_max=200)
+    res1 = Res("res1", 0, 200, 100, 100, spillage=None, inflow_model=inflow_model, head=head, energy_equivalent=1.0)
+    ocean = Res("ocean", 0, 1e6, 0, 0, None, None, is_ocean=True)
+    station = Station("ps1", 15, 30, gen_func=ConstantGenerationFunction(15, 30, 1.0), energy_equivalent=1.0)
+    actions = [
+        VariableInflowAction(name="inflow_res1", res=res1, yearly_inflow=200.0),
+        StationAction(name="res1_ps1_ocean", upper_res=res1, station=station, lower_res=ocean),
+    ]
+    return HSystem(reservoirs=[res1, ocean], stations=[station], sorted_actions=actions)
+
+
+def create_env(volume, step, prices):
+    hydro_system = create_hydro_system()
+    hydro_system.reservoirs[0].current_volume = volume
+    return SimpleNamespace(hydro_system=hydro_system, current_price=prices, current_step=step)
+
+
+@pytest.fixture
+def prices():
+    return np.array([5.0, 50.0, 10.0, 40.0, 20.0, 1.0, 30.0, 2.0, 3.0, 4.0])
+
+
+def test_price_rank_masks(prices):
+    good, best = price_rank_masks(prices)
+
+    np.testing.assert_array_equal(np.flatnonzero(good), [1, 2, 3, 4, 6])
+    np.testing.assert_array_equal(np.flatnonzero(best), [1])
+
+
+def test_station_action_indices():
+    assert station_action_indices(create_hydro_system()) == [0]
+
+
+def test_primer_actions_of_all_envs(prices):
+    envs = [
+        create_env(volume=20, step=1, prices=prices),  # Best price
+        create_env(volume=170, step=2, prices=prices),  # Good price, reservoir getting full
+        create_env(volume=150, step=3, prices=prices),
+        create_env(volume=100, step=4, prices=prices),
+        create_env(volume=100, step=0, prices=prices),  # Low price
+        create_env(volume=195, step=0, prices=prices),  # Low price, reservoir about to spill
+    ]
+    policy = PricePrimerPolicy(np.zeros(1, dtype=np.float32), np.ones(1, dtype=np.float32))
+
+    actions = policy(envs)
+
+    assert actions.shape == (6, 1)
+    np.testing.assert_allclose(actions[:, 0], [1.0, 0.8, 0.5, 0.0, 0.0, 1.0])
+
+
+def test_primer_masks_follow_the_episode(prices):
+    env = create_env(volume=20, step=1, prices=prices)
+    policy = PricePrimerPolicy(np.zeros(1, dtype=np.float32), np.ones(1, dtype=np.float32))
+    assert policy([env])[0, 0] == 1.0
+
+    env.current_price = prices[::-1].copy()
+
+    assert policy([env])[0, 0] == 0.0
+
+
+def test_custom_box_samples_from_the_policy(prices):
+    env = create_env(volume=20, step=1, prices=prices)
+    box = CustomBox(low=0.0, high=1.0, environment=env, is_eval=False, shape=[1], dtype=np.float32)
+    box.exploration_policy = create_exploration_policy(ExplorationPolicyType.PricePrimer, box)
+
+    assert box.sample()[0] == 1.0
+    assert create_exploration_policy(ExplorationPolicyType.Uniform, box) is None
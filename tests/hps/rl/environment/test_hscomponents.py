@@ -269,4 +269,27 @@ def test_execute_for_pick_three_gate_action_with_spillage(h_system_three_gate_ac
     assert h_system_three_gate_action.reservoirs[1].current_volume ==  10
     assert h_system_three_gate_action.reservoirs[2].current_volume ==  5 + discharge_vol + spillage_res2_res3
     assert h_system_three_gate_action.stations[0].production == 22.5
-    assert reward == 270. - 1*spillage_res2_res3*1*10**3
\ No newline at end of file
+    assert reward == 270. - 1*spillage_res2_res3*1*10**3
+
+def test_report_getters(h_system_gate_action):
+    in_norm_actions = np.array([0.5, 0.2, 0.6])
+    h_system_gate_action.reservoirs[1].current_volume = 12
+    h_system_gate_action.execute(in_norm_actions, 1, 12, {})
+
+    getters = h_system_gate_action.report_getters()
+    values = {name: getter(in_norm_actions) for name, getter in getters.items()}
+
+    assert list(values) == [
+        "res1", "Spill_sp1", "WV_res1", "res2", "Spill_sp2", "WV_res2", "res3", "Spill_sp3", "WV_res3",
+        "Power_ps", "Discharge_ps", "picked_Switch", "reward_Switch", "dec_Switch", "reward_saction1",
+        "reward_saction2", "Agent_saction1", "Agent_saction2",
+    ]
+    assert values["res1"] == pytest.approx(4.919)
+    assert values["res2"] == 10
+    assert values["Spill_sp2"] == 2.0
+    assert values["Power_ps"] == 22.5
+    assert values["picked_Switch"] == 0
+    assert values["reward_Switch"] == values["reward_saction1"] == 270.0
+    assert values["dec_Switch"] == 0.6
+    assert values["Agent_saction2"] == 0.2
+    assert h_system_gate_action.report_state(in_norm_actions) == values
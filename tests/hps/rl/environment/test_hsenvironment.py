@@ -9,3 +9,16 @@ def test_get_observations(hsenv):
 
     vals2 = np.array(list(dct.values()), dtype=np.float32)
     np.testing.assert_array_equal(vals, vals2)
+
+
+def test_episode_context():
+    from core.value_scaler import PriceScaler
+    from hps.rl.environment.hsenvironment import EpisodeContext
+
+    price = np.array([10.0, 20.0, 30.0])
+    inflow = {"res1": np.array([1.0, 2.0, 3.0]), "res2": np.array([4.0, 5.0, 6.0])}
+    context = EpisodeContext.create(price, inflow, PriceScaler(max_value=30.0, min_value=5.0, scale_by=2.0))
+
+    assert context.scaled_price == [10.0, 30.0, 50.0]
+    assert context.inflows[1] == {"res1": 2.0, "res2": 5.0}
+    assert EpisodeContext.create(price, {}, PriceScaler(30.0, 0.0, 1.0)).inflows == [{}, {}, {}]
@@ -0,0 +1,334 @@
+import json
+import os
+import pickle
+
+import gym
+import numpy as np
+import pytest
+from gym import spaces
+from stable_baselines3 import SAC
+from stable_baselines3.common.buffers import DictReplayBuffer
+
+from hps.rl.sac.replay_buffer import (
+    MemmapDictReplayBuffer,
+    ReplayBufferCheckpoint,
+    SharedMemmapDictReplayBuffer,
+    add_transitions,
+)
+
+
+@pytest.fixture
+def observation_space():
+    return spaces.Dict(
+        {
+            "obs": spaces.Box(-1, 1, shape=(3,), dtype=np.float64),
+            "fourier_time_": spaces.Box(np.array([0]), np.array([np.inf]), dtype=np.float64),
+        }
+    )
+
+
+@pytest.fixture
+def action_space():
+    return spaces.Box(-1, 1, shape=(2,), dtype=np.float32)
+
+
+def fill(buffer, n):
+    rng = np.random.default_rng(0)
+    for i in range(n):
+        obs = {"obs": rng.uniform(-1, 1, size=(1, 3)), "fourier_time_": np.array([[24.0 * i]])}
+        next_obs = {"obs": rng.uniform(-1, 1, size=(1, 3)), "fourier_time_": np.array([[24.0 * (i + 1)]])}
+        buffer.add(
+            obs,
+            next_obs,
+            rng.uniform(-1, 1, size=(1, 2)).astype(np.float32),
+            np.array([float(i)]),
+            np.array([i % 10 == 9]),
+            [{}],
+        )
+
+
+def test_storage_dtype(observation_space):
+    assert MemmapDictReplayBuffer.storage_dtype(observation_space["obs"]) == np.float16
+    assert MemmapDictReplayBuffer.storage_dtype(observation_space["fourier_time_"]) == np.float32
+    assert MemmapDictReplayBuffer.storage_dtype(spaces.Discrete(3)) == np.int64
+
+
+def test_files_created_on_first_add(tmp_path, observation_space, action_space):
+    path = str(tmp_path / "buffer")
+    buffer = MemmapDictReplayBuffer(100, observation_space, action_space, device="cpu", path=path)
+    assert not os.path.exists(path)
+
+    fill(buffer, 1)
+    assert os.path.isfile(os.path.join(path, "observations_0.dat"))
+
+
+def test_same_content_as_dict_replay_buffer(tmp_path, observation_space, action_space):
+    buffer = MemmapDictReplayBuffer(100, observation_space, action_space, device="cpu", path=str(tmp_path))
+    reference = DictReplayBuffer(100, observation_space, action_space, device="cpu")
+    fill(buffer, 30)
+    fill(reference, 30)
+
+    assert buffer.size() == reference.size() == 30
+    assert buffer.nbytes < sum(obs.nbytes for obs in reference.observations.values()) * 2
+
+    np.random.seed(1)
+    samples = buffer.sample(16)
+    np.random.seed(1)
+    reference_samples = reference.sample(16)
+
+    for key in observation_space.spaces:
+        np.testing.assert_allclose(samples.observations[key], reference_samples.observations[key], atol=1e-3)
+        np.testing.assert_allclose(
+            samples.next_observations[key], reference_samples.next_observations[key], atol=1e-3
+        )
+    np.testing.assert_allclose(samples.actions, reference_samples.actions)
+    np.testing.assert_allclose(samples.rewards, reference_samples.rewards)
+    np.testing.assert_allclose(samples.dones, reference_samples.dones)
+
+
+def test_pickle_maps_files(tmp_path, observation_space, action_space):
+    buffer = MemmapDictReplayBuffer(1000, observation_space, action_space, device="cpu", path=str(tmp_path))
+    fill(buffer, 20)
+
+    data = pickle.dumps(buffer)
+    assert len(data) < 10000
+
+    restored = pickle.loads(data)
+    assert restored.pos == 20
+    assert isinstance(restored.actions, np.memmap)
+    np.testing.assert_array_equal(restored.rewards[:20, 0], np.arange(20))
+
+
+def test_copy_to(tmp_path, observation_space, action_space):
+    buffer = MemmapDictReplayBuffer(100, observation_space, action_space, device="cpu", path=str(tmp_path / "a"))
+    fill(buffer, 10)
+    copy = pickle.loads(pickle.dumps(buffer))
+    copy.copy_to(str(tmp_path / "b"))
+    fill(copy, 5)
+
+    assert copy.pos == 15
+    assert buffer.pos == 10
+    np.testing.assert_array_equal(buffer.rewards[10:15, 0], 0)
+    np.testing.assert_array_equal(copy.rewards[10:15, 0], np.arange(5))
+
+
+def test_add_transitions_wraps_like_add(tmp_path, observation_space, action_space):
+    buffer = MemmapDictReplayBuffer(25, observation_space, action_space, device="cpu", path=str(tmp_path))
+    reference = DictReplayBuffer(25, observation_space, action_space, device="cpu")
+    fill(buffer, 10)
+    fill(reference, 10)
+
+    rng = np.random.default_rng(1)
+    obs = {"obs": rng.uniform(-1, 1, size=(20, 1, 3)), "fourier_time_": np.arange(20.0).reshape(20, 1, 1)}
+    next_obs = {"obs": rng.uniform(-1, 1, size=(20, 1, 3)), "fourier_time_": np.arange(1.0, 21.0).reshape(20, 1, 1)}
+    actions = rng.uniform(-1, 1, size=(20, 1, 2)).astype(np.float32)
+    rewards = np.arange(20.0).reshape(20, 1)
+    dones = (np.arange(20) % 10 == 9).reshape(20, 1)
+    add_transitions(buffer, obs, next_obs, actions, rewards, dones)
+    for i in range(20):
+        reference.add(
+            {key: value[i] for key, value in obs.items()},
+            {key: value[i] for key, value in next_obs.items()},
+            actions[i],
+            rewards[i],
+            dones[i],
+            [{}],
+        )
+
+    assert (buffer.pos, buffer.full) == (reference.pos, reference.full) == (5, True)
+    np.testing.assert_array_equal(buffer.rewards, reference.rewards)
+    np.testing.assert_array_equal(buffer.dones, reference.dones)
+    np.testing.assert_allclose(buffer.actions, reference.actions)
+    np.testing.assert_allclose(buffer.observations["obs"], reference.observations["obs"], atol=1e-3)
+
+
+class DictEnv(gym.Env):
+    def __init__(self, observation_space, action_space):
+        self.observation_space = observation_space
+        self.action_space = action_space
+        self.step_count = 0
+
+    def _obs(self):
+        return {"obs": np.full(3, 0.1 * (self.step_count % 10)), "fourier_time_": np.array([float(self.step_count)])}
+
+    def reset(self):
+        self.step_count = 0
+        return self._obs()
+
+    def step(self, action):
+        self.step_count += 1
+        return self._obs(), float(action.sum()), self.step_count >= 10, {}
+
+
+def test_sac_save_and_load_replay_buffer(tmp_path, observation_space, action_space):
+    env = DictEnv(observation_space, action_space)
+    agent = SAC(
+        "MultiInputPolicy",
+        env,
+        buffer_size=200,
+        learning_starts=20,
+        batch_size=8,
+        replay_buffer_class=MemmapDictReplayBuffer,
+        replay_buffer_kwargs=dict(path=str(tmp_path / "buffer")),
+        device="cpu",
+    )
+    agent.learn(total_timesteps=40)
+    agent.save_replay_buffer(str(tmp_path / "replay_buffer"))
+
+    loaded = SAC("MultiInputPolicy", env, buffer_size=200, device="cpu")
+    loaded.load_replay_buffer(str(tmp_path / "replay_buffer.pkl"))
+    assert isinstance(loaded.replay_buffer, MemmapDictReplayBuffer)
+    assert loaded.replay_buffer.size() == 40
+    np.testing.assert_array_equal(loaded.replay_buffer.rewards[:40], agent.replay_buffer.rewards[:40])
+
+
+def test_shared_buffer_samples_all_shards(tmp_path, observation_space, action_space):
+    path = str(tmp_path / "shared")
+    first = SharedMemmapDictReplayBuffer(
+        100, observation_space, action_space, device="cpu", path=path, shard=0, refresh_interval=0
+    )
+    second = SharedMemmapDictReplayBuffer(
+        100, observation_space, action_space, device="cpu", path=path, shard=1, refresh_interval=0
+    )
+    fill(first, 10)
+    assert first.shared_size() == second.shared_size() == 10
+
+    fill(second, 30)
+    assert first.shared_size() == second.shared_size() == 40
+    assert first.size() == 10
+
+    samples = first.sample(400)
+    rewards = samples.rewards.numpy().ravel()
+    assert rewards.shape == (400,)
+    # Rewards 10-29 only exist in the second shard
+    assert np.any(rewards >= 10)
+
+
+def test_shared_buffer_continues_shard(tmp_path, observation_space, action_space):
+    path = str(tmp_path / "shared")
+    buffer = SharedMemmapDictReplayBuffer(100, observation_space, action_space, device="cpu", path=path, shard=3)
+    fill(buffer, 10)
+
+    restarted = SharedMemmapDictReplayBuffer(100, observation_space, action_space, device="cpu", path=path, shard=3)
+    fill(restarted, 5)
+    assert restarted.pos == 15
+    np.testing.assert_array_equal(restarted.rewards[:15, 0], np.r_[np.arange(10), np.arange(5)])
+
+
+def test_shared_buffer_maps_shards_with_their_own_size(tmp_path, observation_space, action_space):
+    path = str(tmp_path / "shared")
+    small = SharedMemmapDictReplayBuffer(
+        25, observation_space, action_space, device="cpu", path=path, shard=0, refresh_interval=0
+    )
+    large = SharedMemmapDictReplayBuffer(
+        100, observation_space, action_space, device="cpu", path=path, shard=1, refresh_interval=0
+    )
+    fill(small, 30)  # Wraps, the shard is full with 25 transitions
+    fill(large, 10)
+
+    assert small.full
+    assert large.shared_size() == small.shared_size() == 35
+    rewards = large.sample(500).rewards.numpy().ravel()
+    # Rewards 10-29 only exist in the small shard, which was mapped with its own size
+    assert set(rewards.astype(int)) == set(range(30))
+
+
+def test_shared_buffer_samples_shards_with_several_envs(tmp_path, observation_space, action_space):
+    path = str(tmp_path / "shared")
+    learner = SharedMemmapDictReplayBuffer(
+        50, observation_space, action_space, device="cpu", path=path, shard=0, refresh_interval=0
+    )
+    worker = SharedMemmapDictReplayBuffer(
+        40, observation_space, action_space, device="cpu", n_envs=2, path=path, shard=1, refresh_interval=0
+    )
+    obs = {"obs": np.zeros((10, 2, 3)), "fourier_time_": np.zeros((10, 2, 1))}
+    rewards = np.stack([np.arange(10.0), 100 + np.arange(10.0)], axis=1)
+    add_transitions(worker, obs, obs, np.zeros((10, 2, 2), dtype=np.float32), rewards, np.zeros((10, 2)))
+
+    assert learner.shared_size() == 20
+    sampled = learner.sample(400).rewards.numpy().ravel()
+    assert set(sampled.astype(int)) == set(rewards.ravel().astype(int))
+
+
+def test_shared_buffer_continues_shard_of_other_size(tmp_path, observation_space, action_space):
+    path = str(tmp_path / "shared")
+    buffer = SharedMemmapDictReplayBuffer(20, observation_space, action_space, device="cpu", path=path, shard=0)
+    fill(buffer, 10)
+
+    restarted = SharedMemmapDictReplayBuffer(100, observation_space, action_space, device="cpu", path=path, shard=0)
+    fill(restarted, 15)
+
+    assert restarted.buffer_size == 20
+    assert (restarted.pos, restarted.full) == (5, True)
+
+
+def test_shared_buffer_reads_shards_of_older_versions(tmp_path, observation_space, action_space):
+    path = str(tmp_path / "shared")
+    old = SharedMemmapDictReplayBuffer(50, observation_space, action_space, device="cpu", path=path, shard=0)
+    fill(old, 10)
+    old.flush()
+    np.array([10, 0], dtype=np.int64).tofile(os.path.join(old.path, "state.dat"))
+
+    reader = SharedMemmapDictReplayBuffer(
+        50, observation_space, action_space, device="cpu", path=path, shard=1, refresh_interval=0
+    )
+    assert reader.shared_size() == 10
+
+    continued = SharedMemmapDictReplayBuffer(50, observation_space, action_space, device="cpu", path=path, shard=0)
+    fill(continued, 1)
+    assert continued.pos == 11
+    assert list(np.fromfile(os.path.join(old.path, "state.dat"), dtype=np.int64)) == [11, 0, 50, 1]
+
+
+def test_shared_buffer_is_not_copied(tmp_path, observation_space, action_space):
+    buffer = SharedMemmapDictReplayBuffer(10, observation_space, action_space, device="cpu", path=str(tmp_path))
+    with pytest.raises(ValueError):
+        buffer.copy_to(str(tmp_path / "copy"))
+
+
+def test_checkpoint_writes_new_transitions(tmp_path, observation_space, action_space):
+    buffer = DictReplayBuffer(50, observation_space, action_space, device="cpu")
+    checkpoint = ReplayBufferCheckpoint(str(tmp_path), max_segments=100)
+
+    fill(buffer, 20)
+    checkpoint.save(buffer, 20)
+    fill(buffer, 10)
+    checkpoint.save(buffer, 30)
+
+    with open(os.path.join(str(tmp_path), ReplayBufferCheckpoint.MANIFEST)) as f:
+        manifest = json.load(f)
+    assert [segment["rows"] for segment in manifest["segments"]] == [20, 10]
+
+    restored = ReplayBufferCheckpoint(str(tmp_path)).load(DictReplayBuffer(50, observation_space, action_space))
+    assert restored.pos == 30
+    for key in observation_space.spaces:
+        np.testing.assert_array_equal(restored.observations[key][:30], buffer.observations[key][:30])
+    np.testing.assert_array_equal(restored.rewards, buffer.rewards)
+
+
+def test_checkpoint_compacts_when_wrapping(tmp_path, observation_space, action_space):
+    buffer = DictReplayBuffer(50, observation_space, action_space, device="cpu")
+    checkpoint = ReplayBufferCheckpoint(str(tmp_path), max_segments=100)
+
+    for i in range(1, 8):
+        fill(buffer, 10)
+        checkpoint.save(buffer, 10 * i)
+        restored = ReplayBufferCheckpoint(str(tmp_path)).load(DictReplayBuffer(50, observation_space, action_space))
+        assert (restored.pos, restored.full) == (buffer.pos, buffer.full)
+        np.testing.assert_array_equal(restored.rewards, buffer.rewards)
+        np.testing.assert_array_equal(restored.actions, buffer.actions)
+
+    with open(os.path.join(str(tmp_path), ReplayBufferCheckpoint.MANIFEST)) as f:
+        manifest = json.load(f)
+    assert sum(segment["rows"] for segment in manifest["segments"]) <= 50
+    assert len(os.listdir(str(tmp_path))) == len(manifest["segments"]) + 1
+
+
+def test_checkpoint_memmap_buffer(tmp_path, observation_space, action_space):
+    buffer = MemmapDictReplayBuffer(50, observation_space, action_space, device="cpu", path=str(tmp_path / "data"))
+    fill(buffer, 20)
+    ReplayBufferCheckpoint(str(tmp_path / "checkpoint")).save(buffer, 20)
+
+    restored = ReplayBufferCheckpoint(str(tmp_path / "checkpoint")).load()
+    assert isinstance(restored, MemmapDictReplayBuffer)
+    assert restored.pos == 20
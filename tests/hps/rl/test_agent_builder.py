@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pytest
+from gym import spaces
+from stable_baselines3 import SAC
+
+from hps.rl.builders.agent_builder import AgentBuilder
+from hps.rl.sac.replay_buffer import ReplayBufferCheckpoint
+from hps.rl.settings import AgentAlgorithm, SacSettings
+from tests.hps.rl.sac.test_replay_buffer import DictEnv
+
+
+def make_env():
+    observation_space = spaces.Dict({"obs": spaces.Box(-1, 1, shape=(3,), dtype=np.float64)})
+    return DictEnv(observation_space, spaces.Box(-1, 1, shape=(2,), dtype=np.float32))
+
+
+def test_build_from_checkpoint_uses_the_settings_learning_rate(tmp_path):
+    checkpoint = SAC("MultiInputPolicy", make_env(), learning_rate=1e-3, learning_starts=20, batch_size=8)
+    checkpoint.save(os.path.join(tmp_path, "input", "best_model"))
+    sac_settings = SacSettings()
+    sac_settings.actor.learning_rate = 2.5e-4
+    sac_settings.target_update_tau = 0.01
+    builder = AgentBuilder(AgentAlgorithm.SAC, sac_settings, make_env(), None, 20, buffer_size=100)
+
+    agent = builder.build(2, str(tmp_path / "output"), str(tmp_path / "input"))
+    agent.learn(total_timesteps=30)
+
+    assert agent.tau == 0.01
+    for optimizer in (agent.actor.optimizer, agent.critic.optimizer, agent.ent_coef_optimizer):
+        assert optimizer.param_groups[0]["lr"] == 2.5e-4
+
+
+def test_clone_keeps_the_buffer_of_a_live_parent(tmp_path):
+    parent_folder = str(tmp_path / "parent" / "checkpoints")
+    builder = AgentBuilder(
+        AgentAlgorithm.SAC, SacSettings(), make_env(), None, 20, buffer_size=100, use_memmap_replay_buffer=True
+    )
+    parent = SAC(
+        "MultiInputPolicy", make_env(), learning_starts=20, batch_size=8, **builder.replay_buffer_args(parent_folder)
+    )
+    parent.learn(total_timesteps=30)
+    parent.save(os.path.join(parent_folder, "best_model"))
+    checkpoint_path = os.path.join(parent_folder, "tb_logs", "eval", "evaluations", "replay_buffer")
+    ReplayBufferCheckpoint(checkpoint_path).save(parent.replay_buffer, parent.num_timesteps)
+    parent_rewards = np.array(parent.replay_buffer.rewards)
+
+    # Spawned while the parent keeps training, in a folder of its own
+    clone_folder = str(tmp_path / "clone" / "checkpoints")
+    clone = builder.build(2, clone_folder, parent_folder, keep_buffer=True)
+    assert clone.replay_buffer.path == os.path.join(clone_folder, "replay_buffer_data")
+    assert clone.replay_buffer.pos == parent.replay_buffer.pos
+    clone.learn(total_timesteps=30)
+
+    np.testing.assert_array_equal(parent.replay_buffer.rewards, parent_rewards)
+    parent.learn(total_timesteps=10, reset_num_timesteps=False)
+    assert parent.replay_buffer.pos == 40
+    np.testing.assert_array_equal(parent.replay_buffer.rewards[:30], parent_rewards[:30])
+
+
+def test_clone_with_the_output_folder_of_its_parent_is_refused(tmp_path):
+    folder = str(tmp_path / "checkpoints")
+    builder = AgentBuilder(
+        AgentAlgorithm.SAC, SacSettings(), make_env(), None, 20, buffer_size=100, use_memmap_replay_buffer=True
+    )
+    parent = SAC("MultiInputPolicy", make_env(), learning_starts=20, batch_size=8)
+    parent.save(os.path.join(folder, "best_model"))
+
+    with pytest.raises(ValueError):
+        builder.build(2, folder, folder, keep_buffer=True)
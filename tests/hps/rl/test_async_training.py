@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+from gym import spaces
+from stable_baselines3 import SAC
+from stable_baselines3.common.callbacks import BaseCallback
+
+from hps.rl.async_training import POLICY_SNAPSHOT, AsyncTrainer
+from hps.rl.sac.replay_buffer import SharedMemmapDictReplayBuffer
+from tests.hps.rl.sac.test_replay_buffer import DictEnv
+
+
+def make_env():
+    observation_space = spaces.Dict(
+        {
+            "obs": spaces.Box(-1, 1, shape=(3,), dtype=np.float64),
+            "fourier_time_": spaces.Box(np.array([0]), np.array([np.inf]), dtype=np.float64),
+        }
+    )
+    return DictEnv(observation_space, spaces.Box(-1, 1, shape=(2,), dtype=np.float32))
+
+
+def make_agent(folder, shard, learning_starts, buffer_size=500):
+    return SAC(
+        "MultiInputPolicy",
+        make_env(),
+        learning_starts=learning_starts,
+        batch_size=8,
+        buffer_size=buffer_size,
+        replay_buffer_class=SharedMemmapDictReplayBuffer,
+        replay_buffer_kwargs=dict(path=folder, shard=shard, refresh_interval=0.0),
+        device="cpu",
+    )
+
+
+def build_worker(learning_starts, folder, worker, n_workers):
+    # Like build_worker_agent, each worker stores its share of the buffer
+    return make_agent(folder, worker, learning_starts // n_workers, buffer_size=500 // n_workers)
+
+
+class CountSteps(BaseCallback):
+    def _on_step(self) -> bool:
+        return True
+
+
+def test_learner_trains_on_worker_transitions(tmp_path):
+    folder = str(tmp_path / "workers")
+    trainer = AsyncTrainer(folder, n_workers=2, sync_period=20, worker_args=(40,), build_worker=build_worker)
+    learner = make_agent(folder, shard=2, learning_starts=40)
+    callback = CountSteps()
+
+    trainer.learn(learner, total_timesteps=200, callback=callback)
+
+    assert learner.num_timesteps == 200
+    assert callback.n_calls == 200
+    assert 0 < learner._n_updates <= 200 - 40
+    assert learner.replay_buffer.shared_size() >= 200
+    assert learner.replay_buffer.sample(64).rewards.shape == (64, 1)
+    assert sorted(name for name in os.listdir(folder) if name.startswith("shard_")) == ["shard_0", "shard_1"]
+    assert os.path.isfile(os.path.join(folder, POLICY_SNAPSHOT))
+
@@ -34,4 +34,34 @@ def test_unit_conversions():
     episode_scaling = episode_hours/base_episode_hours
     
     assert (min_gen * episode_scaling) * (factor_to_m3s / episode_scaling) == q_min
-    assert (max_gen * episode_scaling) * (factor_to_m3s / episode_scaling) == q_max
\ No newline at end of file
+    assert (max_gen * episode_scaling) * (factor_to_m3s / episode_scaling) == q_max
+
+def test_build_medium_system():
+    from hydro_system_models import hydro_system_medium
+    from hps.rl.builders.hydro_rl_builder import HydroRLBuilder
+    from hps.rl.environment.hscomponents import Res
+
+    system = HydroRLBuilder.Build(hydro_system_medium())
+
+    names = [a.name for a in system.sorted_actions]
+    assert names == ["inflow_res1", "inflow_res2", "inflow_res3", "switch", "res1_ps1_res2"]
+
+    switch = system.sorted_actions[3]
+    assert [a.name for a in switch.input_actions] == ["res2_ps2_ocean1", "res3_ps2_ocean1"]
+
+    station_action = system.sorted_actions[4]
+    assert isinstance(station_action.upper_res, Res)
+    assert isinstance(station_action.lower_res, Res)
+
+
+def test_build_cascade_system():
+    from hydro_system_models import hydro_system_cascade
+    from hps.rl.builders.hydro_rl_builder import HydroRLBuilder
+
+    n_reservoirs = 50
+    system = HydroRLBuilder.Build(hydro_system_cascade(n_reservoirs))
+
+    assert system.get_num_actions() == n_reservoirs
+    assert len(system.reservoirs) == n_reservoirs + 1
+    assert system.sorted_actions[-1].name == "res{0}_station{0}_ocean".format(n_reservoirs)
+    assert system.sorted_actions[-1].lower_res.is_ocean
@@ -59,4 +59,22 @@ def test_num_sectors():
     np.testing.assert_almost_equal(actual, exp)
 
 
-#%%
\ No newline at end of file
+#%%
+
+def test_normalize_to_year():
+    time_index = pd.DatetimeIndex(["2020-01-01", "2020-07-02", "2021-12-31 12:00"], tz="Europe/Oslo")
+
+    actual = ObservationsGenerator.normalize_to_year(time_index)
+
+    np.testing.assert_almost_equal(actual, [0, (183 * 24 - 1) / (366 * 24), 1 - 12 / (365 * 24)])
+
+
+def test_time_features_shared_between_generators(obs_generator):
+    time_indexer = TimeIndexer(obs_generator.time_indexer.index)
+
+    eval_generator = ObservationsGenerator(
+        observation_settings=ObservationSettings(), time_indexer=time_indexer, is_eval=True
+    )
+
+    assert eval_generator.time_features is obs_generator.time_features
+    assert not eval_generator.seasonal_cosine.flags.writeable
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from hps.rl.population_pruning import AshaPruner, perturb_sac_settings
+from hps.rl.settings import RunSettings, RunSettingsSerializer, SacSettings
+
+
+def curve(last_step, value):
+    steps = np.arange(0, last_step + 1, 100)
+    return steps, np.full(len(steps), float(value))
+
+
+def test_prune_bottom_half_at_rung():
+    pruner = AshaPruner([500], fraction=0.5)
+    curves = {agent: curve(600, agent) for agent in range(4)}
+
+    pruned = pruner.update(curves, live_agents=range(4))
+
+    assert sorted(pruned) == [0, 1]
+    assert pruner.update(curves, live_agents=[2, 3]) == []
+
+
+def test_agents_are_compared_with_earlier_agents():
+    pruner = AshaPruner([500], fraction=0.5)
+    pruner.update({1: curve(500, 10.0), 2: curve(500, 20.0)}, live_agents=[1, 2])
+
+    assert pruner.update({3: curve(500, 5.0)}, live_agents=[3]) == [3]
+    assert pruner.update({4: curve(500, 30.0)}, live_agents=[4]) == []
+
+
+def test_agent_below_rung_is_not_recorded():
+    pruner = AshaPruner([500, 1000], fraction=0.5)
+
+    assert pruner.update({1: curve(400, 1.0), 2: curve(400, 2.0)}, live_agents=[1, 2]) == []
+    assert pruner.records[500] == {}
+
+
+def test_clone_is_not_compared_before_its_first_step():
+    pruner = AshaPruner([500], fraction=0.5)
+    pruner.update({1: curve(600, 10.0), 2: curve(600, 20.0)}, live_agents=[1, 2])
+    clone = (np.array([700, 800]), np.array([-1.0, -1.0]))
+
+    assert pruner.update({3: clone}, live_agents=[3]) == []
+    assert pruner.records[500][3] is None
+
+
+def test_best_return_up_to_rung_is_used():
+    pruner = AshaPruner([300], fraction=0.5)
+    late_bloomer = (np.array([100, 200, 300, 400]), np.array([0.0, 5.0, 1.0, 100.0]))
+    pruner.update({1: late_bloomer, 2: curve(400, 4.0)}, live_agents=[1, 2])
+
+    assert pruner.records[300][1] == 5.0
+
+
+def test_invalid_fraction():
+    with pytest.raises(ValueError):
+        AshaPruner([100], fraction=1.0)
+
+
+def test_perturb_sac_settings():
+    sac_settings = SacSettings()
+    rng = np.random.default_rng(0)
+
+    perturbed = perturb_sac_settings(sac_settings, 0.2, rng)
+
+    assert perturbed is not sac_settings
+    assert sac_settings.actor.learning_rate == SacSettings().actor.learning_rate
+    ratio = perturbed.actor.learning_rate / sac_settings.actor.learning_rate
+    assert 1 / 1.2 <= ratio <= 1.2 and ratio != 1.0
+    assert perturbed.actor.structure == sac_settings.actor.structure
+    assert perturbed.critic.learning_rate == sac_settings.critic.learning_rate
+
+
+def test_agent_sac_settings_roundtrip():
+    settings = RunSettings()
+    settings.agent_settings[0].sac_settings = perturb_sac_settings(settings.sac_settings, 0.2, np.random.default_rng(1))
+
+    actual = RunSettingsSerializer.deserialze(RunSettingsSerializer.serialize(settings))
+
+    assert isinstance(actual.agent_settings[0].sac_settings, SacSettings)
+    assert actual.agent_settings[0].sac_settings.critic.learning_rate == (
+        settings.agent_settings[0].sac_settings.critic.learning_rate
+    )
+    assert actual.agent_settings[1].sac_settings is None
@@ -0,0 +1,62 @@
+import numpy as np
+from gym import spaces
+from stable_baselines3 import SAC
+from stable_baselines3.common.callbacks import BaseCallback
+
+from hps.rl.population_training import learn_population, make_vec_env
+from tests.hps.rl.sac.test_replay_buffer import DictEnv
+
+
+def make_env():
+    observation_space = spaces.Dict({"obs": spaces.Box(-1, 1, shape=(3,), dtype=np.float64)})
+    return DictEnv(observation_space, spaces.Box(-1, 1, shape=(2,), dtype=np.float32))
+
+
+def make_agent(n_envs):
+    return SAC(
+        "MultiInputPolicy",
+        make_vec_env(make_env(), n_envs),
+        learning_starts=20,
+        batch_size=8,
+        buffer_size=200,
+        gradient_steps=n_envs,
+        device="cpu",
+    )
+
+
+class StopAfter(BaseCallback):
+    def __init__(self, n_calls):
+        super().__init__()
+        self.stop_after = n_calls
+
+    def _on_step(self) -> bool:
+        return self.n_calls < self.stop_after
+
+
+def test_make_vec_env_copies_the_environment():
+    env = make_env()
+    vec_env = make_vec_env(env, 3)
+
+    assert vec_env.num_envs == 3
+    assert vec_env.envs[0] is env
+    assert len({id(e) for e in vec_env.envs}) == 3
+
+
+def test_agents_train_together():
+    agents = [make_agent(n_envs=2), make_agent(n_envs=1)]
+    callbacks = [StopAfter(1000), StopAfter(1000)]
+
+    learn_population(agents, [60, 40], callbacks, [True, True])
+
+    assert [agent.num_timesteps for agent in agents] == [60, 40]
+    assert [callback.n_calls for callback in callbacks] == [30, 40]
+    assert agents[0].replay_buffer.size() * 2 == 60
+    assert all(agent._n_updates > 0 for agent in agents)
+
+
+def test_stopped_agent_does_not_stop_the_others():
+    agents = [make_agent(n_envs=1), make_agent(n_envs=1)]
+
+    learn_population(agents, [50, 50], [StopAfter(10), StopAfter(1000)], [True, True])
+
+    assert [agent.num_timesteps for agent in agents] == [10, 50]
@@ -0,0 +1,97 @@
+import numpy as np
+from gym import spaces
+from stable_baselines3 import SAC
+from stable_baselines3.common.callbacks import BaseCallback
+
+from hps.rl.population_training import make_vec_env
+from hps.rl.prefill import PrefillCallback, prefill_replay_buffer
+from tests.hps.rl.sac.test_replay_buffer import DictEnv
+
+
+class CountResets(DictEnv):
+    def __init__(self, observation_space, action_space):
+        super().__init__(observation_space, action_space)
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+        return super().reset()
+
+
+def make_agent(n_envs=1, learning_starts=40):
+    observation_space = spaces.Dict({"obs": spaces.Box(-1, 1, shape=(3,), dtype=np.float64)})
+    env = CountResets(observation_space, spaces.Box(0, 1, shape=(2,), dtype=np.float32))
+    return SAC(
+        "MultiInputPolicy",
+        make_vec_env(env, n_envs),
+        learning_starts=learning_starts,
+        batch_size=8,
+        buffer_size=200,
+        device="cpu",
+    )
+
+
+class CountSteps(BaseCallback):
+    def _on_step(self) -> bool:
+        return True
+
+
+def test_prefill_writes_episodes_to_the_buffer():
+    agent = make_agent(n_envs=2)
+    agent._setup_learn(100)
+
+    assert prefill_replay_buffer(agent, 40) == 40
+
+    buffer = agent.replay_buffer
+    assert buffer.size() * 2 == agent.num_timesteps == 40
+    assert agent._episode_num == 4
+    # DictEnv rewards the sum of the action, the buffer holds the actions scaled to [-1, 1]
+    np.testing.assert_allclose(buffer.rewards[:20], (buffer.actions[:20].sum(axis=-1) + 2) / 2, rtol=1e-5)
+    np.testing.assert_array_equal(buffer.dones[:20, 0], np.arange(1, 21) % 10 == 0)
+    np.testing.assert_allclose(buffer.next_observations["obs"][:9, 0, 0], 0.1 * np.arange(1, 10))
+
+
+def test_prefill_uses_the_exploration_policy():
+    agent = make_agent()
+    agent._setup_learn(100)
+
+    prefill_replay_buffer(agent, 10, policy=lambda envs: np.ones((len(envs), 2)))
+
+    np.testing.assert_array_equal(agent.replay_buffer.actions[:10], 1.0)
+
+
+def test_training_starts_after_the_prefill():
+    agent = make_agent()
+    callback = CountSteps()
+
+    agent.learn(total_timesteps=60, callback=[PrefillCallback(), callback])
+
+    assert agent.num_timesteps == 60
+    assert callback.n_calls == 20
+    assert agent.replay_buffer.size() == 60
+    assert agent._n_updates == 20
+
+
+def test_prefill_continues_from_the_last_observations():
+    agent = make_agent(n_envs=2)
+    agent._setup_learn(100)
+    env = agent.env.envs[0]
+    env.step_count = 3
+    agent._last_obs["obs"][0] = 0.3
+
+    prefill_replay_buffer(agent, 20)
+
+    # Reset when learning was set up and at the end of the episode, not again by the prefill
+    assert env.resets == 2
+    np.testing.assert_allclose(agent.replay_buffer.observations["obs"][:2, 0, 0], [0.3, 0.4])
+    assert env.step_count == 3
+    np.testing.assert_allclose(agent._last_obs["obs"][:, 0], [0.3, 0.0])
+
+
+def test_training_continues_the_episodes_of_the_prefill():
+    agent = make_agent(learning_starts=45)
+
+    agent.learn(total_timesteps=60, callback=PrefillCallback())
+
+    assert agent.env.envs[0].resets == 1 + 6
+    assert agent._episode_num == 6
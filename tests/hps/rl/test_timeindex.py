@@ -141,3 +141,16 @@ def test_multiple_combined_indexer():
 
 # %%
 
+
+
+def test_nonpositive_step_size():
+    with pytest.raises(ValueError):
+        TimeIndexer(['2020-01-02 00:00:00+00:00', '2020-01-01 00:00:00+00:00'])
+
+
+def test_index_hash(time_indexer):
+    same = TimeIndexer(time_indexer.index)
+    other = FromPeriodTimeIndexer(time_indexer.from_datetime, periods=9, freq="1D")
+
+    assert same.index_hash == time_indexer.index_hash
+    assert other.index_hash != time_indexer.index_hash
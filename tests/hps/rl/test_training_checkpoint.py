@@ -0,0 +1,134 @@
+import os
+
+import numpy as np
+import pytest
+import torch as th
+from gym import spaces
+from stable_baselines3 import SAC
+from stable_baselines3.common.callbacks import ConvertCallback
+
+from hps.rl.sac.replay_buffer import MemmapDictReplayBuffer, ReplayBufferCheckpoint
+from hps.rl.training_checkpoint import TrainingCheckpoint, TrainingCheckpointCallback
+from tests.hps.rl.sac.test_replay_buffer import DictEnv
+
+
+@pytest.fixture
+def env():
+    observation_space = spaces.Dict(
+        {
+            "obs": spaces.Box(-1, 1, shape=(3,), dtype=np.float64),
+            "fourier_time_": spaces.Box(np.array([0]), np.array([np.inf]), dtype=np.float64),
+        }
+    )
+    return DictEnv(observation_space, spaces.Box(-1, 1, shape=(2,), dtype=np.float32))
+
+
+def replay_buffer_args(tmp_path):
+    return dict(
+        buffer_size=200,
+        replay_buffer_class=MemmapDictReplayBuffer,
+        replay_buffer_kwargs=dict(path=str(tmp_path / "buffer")),
+    )
+
+
+def train(env, tmp_path, steps):
+    agent = SAC("MultiInputPolicy", env, learning_starts=20, batch_size=8, device="cpu", **replay_buffer_args(tmp_path))
+    agent.learn(total_timesteps=steps)
+    return agent
+
+
+class EvalCallbackState:
+    def __init__(self, replay_buffer_checkpoint):
+        self.n_calls = 0
+        self.best_mean_reward = -np.inf
+        self.last_mean_reward = -np.inf
+        self.evaluations_results = []
+        self.evaluations_timesteps = []
+        self.evaluations_length = []
+        self.evaluations_successes = []
+        self.replay_buffer_checkpoint = replay_buffer_checkpoint
+
+
+def test_save_and_load(tmp_path, env):
+    agent = train(env, tmp_path, 40)
+    checkpoint = TrainingCheckpoint(str(tmp_path / "checkpoint"))
+    checkpoint.save(agent, {"n_calls": 40}, ReplayBufferCheckpoint(str(tmp_path / "replay_buffer")))
+    expected_random = np.random.rand()
+
+    loaded = checkpoint.load(SAC, env, device="cpu", **replay_buffer_args(tmp_path))
+
+    assert np.random.rand() == expected_random
+    assert loaded.num_timesteps == 40
+    assert loaded.replay_buffer.size() == 40
+    assert checkpoint.load_state()["callback"] == {"n_calls": 40}
+    expected = agent.actor.optimizer.state_dict()["state"][0]["exp_avg"]
+    th.testing.assert_close(loaded.actor.optimizer.state_dict()["state"][0]["exp_avg"], expected)
+
+
+def test_only_the_latest_model_is_kept(tmp_path, env):
+    agent = train(env, tmp_path, 30)
+    checkpoint = TrainingCheckpoint(str(tmp_path / "checkpoint"))
+    checkpoint.save(agent, {})
+    agent.learn(total_timesteps=10, reset_num_timesteps=False)
+    checkpoint.save(agent, {})
+
+    assert sorted(os.listdir(checkpoint.path)) == ["model_40.zip", "state.pkl"]
+    assert checkpoint.load_state()["model"] == "model_40.zip"
+
+
+def test_interrupted_save_keeps_previous_checkpoint(tmp_path, env):
+    agent = train(env, tmp_path, 30)
+    checkpoint = TrainingCheckpoint(str(tmp_path / "checkpoint"))
+    checkpoint.save(agent, {})
+    # A crash after writing the next model, before the state is replaced
+    agent.save(os.path.join(checkpoint.path, "model_40.zip"))
+
+    assert checkpoint.load(SAC, env, device="cpu").num_timesteps == 30
+
+
+def test_resumed_training_continues_the_step_count(tmp_path, env):
+    agent = train(env, tmp_path, 30)
+    checkpoint = TrainingCheckpoint(str(tmp_path / "checkpoint"))
+    checkpoint.save(agent, {})
+
+    loaded = checkpoint.load(SAC, env, device="cpu", **replay_buffer_args(tmp_path))
+    loaded.learn(total_timesteps=20, reset_num_timesteps=False)
+
+    assert loaded.num_timesteps == 50
+
+
+def test_callback_saves_and_restores_counters(tmp_path, env):
+    eval_callback = EvalCallbackState(None)
+    checkpoint = TrainingCheckpoint(str(tmp_path / "checkpoint"))
+    callback = TrainingCheckpointCallback(checkpoint, eval_callback, save_freq=10)
+    agent = SAC("MultiInputPolicy", env, learning_starts=20, batch_size=8, device="cpu", buffer_size=200)
+
+    def count(locals_, globals_):
+        eval_callback.n_calls += 1
+        eval_callback.best_mean_reward = float(eval_callback.n_calls)
+        return True
+
+    agent.learn(total_timesteps=25, callback=[ConvertCallback(count), callback])
+
+    state = checkpoint.load_state()
+    assert state["num_timesteps"] == 20
+    assert state["callback"]["n_calls"] == 20
+    restored = EvalCallbackState(None)
+    TrainingCheckpointCallback(checkpoint, restored, save_freq=10).restore(state)
+    assert restored.best_mean_reward == 20.0
+
+
+def test_replay_buffer_saved_once_per_evaluation(tmp_path, env, monkeypatch):
+    agent = train(env, tmp_path, 30)
+    replay_buffer_checkpoint = ReplayBufferCheckpoint(str(tmp_path / "replay_buffer"))
+    # Saved by the evaluation callback, then by the training checkpoint at the same step
+    replay_buffer_checkpoint.save(agent.replay_buffer, agent.num_timesteps)
+    saves = []
+    monkeypatch.setattr(ReplayBufferCheckpoint, "_write_manifest", lambda self, manifest: saves.append(manifest))
+
+    TrainingCheckpoint(str(tmp_path / "checkpoint")).save(agent, {}, replay_buffer_checkpoint)
+
+    assert saves == []
+    assert TrainingCheckpoint(str(tmp_path / "checkpoint")).load_state()["replay_buffer"] == str(
+        tmp_path / "replay_buffer"
+    )
@@ -0,0 +1,20 @@
+import json
+import tempfile
+from pathlib import Path
+
+import server.settings_file
+
+# server.appsettings reads the settings file when it is imported, use a workspace of its own for the tests
+_workspace = Path(tempfile.mkdtemp(prefix="hps_server_tests_"))
+server.settings_file.SETTINGS_FILE = _workspace / "appsettings.json"
+server.settings_file.SETTINGS_FILE.write_text(
+    json.dumps(
+        {
+            "ConnectionStrings": {
+                "PConnection": "sqlite:///{}".format((_workspace / "HPSDB.db").as_posix()),
+                "PLogConnection": "sqlite:///{}".format((_workspace / "log.db").as_posix()),
+            },
+            "WorkspaceDir": _workspace.as_posix() + "/",
+        }
+    )
+)
@@ -0,0 +1,117 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from server.agent_scheduler import AgentScheduler, _is_alive
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    return AgentScheduler(str(tmp_path), cores=[0, 1, 2, 3])
+
+
+def exited_process(reap: bool) -> int:
+    """
+    Pid of a process that ended. Without reap, the process stays a zombie of this process.
+    """
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    if reap:
+        process.wait()
+        return process.pid
+    while _is_alive(process.pid):
+        time.sleep(0.01)
+    return process.pid
+
+
+def test_agents_start_by_priority_then_in_submission_order(scheduler):
+    low = scheduler.submit(1, "low", 3, priority=0)
+    first = scheduler.submit(2, "first", 1, priority=1)
+    second = scheduler.submit(2, "second", 1, priority=1)
+
+    assert scheduler.try_start(low) is None
+    assert scheduler.try_start(second) == [1]
+    assert scheduler.try_start(first) == [0]
+    assert scheduler.try_start(low) is None
+
+    scheduler.release(first)
+    assert scheduler.try_start(low) == [0, 2, 3]
+
+
+def test_waiting_agent_blocks_the_agents_behind_it(scheduler):
+    running = scheduler.submit(1, "running", 2)
+    scheduler.try_start(running)
+    large = scheduler.submit(1, "large", 4)
+    small = scheduler.submit(1, "small", 1)
+
+    assert scheduler.try_start(small) is None
+    assert scheduler.try_start(large) is None
+
+    scheduler.release(running)
+    assert scheduler.try_start(large) == [0, 1, 2, 3]
+    assert scheduler.try_start(small) is None
+
+
+def test_threads_are_limited_to_the_cores(scheduler):
+    ticket = scheduler.submit(1, "agent", 16)
+
+    assert scheduler.try_start(ticket) == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("reap", [True, False], ids=["dead", "zombie"])
+def test_cores_of_ended_processes_are_freed(scheduler, reap):
+    ticket = scheduler.submit(1, "ended", 4)
+    scheduler.try_start(ticket)
+    scheduler.set_pid(ticket, exited_process(reap))
+    waiting = scheduler.submit(1, "waiting", 4)
+
+    assert scheduler.try_start(waiting) == [0, 1, 2, 3]
+    assert list(scheduler.status()["leases"]) == [waiting]
+
+
+def test_queued_agents_of_ended_processes_are_removed(scheduler):
+    ticket = scheduler.submit(1, "orphan", 4)
+    path = os.path.join(scheduler.queue_folder, ticket)
+    entry = AgentScheduler._read(path)
+    entry["pid"] = exited_process(reap=True)  # The run process that submitted the agent ended
+    AgentScheduler._write(path, entry)
+
+    assert scheduler.status()["queue"] == {}
+
+
+def test_release_queued_agent(scheduler):
+    started = scheduler.submit(1, "started", 4)
+    scheduler.try_start(started)
+    queued = scheduler.submit(1, "queued", 1)
+
+    scheduler.release(queued)
+
+    assert scheduler.status()["queue"] == {}
+    assert list(scheduler.status()["leases"]) == [started]
+    with pytest.raises(ValueError):
+        scheduler.try_start(queued)
+
+
+def test_release_started_agent_frees_its_cores(scheduler):
+    started = scheduler.submit(1, "started", 4)
+    scheduler.try_start(started)
+    waiting = scheduler.submit(1, "waiting", 1)
+    assert scheduler.try_start(waiting) is None
+
+    scheduler.release(started)
+    scheduler.release(started)  # Releasing again does nothing
+
+    assert scheduler.try_start(waiting) == [0]
+
+
+def test_schedulers_share_the_state(tmp_path):
+    first = AgentScheduler(str(tmp_path), cores=[0, 1])
+    second = AgentScheduler(str(tmp_path), cores=[0, 1])
+    ticket = first.submit(1, "agent", 2)
+    first.try_start(ticket)
+
+    other = second.submit(2, "other", 1)
+
+    assert second.try_start(other) is None
@@ -0,0 +1,142 @@
+import os
+import sqlite3
+
+import pytest
+import sqlalchemy
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from server import db_connection
+from server.appsettings import appSettings
+from server.model import HydroSystem
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    path = tmp_path / "test.db"
+    monkeypatch.setitem(appSettings.settings["ConnectionStrings"], "PConnection", "sqlite:///" + path.as_posix())
+    monkeypatch.setattr(db_connection, "_engine", None)
+    monkeypatch.setattr(db_connection, "_engine_pid", None)
+    monkeypatch.setattr(db_connection, "_session_factory", None)
+    HydroSystem.__table__.create(db_connection.get_engine())
+    yield path
+    db_connection.get_engine().dispose()
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    delays = []
+    monkeypatch.setattr(db_connection.time, "sleep", delays.append)
+    return delays
+
+
+def locked_error():
+    return OperationalError("INSERT", {}, sqlite3.OperationalError("database is locked"))
+
+
+def hydro_system_names(path):
+    with sqlite3.connect(path) as connection:
+        return [name for (name,) in connection.execute("SELECT Name FROM HydroSystems")]
+
+
+def test_engine_is_shared_by_the_process(database, monkeypatch):
+    engine = db_connection.get_engine()
+
+    assert db_connection.get_engine() is engine
+    pid = os.getpid()
+    monkeypatch.setattr(db_connection.os, "getpid", lambda: pid + 1)
+    assert db_connection.get_engine() is not engine
+    engine.dispose()
+
+
+def test_sqlite_pragmas(database):
+    with db_connection.get_engine().connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert connection.exec_driver_sql("PRAGMA cache_size").scalar() == db_connection.SQLITE_PRAGMAS["cache_size"]
+
+
+def test_session_scope_commits(database):
+    with db_connection.session_scope() as session:
+        session.add(HydroSystem(Name="small"))
+
+    assert hydro_system_names(database) == ["small"]
+
+
+def test_session_scope_rolls_back_on_error(database):
+    with pytest.raises(RuntimeError):
+        with db_connection.session_scope() as session:
+            session.add(HydroSystem(Name="small"))
+            session.flush()
+            raise RuntimeError()
+
+    assert hydro_system_names(database) == []
+
+
+def test_is_busy(database):
+    engine = sqlalchemy.create_engine("sqlite:///" + database.as_posix(), connect_args={"timeout": 0})
+    with sqlite3.connect(database) as lock:
+        lock.execute("BEGIN IMMEDIATE")
+        with pytest.raises(OperationalError) as error:
+            with engine.begin() as connection:
+                connection.exec_driver_sql("INSERT INTO HydroSystems (Name) VALUES ('small')")
+        lock.rollback()
+    engine.dispose()
+
+    assert db_connection.is_busy(error.value)
+    assert not db_connection.is_busy(OperationalError("SELECT", {}, sqlite3.OperationalError("no such table")))
+    assert not db_connection.is_busy(ValueError("database is locked"))
+
+
+def test_retry_on_busy_backs_off(delays):
+    errors = [locked_error() for _ in range(3)]
+
+    def function():
+        if errors:
+            raise errors.pop()
+        return "done"
+
+    assert db_connection.retry_on_busy(function, base_delay=0.1, max_delay=0.3) == "done"
+    assert len(delays) == 3
+    for delay, expected in zip(delays, [0.1, 0.2, 0.3]):
+        assert 0.5 * expected <= delay <= 1.5 * expected
+
+
+def test_retry_on_busy_gives_up(delays):
+    def function():
+        raise locked_error()
+
+    with pytest.raises(OperationalError):
+        db_connection.retry_on_busy(function, retries=2)
+    assert len(delays) == 2
+
+
+def test_retry_on_busy_raises_other_errors(delays):
+    def function():
+        raise OperationalError("SELECT", {}, sqlite3.OperationalError("no such table"))
+
+    with pytest.raises(OperationalError):
+        db_connection.retry_on_busy(function)
+    assert delays == []
+
+
+def test_retry_commit_applies_the_changes_again(database, monkeypatch):
+    engine = sqlalchemy.create_engine("sqlite:///" + database.as_posix(), connect_args={"timeout": 0})
+    session = sessionmaker(bind=engine)()
+    lock = sqlite3.connect(database)
+    lock.execute("BEGIN IMMEDIATE")
+    monkeypatch.setattr(db_connection.time, "sleep", lambda delay: lock.rollback())
+    rollbacks = []
+
+    system_id = db_connection.retry_commit(
+        session,
+        lambda: session.merge(HydroSystem(HydroSystemId=7, Name="small")),
+        on_rollback=lambda: rollbacks.append(1),
+    ).HydroSystemId
+
+    assert system_id == 7
+    assert rollbacks == [1]
+    assert hydro_system_names(database) == ["small"]
+    session.close()
+    lock.close()
+    engine.dispose()
@@ -0,0 +1,85 @@
+import sqlite3
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.timeindex import TimeIndexer
+from hps.rl.environment.eval_recorder import EvalRecorder
+from server import db_connection
+from server.db_logger import DbLogger
+from server.model import EvaluationEpisode, ReportDatum, ReportValue, StepDatum, metadata
+from server.packed_series import read_report_values, read_step_values
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine, tables=[EvaluationEpisode.__table__, ReportDatum.__table__, ReportValue.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def make_eval_env(n_steps):
+    time_indexer = TimeIndexer(pd.date_range("2023-01-01", periods=n_steps + 1, freq="H"))
+    report_df = EvalRecorder(["Sum_money", "Energy_Price"], n_steps)
+    report_df.values[:] = np.arange(2 * n_steps).reshape(2, n_steps).T
+    return SimpleNamespace(report_df=report_df, time_indexer=time_indexer)
+
+
+def read_series(session):
+    return {r.Description: r.ReportSeriesId for r in session.query(ReportDatum).all()}
+
+
+def test_log_eval_episode_packed(session):
+    eval_env = make_eval_env(24)
+    logger = DbLogger(session, agent_id=1, project_run_id=1, log_type="train", plot_type="eval", packed=True)
+
+    logger.log_eval_episode(10, "episode", eval_env)
+
+    series = read_series(session)
+    assert set(series) == {"Sum_money", "Energy_Price"}
+    time_index, values = read_report_values(session, series["Energy_Price"], 10)
+    np.testing.assert_array_equal(time_index, eval_env.time_indexer.index[:24])
+    np.testing.assert_array_equal(values, eval_env.report_df["Energy_Price"])
+
+
+def test_log_eval_episode(session):
+    eval_env = make_eval_env(24)
+    logger = DbLogger(session, agent_id=1, project_run_id=1, log_type="train", plot_type="eval")
+
+    logger.log_eval_episode(10, "episode", eval_env)
+
+    series_id = read_series(session)["Sum_money"]
+    rows = session.query(ReportValue).filter_by(ReportSeriesId=series_id).order_by(ReportValue.Index).all()
+    assert [r.Value for r in rows] == list(range(24))
+    assert [r.TimeStamp for r in rows] == [str(t) for t in eval_env.time_indexer.index[:24]]
+
+
+def log_return(logger, step, value):
+    logger.log_step_series(step, None, None, value, {"eval": value}, None, None, None, None, None, None, None)
+
+
+def test_packed_step_values_are_written_again_when_the_database_is_locked(tmp_path, monkeypatch):
+    path = tmp_path / "test.db"
+    engine = create_engine("sqlite:///" + path.as_posix(), connect_args={"timeout": 0})
+    metadata.create_all(engine, tables=[StepDatum.__table__])
+    session = sessionmaker(bind=engine)()
+    logger = DbLogger(session, agent_id=1, project_run_id=1, log_type="train", plot_type="eval", packed=True)
+    log_return(logger, 0, 1.0)
+
+    lock = sqlite3.connect(path)
+    lock.execute("BEGIN IMMEDIATE")
+    monkeypatch.setattr(db_connection.time, "sleep", lambda delay: lock.rollback())
+    log_return(logger, 1, 2.0)
+
+    steps, _, values = read_step_values(session, logger.step_series["Test Return"].StepSeriesId)
+    np.testing.assert_array_equal(steps, [0, 1])
+    np.testing.assert_array_equal(values, [1.0, 2.0])
+    session.close()
+    lock.close()
+    engine.dispose()
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from server.history_compaction import HistoryCompaction, steps_to_compact
+from server.model import Agent, CompactedReportStep, EvaluationEpisode, ReportDatum, ReportValue, metadata
+from server.packed_series import add_report_values, create_packed_tables, read_report_values
+
+
+def test_steps_to_compact():
+    lengths = {(1, 10): 96, (1, 20): 96, (1, 30): 96, (2, 10): 50}
+
+    assert steps_to_compact(lengths, {}, keep={30}) == [(1, 10), (1, 20)]
+
+
+def test_steps_to_compact_skips_compacted_steps():
+    lengths = {(1, 10): 4, (1, 20): 96, (1, 30): 96}
+
+    assert steps_to_compact(lengths, {(1, 10): 96}, keep={30}) == [(1, 20)]
+
+
+def test_steps_to_compact_without_full_resolution_reference():
+    lengths = {(1, 10): 4, (1, 20): 4, (2, 10): 96, (2, 20): 24}
+
+    # Series 1 has no kept step and series 2 only the length before compaction of a compacted step
+    assert steps_to_compact(lengths, {(2, 20): 96}, keep={30}) == [(2, 10)]
+
+
+def test_steps_to_compact_skips_shorter_and_single_values():
+    lengths = {(1, 10): 48, (1, 30): 96, (2, 10): 1, (2, 30): 1}
+
+    assert steps_to_compact(lengths, {}, keep={30}) == []
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    tables = [Agent, EvaluationEpisode, ReportDatum, ReportValue]
+    metadata.create_all(engine, tables=[table.__table__ for table in tables])
+    session = sessionmaker(bind=engine)()
+    create_packed_tables(session)
+    yield session
+    session.close()
+
+
+def add_series(session, agent_id, best_step, description):
+    session.merge(Agent(AgentId=agent_id, ProjectId=1, ProjectRunId=1, Seed=0, StartTime="", BestStep=best_step))
+    episode = EvaluationEpisode(ProjectRunId=1, AgentId=agent_id, Description=description)
+    session.add(episode)
+    session.flush()
+    series = ReportDatum(EvaluationEpisodeId=episode.EvaluationEpisodeId, StartTime="", Description=description)
+    session.add(series)
+    session.commit()
+    return series.ReportSeriesId
+
+
+def test_compaction_is_idempotent(session):
+    time_index = pd.date_range("2023-01-01", periods=96, freq="H")
+    packed_id = add_series(session, 1, 0, "packed")
+    rows_id = add_series(session, 1, 0, "rows")
+    for step in [0, 1, 2]:
+        add_report_values(session, packed_id, step, time_index, np.arange(96))
+    for step in [1]:
+        for i in range(96):
+            session.add(ReportValue(ReportSeriesId=rows_id, Step=step, Index=i, TimeStamp=str(i), Value=i))
+    session.commit()
+    compaction = HistoryCompaction(session, keep_last=1, bin_size=4)
+
+    # Step 0 is the best step and step 2 the last one, the rows series has no full resolution reference
+    assert compaction.run() == 1
+    assert compaction.run() == 0
+
+    assert len(read_report_values(session, packed_id, 0)[1]) == 96
+    assert len(read_report_values(session, packed_id, 1)[1]) == 24
+    assert session.query(ReportValue).filter_by(ReportSeriesId=rows_id).count() == 96
+    assert session.query(CompactedReportStep).one().OriginalLength == 96
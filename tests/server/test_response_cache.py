@@ -0,0 +1,57 @@
+import pytest
+
+from hydro_system_models import hydro_system_medium, hydro_system_small
+from hps.utils.serializer import HydroSystemSerializer
+from server.response_cache import ResponseCache
+
+
+class Systems:
+    def __init__(self, **systems):
+        self.systems = systems
+
+    def get_system(self, system_name):
+        return self.systems[system_name]
+
+
+def test_system_response_is_serialized_once():
+    cache = ResponseCache(Systems(small=hydro_system_small()))
+
+    response = cache.get_system("small")
+
+    assert cache.get_system("small") is response
+    assert response.body.decode("utf-8") == HydroSystemSerializer.serialize(hydro_system_small())
+    assert response.mimetype == "application/json"
+
+
+def test_reloaded_system_with_same_content_keeps_the_response():
+    systems = Systems(small=hydro_system_small())
+    cache = ResponseCache(systems)
+    response = cache.get_system("small")
+
+    systems.systems["small"] = hydro_system_small()
+
+    assert cache.get_system("small") is response
+    assert len(cache.responses) == 1
+
+
+def test_changed_system_drops_the_stale_responses():
+    systems = Systems(system=hydro_system_small(), other=hydro_system_small())
+    cache = ResponseCache(systems)
+    stale = cache.get_system("system")
+    cache.get_system("other")
+
+    systems.systems["system"] = hydro_system_medium()
+    response = cache.get_system("system")
+
+    assert response.etag != stale.etag
+    assert sorted(name for name, _, _ in cache.responses) == ["other", "system"]
+
+
+def test_drawing_is_rendered_once():
+    pytest.importorskip("pygraphviz")
+    cache = ResponseCache(Systems(small=hydro_system_small()))
+
+    response = cache.get_drawing("small")
+
+    assert cache.get_drawing("small") is response
+    assert response.mimetype == "image/png"
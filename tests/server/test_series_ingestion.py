@@ -0,0 +1,127 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import server.series_ingestion
+from server.model import TimeDataSery, TimeDataValue, Upload, metadata
+from server.series_ingestion import CsvSeriesIngestion, IngestionJob, IngestionJobs, TimeDataSeriesType
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    engine = create_engine("sqlite:///{}".format((tmp_path / "series.db").as_posix()))
+    tables = [Upload, TimeDataSery, TimeDataValue]
+    metadata.create_all(engine, tables=[table.__table__ for table in tables])
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(server.series_ingestion, "create_session", Session)
+    session = Session()
+    yield session
+    session.close()
+
+
+def write_csv(tmp_path, rows):
+    path = tmp_path / "upload.csv"
+    path.write_text("time,1991,1992\n" + "".join(row + "\n" for row in rows))
+    return str(path)
+
+
+def hourly_rows(n):
+    return ["2023-01-01T{:02d}:00:00Z,{},{}".format(i, i, 10 * i) for i in range(n)]
+
+
+def ingest(path, chunk_rows=2):
+    job = IngestionJob("inflow", "upload.csv", os.path.getsize(path))
+    CsvSeriesIngestion(path, job, chunk_rows=chunk_rows).run()
+    return job
+
+
+def test_ingests_in_chunks(tmp_path, sessions):
+    path = write_csv(tmp_path, hourly_rows(5))
+
+    job = ingest(path)
+
+    assert job.to_dict() == {
+        "jobId": job.job_id,
+        "status": "done",
+        "progress": 1.0,
+        "rows": 5,
+        "uploadId": job.upload_id,
+        "error": None,
+    }
+    series = sessions.query(TimeDataSery).filter_by(UploadId=job.upload_id).order_by(TimeDataSery.Description).all()
+    assert [s.Description for s in series] == ["1991", "1992"]
+    assert series[0].Type == TimeDataSeriesType.Inflow
+    assert series[0].StartTime == "2023-01-01 00:00:00+00:00"
+    assert series[0].EndTime == "2023-01-01 04:00:00+00:00"
+    values = (
+        sessions.query(TimeDataValue)
+        .filter_by(TimeDataSeriesId=series[1].TimeDataSeriesId)
+        .order_by(TimeDataValue.TimeStampOffset)
+        .all()
+    )
+    assert [v.Value for v in values] == [0, 10, 20, 30, 40]
+    assert not os.path.exists(path)
+
+
+def test_failed_validation_removes_the_upload(tmp_path, sessions):
+    # The invalid time stamp is in the second chunk, after the first chunk is committed
+    rows = hourly_rows(3) + ["2023-01-01T01:00:00Z,3,30"]
+    path = write_csv(tmp_path, rows)
+
+    job = ingest(path)
+
+    assert job.status == "failed"
+    assert job.error == "Time stamps must be increasing, row 4"
+    assert job.upload_id is not None
+    assert sessions.query(Upload).count() == 0
+    assert sessions.query(TimeDataSery).count() == 0
+    assert sessions.query(TimeDataValue).count() == 0
+    assert not os.path.exists(path)
+
+
+def test_missing_value_fails(tmp_path, sessions):
+    path = write_csv(tmp_path, hourly_rows(2) + ["2023-01-01T02:00:00Z,2,"])
+
+    job = ingest(path, chunk_rows=10)
+
+    assert job.status == "failed"
+    assert job.error == "Missing value at row 3"
+    assert sessions.query(Upload).count() == 0
+
+
+def test_job_status_transitions(tmp_path, sessions, monkeypatch):
+    path = write_csv(tmp_path, hourly_rows(2))
+    job = IngestionJob("price", "upload.csv", os.path.getsize(path))
+    ingestion = CsvSeriesIngestion(path, job)
+    statuses = [job.status]
+    ingest_chunks = ingestion._ingest
+    monkeypatch.setattr(ingestion, "_ingest", lambda session: statuses.append(job.status) or ingest_chunks(session))
+
+    ingestion.run()
+
+    assert statuses + [job.status] == ["queued", "running", "done"]
+    assert job.finished
+    assert job.to_dict()["progress"] == 1.0
+
+
+def test_finished_jobs_are_dropped():
+    jobs = IngestionJobs(max_finished=2)
+    running = IngestionJob("inflow", "running.csv", 1)
+    jobs.add(running)
+    finished = []
+    for i in range(4):
+        job = IngestionJob("inflow", "{}.csv".format(i), 1)
+        jobs.add(job)
+        job.status = "done" if i % 2 else "failed"
+        finished.append(job)
+
+    jobs.add(IngestionJob("inflow", "new.csv", 1))
+
+    assert len(jobs) == 4
+    assert jobs.get(running.job_id) is running
+    assert jobs.get(finished[0].job_id) is None
+    assert jobs.get(finished[1].job_id) is None
+    assert jobs.get(finished[3].job_id) is finished[3]
+    assert jobs.get("unknown") is None
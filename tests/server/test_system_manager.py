@@ -0,0 +1,70 @@
+import pytest
+
+from hydro_system_models import hydro_system_small
+from hps.utils.serializer import HydroSystemSerializer
+from server.system_manager import SystemManager
+
+
+class Factory:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return object()
+
+
+def test_system_is_built_on_first_use():
+    manager = SystemManager()
+    factory = Factory()
+    manager.register("test", factory)
+
+    assert factory.calls == 0
+    system = manager.get_system("test")
+    assert manager.get_system("test") is system
+    assert factory.calls == 1
+
+
+def test_least_recently_used_system_is_evicted():
+    manager = SystemManager(cache_size=2)
+    factories = {name: Factory() for name in ["a", "b", "c"]}
+    for name, factory in factories.items():
+        manager.register(name, factory)
+
+    manager.get_system("a")
+    manager.get_system("b")
+    manager.get_system("a")
+    manager.get_system("c")
+
+    assert list(manager.systems) == ["a", "c"]
+    manager.get_system("b")
+    assert factories["b"].calls == 2
+    assert factories["a"].calls == 1
+
+
+def test_register_replaces_the_built_system():
+    manager = SystemManager()
+    manager.register("test", Factory())
+    system = manager.get_system("test")
+
+    manager.register("test", Factory())
+
+    assert manager.get_system("test") is not system
+
+
+def test_unknown_system():
+    with pytest.raises(ValueError):
+        SystemManager().get_system("unknown")
+
+
+def test_register_folder(tmp_path):
+    (tmp_path / "custom.json").write_text(HydroSystemSerializer.serialize(hydro_system_small()), encoding="utf-8")
+    (tmp_path / "notes.txt").write_text("Not a system")
+    manager = SystemManager()
+
+    manager.register_folder(str(tmp_path))
+
+    assert manager.system_names == ["large", "medium", "small", "custom"]
+    assert "custom" not in manager.systems
+    system = manager.get_system("custom")
+    assert HydroSystemSerializer.serialize(system) == HydroSystemSerializer.serialize(hydro_system_small())